@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Compare block lookup strategies on sorted and unsorted queries.
+
+Times Mapper.map_point with per-query binary search, with the sorted-input
+cursor (--assume-sorted), and Mapper.map_many (NumPy), on a synthetic map or
+on a real blocks TSV:
+
+    python3 bench/bench_lookup.py --blocks 1000000 --queries 1000000
+    python3 bench/bench_lookup.py --map web/data/pombase_leupold/A_to_B.blocks.tsv
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cli"))
+
+from blockstore import load_blocks  # noqa: E402
+from generate import make_queries, synthetic_blocks  # noqa: E402
+from mapper import HAVE_NUMPY, Mapper  # noqa: E402
+
+
+def parse_args():
+    """Parse command-line arguments for the lookup benchmark."""
+    p = argparse.ArgumentParser(description="Benchmark binary search vs sorted cursor vs vectorized block lookup.")
+    p.add_argument("--map", help="Blocks TSV or compiled index (default: synthetic map)")
+    p.add_argument("--blocks", type=int, default=100000, help="Blocks in the synthetic map")
+    p.add_argument("--contigs", type=int, default=4, help="Contigs in the synthetic map")
+    p.add_argument("--queries", type=int, default=200000, help="Number of point queries")
+    p.add_argument("--seed", type=int, default=1, help="Random seed")
+    return p.parse_args()
+
+
+def timed(fn):
+    """Return (seconds, result) for one call of fn."""
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def main():
+    """Entry point: print queries per second for each lookup strategy."""
+    args = parse_args()
+    rng = random.Random(args.seed)
+    if args.map:
+        blocks_by_contig = load_blocks(args.map)
+    else:
+        blocks_by_contig = synthetic_blocks(args.blocks, args.contigs, rng)
+    n_blocks = sum(len(b) for b in blocks_by_contig.values())
+    unsorted_q = make_queries(blocks_by_contig, args.queries, rng)
+    sorted_q = sorted(unsorted_q)
+    print(f"blocks={n_blocks} queries={len(unsorted_q)}")
+    print(f"{'input':<9}{'strategy':<15}{'seconds':>9}{'queries/s':>13}")
+    for label, queries in (("sorted", sorted_q), ("unsorted", unsorted_q)):
+        reference = None
+        runs = [
+            ("binary", Mapper(blocks_by_contig), lambda m: [m.map_point(c, p) for c, p in queries]),
+            ("cursor", Mapper(blocks_by_contig, sorted_input=True), lambda m: [m.map_point(c, p) for c, p in queries]),
+        ]
+        if HAVE_NUMPY:
+            runs.append(("map_many", Mapper(blocks_by_contig), lambda m: m.map_many(queries)))
+        for name, m, fn in runs:
+            seconds, result = timed(lambda: fn(m))
+            if reference is None:
+                reference = result
+            elif result != reference:
+                sys.exit(f"error: {name} results differ from binary search on {label} input")
+            note = f"  unsorted={m.unsorted}" if name == "cursor" else ""
+            print(f"{label:<9}{name:<15}{seconds:>9.3f}{len(queries) / seconds:>13,.0f}{note}")
+
+
+if __name__ == "__main__":
+    main()
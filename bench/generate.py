@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Generate synthetic block maps, PAF alignments and query sets for the benchmarks.
+
+    python3 bench/generate.py map -o syn.tsv --blocks 1000000 --gap-rate 0.5 --inversion-rate 0.05
+    python3 bench/generate.py paf -o syn.paf --blocks 1000000
+    python3 bench/generate.py queries syn.tsv -o q.bed -f bed --n 1000000 --sorted
+
+The same seed always gives the same files. A map and the PAF generated with
+the same parameters describe the same alignment: paf_to_blocks.py on the PAF
+gives back the map, except that blocks with no gap between them are joined.
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cli"))
+
+from blockstore import BLOCKS_HEADER, BlockStoreBuilder, load_blocks  # noqa: E402
+from xopen import open_output  # noqa: E402
+
+# Collinear '+' blocks per synthetic PAF record.
+PAF_BLOCKS_PER_RECORD = 100
+# Contig length written to PAF records; any bound on the synthetic coordinates will do.
+PAF_CONTIG_LENGTH = 10**12
+
+
+def parse_args():
+    """Parse command-line arguments for the benchmark data generators."""
+    p = argparse.ArgumentParser(description="Generate synthetic maps, PAF files and query sets for benchmarking.")
+    sub = p.add_subparsers(dest="kind", required=True)
+    for kind, help_text in (("map", "Synthetic blocks TSV"), ("paf", "Synthetic minimap2-style PAF with cg:Z")):
+        s = sub.add_parser(kind, help=help_text)
+        s.add_argument("-o", "--output", required=True, help="Output path ('-' for stdout, .gz for BGZF)")
+        add_map_options(s)
+    s = sub.add_parser("queries", help="CHR:POS or BED queries over the span of a map")
+    s.add_argument("map", help="Blocks TSV, chain file or compiled index the queries are drawn for")
+    s.add_argument("-o", "--output", required=True, help="Output path ('-' for stdout, .gz for BGZF)")
+    s.add_argument("-f", "--format", choices=["chrpos", "bed"], default="chrpos", help="Query format")
+    s.add_argument("--n", type=int, default=100000, help="Number of queries")
+    s.add_argument("--max-length", type=int, default=20000, help="Longest BED interval")
+    s.add_argument("--sorted", action="store_true", help="Sort queries by contig and position")
+    s.add_argument("--seed", type=int, default=1, help="Random seed")
+    return p.parse_args()
+
+
+def add_map_options(p):
+    """Add the synthetic map shape options to a parser."""
+    p.add_argument("--blocks", type=int, default=100000, help="Number of blocks")
+    p.add_argument("--contigs", type=int, default=4, help="Number of contigs")
+    p.add_argument("--gap-rate", type=float, default=0.5, help="Probability of an indel gap after each block")
+    p.add_argument("--inversion-rate", type=float, default=0.05, help="Probability of a block being on the '-' strand")
+    p.add_argument("--seed", type=int, default=1, help="Random seed")
+
+
+def synthetic_rows(n_blocks, n_contigs, rng, gap_rate=0.5, inversion_rate=0.05, max_gap=100):
+    """Yield block rows of a collinear map: n_blocks split over n_contigs, with random gaps and inversions.
+
+    After each block, with probability gap_rate, genome A and genome B each
+    skip 0..max_gap bases; blocks are on "-" with probability inversion_rate.
+    """
+    per_contig = max(1, n_blocks // n_contigs)
+    for c in range(n_contigs):
+        name = f"chr{c + 1}"
+        posA = posB = 0
+        for _ in range(per_contig):
+            length = rng.randint(200, 5000)
+            strand = "-" if rng.random() < inversion_rate else "+"
+            yield name, posA, posA + length, name, posB, posB + length, strand, 60
+            posA += length
+            posB += length
+            if rng.random() < gap_rate:
+                posA += rng.randint(0, max_gap)
+                posB += rng.randint(0, max_gap)
+
+
+def synthetic_blocks(n_blocks, n_contigs, rng, gap_rate=0.5, inversion_rate=0.05):
+    """Build a synthetic map (see synthetic_rows) as a BlockStore."""
+    builder = BlockStoreBuilder()
+    for row in synthetic_rows(n_blocks, n_contigs, rng, gap_rate, inversion_rate):
+        builder.add(*row)
+    return builder.finish()
+
+
+def write_map(path, rows):
+    """Write block rows as a blocks TSV."""
+    with open_output(path) as fout:
+        fout.write(BLOCKS_HEADER)
+        for row in rows:
+            fout.write("\t".join(map(str, row)) + "\n")
+
+
+def paf_record(rows):
+    """Format collinear block rows (one contig pair, one strand) as one PAF line with a cg:Z CIGAR."""
+    first, last = rows[0], rows[-1]
+    cigar = []
+    for prev, row in zip(rows, rows[1:]):
+        cigar.append(f"{prev[2] - prev[1]}M")
+        if row[1] > prev[2]:
+            cigar.append(f"{row[1] - prev[2]}I")
+        if row[4] > prev[5]:
+            cigar.append(f"{row[4] - prev[5]}D")
+    cigar.append(f"{last[2] - last[1]}M")
+    matches = sum(r[2] - r[1] for r in rows)
+    span = last[2] - first[1]
+    return (
+        f"{first[0]}\t{PAF_CONTIG_LENGTH}\t{first[1]}\t{last[2]}\t{first[6]}\t"
+        f"{first[3]}\t{PAF_CONTIG_LENGTH}\t{first[4]}\t{last[5]}\t"
+        f"{matches}\t{span}\t{first[7]}\ttp:A:P\tcg:Z:{''.join(cigar)}\n"
+    )
+
+
+def write_paf(path, rows):
+    """Write block rows as PAF records: runs of '+' blocks share a record, '-' blocks get their own."""
+    with open_output(path) as fout:
+        run = []
+        for row in rows:
+            if run and (row[6] == "-" or row[0] != run[0][0] or len(run) >= PAF_BLOCKS_PER_RECORD):
+                fout.write(paf_record(run))
+                run = []
+            run.append(row)
+            if row[6] == "-":
+                fout.write(paf_record(run))
+                run = []
+        if run:
+            fout.write(paf_record(run))
+
+
+def make_queries(blocks_by_contig, n, rng):
+    """Draw n (contig, pos) queries spread over the mapped span of each contig (0-based)."""
+    contigs = list(blocks_by_contig)
+    queries = []
+    for _ in range(n):
+        c = rng.choice(contigs)
+        blocks = blocks_by_contig[c]
+        queries.append((c, rng.randrange(0, blocks.endA[len(blocks) - 1] + 1000)))
+    return queries
+
+
+def write_queries(path, blocks_by_contig, n, rng, fmt="chrpos", sort=False, max_length=20000):
+    """Write n CHR:POS (1-based) or BED (0-based half-open) queries, optionally sorted by contig and position."""
+    queries = make_queries(blocks_by_contig, n, rng)
+    if sort:
+        queries.sort()
+    with open_output(path) as fout:
+        if fmt == "chrpos":
+            fout.writelines(f"{c}:{p + 1}\n" for c, p in queries)
+        else:
+            fout.writelines(f"{c}\t{p}\t{p + rng.randint(1, max_length)}\n" for c, p in queries)
+
+
+def main():
+    """Entry point: write the requested synthetic file."""
+    args = parse_args()
+    if args.kind == "queries":
+        rng = random.Random(args.seed)
+        write_queries(args.output, load_blocks(args.map), args.n, rng, args.format, args.sorted, args.max_length)
+        return
+    rows = synthetic_rows(args.blocks, args.contigs, random.Random(args.seed), args.gap_rate, args.inversion_rate)
+    if args.kind == "map":
+        write_map(args.output, rows)
+    else:
+        write_paf(args.output, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark suite for the command-line tools.
+
+Each case runs one tool in a fresh process and records its wall time,
+throughput and peak RSS. Maps are synthetic (bench/generate.py, one per
+--sizes entry) plus the real maps under web/data; every map is exercised
+with map loading (TSV and compiled index), CHR:POS lookups on unsorted and
+sorted input, BED split mode and blocks_invert.py. Synthetic maps also time
+paf_to_blocks.py on a matching PAF. Startup is the time to load the map and
+lift an empty input, for liftover.py, liftover_multi.py and roundtrip_test.py;
+serve.py is timed by importing it.
+
+    python3 bench/run_bench.py --baseline bench/baseline.json     # exit 1 on regressions
+    python3 bench/run_bench.py --save-baseline bench/baseline.json
+    python3 bench/run_bench.py --sizes 1000,100000,10000000 --queries 1000000 --json results.json
+
+A case regresses when its throughput falls, or its time or peak RSS grows,
+by more than --tolerance relative to the baseline. Timings only compare on
+the same machine, so no baseline is shipped: when the --baseline file does
+not exist yet, the run is saved there and becomes the baseline for later
+runs (bench/baseline.json is ignored by git).
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+CLI_DIR = os.path.join(ROOT, "cli")
+sys.path.insert(0, CLI_DIR)
+
+from generate import synthetic_rows, write_map, write_paf  # noqa: E402
+
+DEFAULT_SIZES = "1000,100000"
+# Absolute slack added to time and memory limits, so tiny cases do not fail on noise.
+MIN_SLACK_SECONDS = 0.05
+MIN_SLACK_MB = 5.0
+
+
+def parse_args():
+    """Parse command-line arguments for the benchmark suite."""
+    p = argparse.ArgumentParser(description="Run the liftover benchmark suite and compare it with a saved baseline.")
+    p.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated synthetic map sizes in blocks (e.g. 1000,1e5,1e7)")
+    p.add_argument("--queries", type=int, default=100000, help="Queries per query set")
+    p.add_argument("--gap-rate", type=float, default=0.5, help="Gap rate of the synthetic maps")
+    p.add_argument("--inversion-rate", type=float, default=0.05, help="Inversion rate of the synthetic maps")
+    p.add_argument("--no-real", action="store_true", help="Skip the web/data maps")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest is kept")
+    p.add_argument("--work-dir", help="Keep generated inputs here and reuse them (default: a temporary directory)")
+    p.add_argument("--json", help="Write the results to this JSON file")
+    p.add_argument("--save-baseline", help="Write the results as the new baseline JSON")
+    p.add_argument(
+        "--baseline",
+        help="Compare against this baseline JSON and exit 1 on regressions (created from this run if missing)",
+    )
+    p.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown or memory growth")
+    p.add_argument("--seed", type=int, default=1, help="Random seed for the synthetic data")
+    return p.parse_args()
+
+
+def run_measured(cmd):
+    """Run cmd to completion; return (wall seconds, peak RSS in MB). Output goes to /dev/null."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    err = proc.stderr.read().decode()
+    proc.stderr.close()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed:\n{err}")
+    rss_kb = usage.ru_maxrss if sys.platform != "darwin" else usage.ru_maxrss // 1024
+    return seconds, rss_kb / 1024
+
+
+def best_of(cmd, repeat):
+    """Run cmd repeat times; return the fastest (seconds, peak RSS MB)."""
+    return min((run_measured(cmd) for _ in range(repeat)), key=lambda r: r[0])
+
+
+def tool(name, *args):
+    """Build the command line for one cli/ tool."""
+    return [sys.executable, os.path.join(CLI_DIR, name), *args]
+
+
+def prepare_map(work, label, map_path, args):
+    """Write the query sets of one map; return their paths keyed by name.
+
+    Queries are generated in a child process: Linux carries the parent's peak
+    RSS over to the children it forks, so the parent must never load a map.
+    """
+    files = {"empty": os.path.join(work, "empty.txt")}
+    open(files["empty"], "w").close()
+    for k, (name, fmt, sort) in enumerate((("unsorted", "chrpos", False), ("sorted", "chrpos", True), ("bed", "bed", False))):
+        path = os.path.join(work, f"{label}.{name}.{'txt' if fmt == 'chrpos' else 'bed'}")
+        if not os.path.exists(path):
+            cmd = [sys.executable, os.path.join(BENCH_DIR, "generate.py"), "queries", map_path, "-o", path]
+            cmd += ["-f", fmt, "--n", str(args.queries), "--seed", str(args.seed + k)] + (["--sorted"] if sort else [])
+            subprocess.run(cmd, check=True)
+        files[name] = path
+    return files
+
+
+def map_cases(label, map_path, files, work, n_queries, paf=None):
+    """Return (case name, command, records processed) for one map."""
+    out = os.path.join(work, "out.tsv")
+    index = os.path.join(work, f"{label}.idx")
+    cases = [
+        ("compile", tool("compile_blocks.py", map_path, "-o", index), None),
+        ("startup_tsv", tool("liftover.py", map_path, files["empty"], "-o", out), None),
+        ("startup_idx", tool("liftover.py", index, files["empty"], "-o", out), None),
+        ("chrpos_unsorted", tool("liftover.py", index, files["unsorted"], "-o", out), n_queries),
+        ("chrpos_sorted", tool("liftover.py", index, files["sorted"], "-o", out, "--assume-sorted"), n_queries),
+        ("bed_split", tool("liftover.py", index, files["bed"], "-f", "bed", "--allow-split", "-o", out), n_queries),
+        ("startup_multi", tool("liftover_multi.py", files["empty"], "--map", f"{label}={index}", "-o", out), None),
+        ("startup_roundtrip", tool("roundtrip_test.py", "--blocks-ab", index, "--blocks-ba", index, "--input", files["empty"], "--out", out), None),
+        ("invert", tool("blocks_invert.py", map_path, "-o", out), None),
+    ]
+    if paf is not None:
+        cases.append(("paf_to_blocks", tool("paf_to_blocks.py", paf[0], "-o", out), paf[1]))
+    return cases
+
+
+def parse_size(text):
+    """Parse a block count such as 1000, 1e5 or 10000000."""
+    return int(float(text))
+
+
+def run_suite(args, work):
+    """Generate the inputs and run every case; return {"map/case": metrics}."""
+    maps = []
+    for n in map(parse_size, args.sizes.split(",")):
+        label = f"syn{n}"
+        map_path = os.path.join(work, f"{label}.blocks.tsv")
+        paf_path = os.path.join(work, f"{label}.paf")
+        shape = (n, 4, random.Random(args.seed), args.gap_rate, args.inversion_rate)
+        if not os.path.exists(map_path):
+            write_map(map_path, synthetic_rows(*shape))
+        if not os.path.exists(paf_path):
+            write_paf(paf_path, synthetic_rows(*shape))
+        maps.append((label, map_path, (paf_path, n)))
+    if not args.no_real:
+        for path in sorted(glob.glob(os.path.join(ROOT, "web", "data", "*", "*.blocks.tsv"))):
+            pair = os.path.basename(os.path.dirname(path))
+            maps.append((f"{pair}.{os.path.basename(path).split('.')[0]}", path, None))
+    results = {}
+    cases = [(None, "import_serve", [sys.executable, "-c", f"import sys; sys.path.insert(0, {CLI_DIR!r}); import serve"], None)]
+    for label, map_path, paf in maps:
+        files = prepare_map(work, label, map_path, args)
+        cases += [(label, *case) for case in map_cases(label, map_path, files, work, args.queries, paf)]
+    for label, case, cmd, records in cases:
+        key = f"{label}/{case}" if label else case
+        seconds, rss_mb = best_of(cmd, args.repeat)
+        metrics = {"seconds": round(seconds, 4), "rss_mb": round(rss_mb, 1)}
+        if records:
+            metrics["per_second"] = round(records / seconds)
+        results[key] = metrics
+        rate = f"{metrics['per_second']:>12,}" if records else f"{'':>12}"
+        print(f"{key:<44}{seconds:>9.3f}{rate}{rss_mb:>10.1f}", flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regression messages for results that are worse than the baseline."""
+    problems = []
+    for key, base in sorted(baseline.items()):
+        cur = results.get(key)
+        if cur is None:
+            continue
+        if "per_second" in base and cur.get("per_second", 0) < base["per_second"] * (1 - tolerance):
+            problems.append(f"{key}: throughput {cur['per_second']:,}/s < baseline {base['per_second']:,}/s")
+        elif cur["seconds"] > base["seconds"] * (1 + tolerance) + MIN_SLACK_SECONDS:
+            problems.append(f"{key}: {cur['seconds']:.3f}s > baseline {base['seconds']:.3f}s")
+        if cur["rss_mb"] > base["rss_mb"] * (1 + tolerance) + MIN_SLACK_MB:
+            problems.append(f"{key}: peak RSS {cur['rss_mb']} MB > baseline {base['rss_mb']} MB")
+    return problems
+
+
+def main():
+    """Entry point: run the suite, save or compare results."""
+    args = parse_args()
+    print(f"{'case':<44}{'seconds':>9}{'records/s':>12}{'RSS MB':>10}")
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        results = run_suite(args, args.work_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="liftover-bench-") as work:
+            results = run_suite(args, work)
+    new_baseline = args.baseline and not os.path.exists(args.baseline)
+    for path in (args.json, args.save_baseline, args.baseline if new_baseline else None):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=1, sort_keys=True)
+                f.write("\n")
+    if new_baseline:
+        print(f"no baseline at {args.baseline} yet; saved this run as the baseline", file=sys.stderr)
+    elif args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for msg in problems:
+            print(f"REGRESSION {msg}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+        print("no regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Streaming bedGraph liftover used by liftover.py -f bedgraph.
+
+Every interval is split at block boundaries and each mapped piece keeps the
+interval's value; unmapped stretches are dropped. The pieces are sorted by
+genome-B position with an external merge sort (extsort.py), so memory stays
+bounded by max_records. A sweep then makes the output ready for
+bedGraphToBigWig in the same pass:
+- where pieces overlap on B (duplicated regions in B), each stretch covered
+  by several pieces gets one combined value (mean by default);
+- adjacent stretches with the same value are merged.
+
+Output is sorted by contig name (byte order, as `sort -k1,1 -k2,2n` with
+LC_ALL=C) and by start, with no overlaps.
+"""
+import math
+
+from extsort import DEFAULT_MAX_RECORDS, external_sort
+from mapper import Mapper
+
+OVERLAP_OPS = {
+    "mean": lambda values: math.fsum(values) / len(values),
+    "sum": math.fsum,
+    "max": max,
+    "min": min,
+}
+
+
+def format_value(value):
+    """Format a signal value: integral values without a decimal point, others in shortest round-trip form."""
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def lifted_pieces(blocks_by_contig, fin, counts, mapper=None):
+    """Yield (contigB, startB, endB, value) for the mapped pieces of bedGraph lines.
+
+    counts ([total, mapped, split]) is updated in place: input intervals,
+    intervals with at least one mapped piece, and intervals mapped in more
+    than one piece. track, browser and # lines are skipped. Pieces on "-"
+    blocks come out as the ascending B range they cover:
+
+    >>> from blockstore import BlockStoreBuilder
+    >>> builder = BlockStoreBuilder()
+    >>> builder.add("I", 100, 200, "I", 1000, 1100, "-", 60)
+    >>> builder.add("I", 200, 300, "I", 2000, 2100, "+", 60)
+    >>> counts = [0, 0, 0]
+    >>> list(lifted_pieces(builder.finish(), ["I\\t110\\t120\\t2.5\\n", "I\\t190\\t210\\t1\\n"], counts))
+    [('I', 1080, 1090, 2.5), ('I', 1000, 1010, 1.0), ('I', 2000, 2010, 1.0)]
+    >>> counts
+    [2, 2, 1]
+    """
+    if mapper is None:
+        mapper = Mapper(blocks_by_contig)
+    for line in fin:
+        if not line.strip() or line.startswith(("track", "browser", "#")):
+            continue
+        counts[0] += 1
+        contigA, startA, endA, value = line.rstrip("\r\n").split("\t")[:4]
+        status, pieces = mapper.map_interval(contigA, int(startA), int(endA), True)
+        if status not in ("OK", "SPLIT"):
+            continue
+        value = float(value)
+        n = 0
+        for _, _, contigB, startB, endB, strand in pieces:
+            if contigB is None:
+                continue
+            # Pieces on "-" blocks run from the image of their first base down to one past the image of
+            # their last; turn them into the half-open B range they cover.
+            lo, hi = (startB, endB) if strand == "+" else (endB - 1, startB + 1)
+            if hi > lo:
+                n += 1
+                yield contigB, lo, hi, value
+        if n:
+            counts[1] += 1
+            if n > 1:
+                counts[2] += 1
+
+
+def sweep_overlaps(pieces, combine):
+    """Yield non-overlapping (contig, start, end, value) from pieces sorted by (contig, start).
+
+    Stretches covered by several pieces get combine(list of their values).
+    """
+    contig = None
+    active = []  # (end, value) of the pieces covering pos
+    pos = 0
+    for c, start, end, value in pieces:
+        # Everything before start is final once a piece starting there arrives.
+        yield from drain(contig, active, pos, None if c != contig else start, combine)
+        contig, pos = c, start
+        active.append((end, value))
+    yield from drain(contig, active, pos, None, combine)
+
+
+def drain(contig, active, pos, limit, combine):
+    """Yield the segments of the active pieces from pos up to limit (None: until they all end).
+
+    Pieces ending at or before the last segment are removed from active in place.
+    """
+    while active and (limit is None or pos < limit):
+        stop = min(end for end, _ in active)
+        if limit is not None and limit < stop:
+            stop = limit
+        values = [v for _, v in active]
+        yield contig, pos, stop, values[0] if len(values) == 1 else combine(values)
+        pos = stop
+        active[:] = [(end, v) for end, v in active if end > pos]
+
+
+def merge_equal(segments):
+    """Merge consecutive segments that touch and have the same value."""
+    prev = None
+    for seg in segments:
+        if prev is not None and seg[0] == prev[0] and seg[1] == prev[2] and seg[3] == prev[3]:
+            prev = (prev[0], prev[1], seg[2], prev[3])
+            continue
+        if prev is not None:
+            yield prev
+        prev = seg
+    if prev is not None:
+        yield prev
+
+
+def lift_bedgraph_lines(blocks_by_contig, fin, fout, overlap="mean", max_records=DEFAULT_MAX_RECORDS, tmp_dir=None, metrics=None):
+    """Lift bedGraph lines from fin and write a sorted, merged bedGraph to fout.
+
+    Return (total, mapped, split, written, runs): input intervals, intervals
+    with a mapped piece, intervals mapped in several pieces, output rows and
+    spilled sort runs. overlap names the OVERLAP_OPS function that combines
+    the values of pieces that overlap on genome B.
+    """
+    mapper = Mapper(blocks_by_contig)
+    if metrics is not None:
+        metrics.watch(mapper)
+    counts = [0, 0, 0]
+    stats = {}
+    pieces = external_sort(
+        lifted_pieces(blocks_by_contig, fin, counts, mapper),
+        key=lambda p: (p[0], p[1]),
+        max_records=max_records,
+        tmp_dir=tmp_dir,
+        stats=stats,
+    )
+    written = 0
+    for contig, start, end, value in merge_equal(sweep_overlaps(pieces, OVERLAP_OPS[overlap])):
+        fout.write(f"{contig}\t{start}\t{end}\t{format_value(value)}\n")
+        written += 1
+    return counts[0], counts[1], counts[2], written, stats.get("runs", 0)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+
+from blockstore import BlockStoreBuilder, load_blocks, write_blocks_tsv, write_index
+from compose import compose_pieces, merge_adjacent
+
+
+def parse_args():
+    """Parse command-line arguments for composing A→B and B→C blocks into A→C."""
+    p = argparse.ArgumentParser(
+        description=(
+            "Compose an A→B and a B→C block map into one A→C blocks TSV, so A can be lifted to C in a single pass.\n"
+            "Strand flips on either side are carried through; A bases whose B image is not covered by B→C are dropped."
+        ),
+    )
+    p.add_argument("blocks_ab", help="A→B blocks TSV, chain file or compiled index")
+    p.add_argument("blocks_bc", help="B→C blocks TSV, chain file or compiled index (genome B as its A side)")
+    p.add_argument("-o", "--output", default="A_to_C.blocks.tsv", help="Output A→C blocks TSV ('-' for stdout, .gz for BGZF)")
+    p.add_argument("--index", action="store_true", help="Write a compiled binary index instead of a TSV")
+    return p.parse_args()
+
+
+def compose_blocks(blocks_ab, blocks_bc):
+    """Compose two loaded maps; return (A→C BlockStore, bases of A→B with no B→C block)."""
+    pieces = []
+    dropped = 0
+    for piece in compose_pieces(blocks_ab, blocks_bc):
+        if piece[3] is None:
+            dropped += piece[2] - piece[1]
+        else:
+            pieces.append(piece)
+    pieces.sort(key=lambda r: (r[0], r[1]))
+    builder = BlockStoreBuilder()
+    for row in merge_adjacent(pieces):
+        builder.add(*row)
+    return builder.finish(), dropped
+
+
+def main():
+    """Entry point: compose two block maps into one."""
+    args = parse_args()
+    store, dropped = compose_blocks(load_blocks(args.blocks_ab), load_blocks(args.blocks_bc))
+    if args.index:
+        write_index(store, args.output)
+    else:
+        write_blocks_tsv(store, args.output)
+    print(f"blocks={store.n_blocks()} unmapped_bases={dropped}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
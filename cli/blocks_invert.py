@@ -1,53 +1,74 @@
 #!/usr/bin/env python3
 import argparse
+import sys
+
+from blockstore import BLOCKS_HEADER, IndexWriter, iter_block_rows
+from extsort import DEFAULT_MAX_RECORDS, external_sort
+from xopen import open_output
 
 
 def parse_args():
     """Parse command-line arguments for inverting A→B blocks TSV to B→A."""
     p = argparse.ArgumentParser(
         description=(
-            "Invert A→B blocks TSV into B→A by swapping sides and preserving strand."
+            "Invert A→B blocks TSV into B→A by swapping sides and preserving strand.\n"
+            "Blocks are sorted with an external merge sort, so memory stays bounded by --max-records."
         ),
     )
-    p.add_argument("blocks_ab", help="Input A→B blocks TSV")
-    p.add_argument("-o", "--output", default="B_to_A.blocks.tsv", help="Output B→A blocks TSV")
+    p.add_argument("blocks_ab", help="Input A→B blocks TSV or chain file ('-' for stdin, gzip accepted)")
+    p.add_argument("-o", "--output", default="B_to_A.blocks.tsv", help="Output B→A blocks TSV ('-' for stdout, .gz for BGZF)")
+    p.add_argument("--index", action="store_true", help="Write a compiled binary index instead of a TSV (as compile_blocks.py would)")
+    p.add_argument("--max-records", type=int, default=DEFAULT_MAX_RECORDS, help="Blocks held in memory before spilling a sorted run to disk")
+    p.add_argument("--tmp-dir", help="Directory for spilled runs (default: system temp dir)")
     return p.parse_args()
 
 
-def invert_blocks(path_in, path_out):
-    """Read A→B blocks and write B→A blocks, sorted per contig by start."""
-    by_contig = {}
-    with open(path_in) as fin:
-        header = fin.readline()
-        for line in fin:
-            contigA, startA, endA, contigB, startB, endB, strand, mapq = line.rstrip().split("\t")
-            b = {
-                "contigA": contigB,
-                "startA": int(startB),
-                "endA": int(endB),
-                "contigB": contigA,
-                "startB": int(startA),
-                "endB": int(endA),
-                "strand": strand,
-                "mapq": int(mapq),
-            }
-            by_contig.setdefault(b["contigA"], []).append(b)
-    for c in by_contig:
-        by_contig[c].sort(key=lambda b: b["startA"])  # ensure sorted
-    with open(path_out, "w") as fout:
-        fout.write("contigA\tstartA\tendA\tcontigB\tstartB\tendB\tstrand\tmapq\n")
-        for c in sorted(by_contig.keys()):
-            for b in by_contig[c]:
-                fout.write(
-                    f"{b['contigA']}\t{b['startA']}\t{b['endA']}\t{b['contigB']}\t{b['startB']}\t{b['endB']}\t{b['strand']}\t{b['mapq']}\n"
-                )
+def swapped_rows(path_in, names_b):
+    """Yield the rows of an A→B map as B→A rows, recording A contigs in order of first appearance."""
+    for cA, sA, eA, cB, sB, eB, strand, mapq in iter_block_rows(path_in):
+        if cA not in names_b:
+            names_b[cA] = len(names_b)
+        yield cB, sB, eB, cA, sA, eA, strand, mapq
+
+
+def invert_blocks(path_in, path_out, index=False, max_records=DEFAULT_MAX_RECORDS, tmp_dir=None):
+    """Read A→B blocks and write B→A blocks, contigs in name order and blocks by start.
+
+    The output is the same as read_blocks_tsv(path_in, swap=True) written with
+    write_blocks_tsv (or write_index when index is set), but only max_records
+    blocks are held in memory at a time. Return (blocks, spilled runs).
+    """
+    names_b = {}
+    stats = {}
+    rows = external_sort(
+        swapped_rows(path_in, names_b), key=lambda r: (r[0], r[1]), max_records=max_records, tmp_dir=tmp_dir, stats=stats
+    )
+    n = 0
+    if index:
+        writer = None
+        for row in rows:
+            if writer is None:
+                # The whole input has been read by the time the first sorted row arrives.
+                writer = IndexWriter(path_out, names_b, tmp_dir)
+            writer.add(*row)
+        if writer is None:
+            writer = IndexWriter(path_out, names_b, tmp_dir)
+        n = writer.close()
+    else:
+        with open_output(path_out) as fout:
+            fout.write(BLOCKS_HEADER)
+            for cB, sB, eB, cA, sA, eA, strand, mapq in rows:
+                fout.write(f"{cB}\t{sB}\t{eB}\t{cA}\t{sA}\t{eA}\t{strand}\t{min(mapq, 255)}\n")
+                n += 1
+    return n, stats.get("runs", 0)
 
 
 def main():
     """Entry point: invert A→B blocks TSV to B→A."""
     args = parse_args()
-    invert_blocks(args.blocks_ab, args.output)
+    n, runs = invert_blocks(args.blocks_ab, args.output, args.index, args.max_records, args.tmp_dir)
+    print(f"blocks={n} runs={runs}", file=sys.stderr)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,934 @@
+#!/usr/bin/env python3
+"""Columnar block storage shared by the liftover command-line tools.
+
+Blocks are held per genome-A contig as parallel typed arrays instead of one
+dict per block. Genome-B contig names are interned in a table shared by the
+whole store, and strands are packed into a bitmask (bit set = "-" strand).
+
+A store can also be compiled into a binary index (see compile_blocks.py) that
+is opened with mmap, so loading is near-instant and concurrent processes share
+the page cache.
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_right
+from itertools import chain, compress
+from operator import ne
+
+from xopen import is_stdio, open_input, open_output
+
+BLOCKS_HEADER = "contigA\tstartA\tendA\tcontigB\tstartB\tendB\tstrand\tmapq\n"
+
+INDEX_MAGIC = b"LOBLKIDX"
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx"
+# magic, version, meta length, data offset, n_blocks, source size, source mtime_ns, source sha256
+INDEX_HEADER = struct.Struct("<8sIIQQQQ32s")
+
+
+class ContigBlocks:
+    """Blocks of one genome-A contig as typed arrays sorted by startA."""
+
+    __slots__ = ("contigA", "startA", "endA", "startB", "endB", "strand_bits", "mapq", "contigB", "names_b", "_tree", "_disjoint")
+
+    def __init__(self, contigA, names_b):
+        self.contigA = contigA
+        self.names_b = names_b
+        self.startA = array("q")
+        self.endA = array("q")
+        self.startB = array("q")
+        self.endB = array("q")
+        self.strand_bits = bytearray()
+        self.mapq = array("B")
+        self.contigB = array("I")
+        self._tree = None
+        self._disjoint = None
+
+    @classmethod
+    def from_buffers(cls, contigA, names_b, startA, endA, startB, endB, strand_bits, mapq, contigB):
+        """Build a ContigBlocks over existing buffers (e.g. memoryviews into an index)."""
+        cb = cls.__new__(cls)
+        cb.contigA = contigA
+        cb.names_b = names_b
+        cb.startA = startA
+        cb.endA = endA
+        cb.startB = startB
+        cb.endB = endB
+        cb.strand_bits = strand_bits
+        cb.mapq = mapq
+        cb.contigB = contigB
+        cb._tree = None
+        cb._disjoint = None
+        return cb
+
+    def __len__(self):
+        return len(self.startA)
+
+    def is_minus(self, i):
+        """Return True if block i maps to the "-" strand of genome B."""
+        return (self.strand_bits[i >> 3] >> (i & 7)) & 1 == 1
+
+    def strand(self, i):
+        """Return the strand character of block i."""
+        return "-" if self.is_minus(i) else "+"
+
+    def contig_b(self, i):
+        """Return the genome-B contig name of block i."""
+        return self.names_b[self.contigB[i]]
+
+    def row(self, i):
+        """Return block i as a (contigA, startA, endA, contigB, startB, endB, strand, mapq) tuple."""
+        return (
+            self.contigA,
+            self.startA[i],
+            self.endA[i],
+            self.contig_b(i),
+            self.startB[i],
+            self.endB[i],
+            self.strand(i),
+            self.mapq[i],
+        )
+
+    def disjoint(self):
+        """Return True if the blocks do not overlap in A (cached; see is_disjoint)."""
+        if self._disjoint is None:
+            self._disjoint = is_disjoint(self)
+        return self._disjoint
+
+    def interval_tree(self):
+        """Return the max-endA array of the blocks' implicit interval tree, or None if they are disjoint in A.
+
+        Built on first use (see build_interval_tree); call again after changing the columns.
+        """
+        if self._tree is None:
+            self._tree = False if self.disjoint() else build_interval_tree(self.endA)
+        return self._tree or None
+
+    def nbytes(self):
+        """Return the number of bytes held by the column buffers."""
+        cols = (self.startA, self.endA, self.startB, self.endB, self.mapq, self.contigB)
+        return sum(c.itemsize * len(c) for c in cols) + len(self.strand_bits)
+
+
+class BlockStore(dict):
+    """Mapping of genome-A contig name to ContigBlocks, plus the genome-B name table."""
+
+    def __init__(self):
+        super().__init__()
+        self.names_b = []
+        self.buffer = None  # mmap backing an opened index, kept alive with the store
+
+    def n_blocks(self):
+        """Return the total number of blocks across contigs."""
+        return sum(len(cb) for cb in self.values())
+
+    def nbytes(self):
+        """Return the approximate number of bytes held by the column buffers."""
+        return sum(cb.nbytes() for cb in self.values())
+
+
+class BlockStoreBuilder:
+    """Accumulate blocks in any order and produce a sorted BlockStore."""
+
+    def __init__(self):
+        self.store = BlockStore()
+        self._name_ids = {}
+        self._minus = {}
+
+    def _contig(self, contigA):
+        cb = self.store.get(contigA)
+        if cb is None:
+            cb = self.store[contigA] = ContigBlocks(contigA, self.store.names_b)
+            self._minus[contigA] = bytearray()
+        return cb
+
+    def _name_id(self, contigB):
+        name_id = self._name_ids.get(contigB)
+        if name_id is None:
+            name_id = self._name_ids[contigB] = len(self.store.names_b)
+            self.store.names_b.append(contigB)
+        return name_id
+
+    def add(self, contigA, startA, endA, contigB, startB, endB, strand, mapq):
+        """Append one block; coordinates are 0-based half-open integers."""
+        cb = self._contig(contigA)
+        cb.startA.append(startA)
+        cb.endA.append(endA)
+        cb.startB.append(startB)
+        cb.endB.append(endB)
+        cb.mapq.append(min(mapq, 255))
+        cb.contigB.append(self._name_id(contigB))
+        self._minus[contigA].append(strand != "+")
+
+    def add_columns(self, contigA, startA, endA, contigB, startB, endB, strand, mapq):
+        """Append many blocks given as parallel columns of TSV field strings."""
+        n = len(contigA)
+        if not n:
+            return
+        # Blocks files are grouped by contig: find where each run starts in one pass and take whole runs as slices.
+        bounds = [0, *compress(range(1, n), map(ne, contigA[1:], contigA)), n]
+        for i, j in zip(bounds, bounds[1:]):
+            c = contigA[i]
+            cb = self._contig(c)
+            cb.startA.extend(map(int, startA[i:j]))
+            cb.endA.extend(map(int, endA[i:j]))
+            cb.startB.extend(map(int, startB[i:j]))
+            cb.endB.extend(map(int, endB[i:j]))
+            qs = list(map(int, mapq[i:j]))
+            if qs and max(qs) > 255:
+                qs = [min(q, 255) for q in qs]
+            cb.mapq.extend(qs)
+            names = contigB[i:j]
+            for name in dict.fromkeys(names):
+                self._name_id(name)
+            cb.contigB.extend(map(self._name_ids.__getitem__, names))
+            self._minus[c].extend(map("+".__ne__, strand[i:j]))
+
+    def finish(self):
+        """Sort every contig by startA (stable) and pack strands; return the BlockStore."""
+        for c, cb in self.store.items():
+            minus = self._minus[c]
+            n = len(cb)
+            starts = cb.startA
+            if any(map(int.__gt__, starts, starts[1:])):
+                order = sorted(range(n), key=starts.__getitem__)
+                for name in ("startA", "endA", "startB", "endB", "mapq", "contigB"):
+                    col = getattr(cb, name)
+                    setattr(cb, name, array(col.typecode, [col[i] for i in order]))
+                minus = [minus[i] for i in order]
+            bits = bytearray((n + 7) // 8)
+            for i, m in enumerate(minus):
+                if m:
+                    bits[i >> 3] |= 1 << (i & 7)
+            cb.strand_bits = bits
+        self._minus = {}
+        return self.store
+
+
+def chain_rows(lines):
+    """Yield the ungapped segments of UCSC chain records as block rows.
+
+    The chain's target (t) side is genome A and its query (q) side genome B;
+    a "-" query strand gives "-" blocks. The chain score is used as mapq, so
+    chains written by paf_to_blocks.py --chain round-trip exactly.
+    """
+    contigA = None
+    for line in lines:
+        fields = line.split()
+        if not fields or line.startswith("#"):
+            continue
+        if fields[0] == "chain":
+            if len(fields) < 12 or fields[4] != "+":
+                raise ValueError(f"unsupported chain header: {line.rstrip()!r}")
+            mapq = int(float(fields[1]))
+            contigA, ta = fields[2], int(fields[5])
+            contigB, q_size, minus, qb = fields[7], int(fields[8]), fields[9] == "-", int(fields[10])
+            strand = "-" if minus else "+"
+            continue
+        if contigA is None:
+            raise ValueError(f"chain data line before any chain header: {line.rstrip()!r}")
+        size = int(fields[0])
+        if minus:
+            yield contigA, ta, ta + size, contigB, q_size - qb - size, q_size - qb, strand, mapq
+        else:
+            yield contigA, ta, ta + size, contigB, qb, qb + size, strand, mapq
+        if len(fields) == 3:
+            ta += size + int(fields[1])
+            qb += size + int(fields[2])
+
+
+def read_chain_lines(lines, builder, swap=False):
+    """Add the blocks of UCSC chain records (see chain_rows) to a builder; mapq is clamped to 255."""
+    for contigA, startA, endA, contigB, startB, endB, strand, mapq in chain_rows(lines):
+        if swap:
+            builder.add(contigB, startB, endB, contigA, startA, endA, strand, mapq)
+        else:
+            builder.add(contigA, startA, endA, contigB, startB, endB, strand, mapq)
+    return builder
+
+
+def tsv_column_chunks(f, path, chunk_bytes=1 << 22):
+    """Yield the 8 columns (lists of field strings) of successive chunks of a blocks TSV body."""
+    while True:
+        text = f.read(chunk_bytes)
+        if not text:
+            break
+        text += f.readline()
+        text = text.rstrip("\n")
+        if not text:
+            continue
+        # Split the whole chunk at once and take columns with stride-8 slices.
+        fields = text.replace("\n", "\t").split("\t")
+        n_lines = text.count("\n") + 1
+        if len(fields) != 8 * n_lines:
+            bad = next(line for line in text.split("\n") if len(line.split("\t")) != 8)
+            raise ValueError(f"{path}: expected 8 columns: {bad!r}")
+        yield [fields[k::8] for k in range(8)]
+
+
+def is_chain_start(first_line):
+    """Return True if the first line of a map file marks UCSC chain format rather than a blocks TSV."""
+    return first_line.startswith(("chain", "#"))
+
+
+def read_blocks_tsv(path, builder=None, swap=False, chunk_bytes=1 << 22):
+    """Parse a blocks TSV (or UCSC chain file) into a builder; swap=True reads it as the inverse (B→A) map."""
+    if builder is None:
+        builder = BlockStoreBuilder()
+    with open_input(path) as f:
+        first = f.readline()
+        if is_chain_start(first):
+            return read_chain_lines(chain([first], f), builder, swap)
+        for cols in tsv_column_chunks(f, path, chunk_bytes):
+            if swap:
+                cols = [cols[3], cols[4], cols[5], cols[0], cols[1], cols[2], cols[6], cols[7]]
+            builder.add_columns(*cols)
+    return builder
+
+
+def iter_block_rows(path, chunk_bytes=1 << 20):
+    """Yield (contigA, startA, endA, contigB, startB, endB, strand, mapq) rows of a blocks TSV or chain file in file order."""
+    with open_input(path) as f:
+        first = f.readline()
+        if is_chain_start(first):
+            yield from chain_rows(chain([first], f))
+            return
+        for cA, sA, eA, cB, sB, eB, strand, mapq in tsv_column_chunks(f, path, chunk_bytes):
+            yield from zip(cA, map(int, sA), map(int, eA), cB, map(int, sB), map(int, eB), strand, map(int, mapq))
+
+
+def load_blocks(path):
+    """Load a blocks TSV or chain file (plain, gzip or "-") or compiled index into a BlockStore sorted by startA.
+
+    For a TSV with a sibling index (path + INDEX_SUFFIX), the index is used when
+    it is up to date and rebuilt when the TSV has changed.
+    """
+    if is_stdio(path):
+        return read_blocks_tsv(path).finish()
+    if is_index(path):
+        return open_index(path)
+    index_path = path + INDEX_SUFFIX
+    if os.path.exists(index_path):
+        if index_is_fresh(index_path, path):
+            return open_index(index_path)
+        store = read_blocks_tsv(path).finish()
+        try:
+            write_index(store, index_path, path)
+            print(f"Rebuilt stale index {index_path}", file=sys.stderr)
+        except OSError as e:
+            print(f"Warning: index {index_path} is stale and could not be rebuilt ({e})", file=sys.stderr)
+        return store
+    return read_blocks_tsv(path).finish()
+
+
+def write_blocks_tsv(store, path):
+    """Write a BlockStore as blocks TSV, contigs in name order and blocks by startA."""
+    with open_output(path) as fout:
+        fout.write(BLOCKS_HEADER)
+        for c in sorted(store.keys()):
+            cb = store[c]
+            for i in range(len(cb)):
+                fout.write("\t".join(map(str, cb.row(i))) + "\n")
+
+
+def file_sha256(path):
+    """Return the SHA-256 digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.digest()
+
+
+def index_prefix(path, table, names_b, n_rows, source=None):
+    """Return the header, contig table and padding that precede the columns of an index at path."""
+    source_size = source_mtime = 0
+    digest = b"\0" * 32
+    if source is not None:
+        st = os.stat(source)
+        source_size, source_mtime = st.st_size, st.st_mtime_ns
+        digest = file_sha256(source)
+        source = os.path.relpath(os.path.abspath(source), os.path.dirname(os.path.abspath(path)))
+    meta = json.dumps({"contigs": table, "names_b": names_b, "source": source}).encode()
+    data_offset = INDEX_HEADER.size + len(meta)
+    data_offset += -data_offset % 8
+    header = INDEX_HEADER.pack(
+        INDEX_MAGIC, INDEX_VERSION, len(meta), data_offset, n_rows, source_size, source_mtime, digest
+    )
+    return header + meta + b"\0" * (data_offset - INDEX_HEADER.size - len(meta))
+
+
+def write_atomic(path, write):
+    """Call write(f) on a temporary file next to path, then rename it over path."""
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_index(store, path, source=None):
+    """Write a BlockStore as a binary index; source is the TSV it was built from.
+
+    Layout: fixed header, JSON contig table, then 8-byte aligned columns laid out
+    contig by contig: startA, endA, startB, endB (int64), contigB (uint32),
+    mapq (uint8) and per-contig byte-aligned strand bitmasks.
+    """
+    if sys.byteorder != "little":
+        raise OSError("binary block index requires a little-endian host")
+    contigs = sorted(store.keys())
+    table = []
+    row = bits = 0
+    for c in contigs:
+        n = len(store[c])
+        table.append([c, row, n, bits])
+        row += n
+        bits += (n + 7) // 8
+    prefix = index_prefix(path, table, store.names_b, row, source)
+
+    def write(f):
+        f.write(prefix)
+        for name in ("startA", "endA", "startB", "endB", "contigB", "mapq", "strand_bits"):
+            for c in contigs:
+                f.write(getattr(store[c], name))
+
+    write_atomic(path, write)
+
+
+class IndexWriter:
+    """Write a binary index from blocks streamed in index order, in bounded memory.
+
+    Blocks must arrive grouped by contigA in ascending name order and sorted by
+    startA within each contig (the order write_index lays them out in). Each
+    column is spooled to its own temporary file and the spools are copied
+    behind the header by close(). names_b may preset the genome-B name table.
+    """
+
+    COLUMNS = (("startA", "q"), ("endA", "q"), ("startB", "q"), ("endB", "q"), ("contigB", "I"), ("mapq", "B"))
+
+    def __init__(self, path, names_b=(), tmp_dir=None, flush_rows=1 << 16):
+        if sys.byteorder != "little":
+            raise OSError("binary block index requires a little-endian host")
+        self.path = path
+        self.names_b = list(names_b)
+        self._name_ids = {name: i for i, name in enumerate(self.names_b)}
+        self.flush_rows = flush_rows
+        self._spools = {name: tempfile.TemporaryFile(dir=tmp_dir) for name, _ in self.COLUMNS}
+        self._spools["strand_bits"] = tempfile.TemporaryFile(dir=tmp_dir)
+        self._cols = {name: array(typecode) for name, typecode in self.COLUMNS}
+        self.table = []
+        self.n_rows = 0
+        self._contig = None
+        self._count = 0
+        self._bits = bytearray()
+        self._bits_offset = 0
+
+    def add(self, contigA, startA, endA, contigB, startB, endB, strand, mapq):
+        """Append one block; mapq is clamped to 255 as in BlockStoreBuilder."""
+        if contigA != self._contig:
+            if self._contig is not None and contigA < self._contig:
+                raise ValueError(f"IndexWriter: contig {contigA!r} arrived after {self._contig!r}")
+            self._end_contig()
+            self._contig = contigA
+        name_id = self._name_ids.get(contigB)
+        if name_id is None:
+            name_id = self._name_ids[contigB] = len(self.names_b)
+            self.names_b.append(contigB)
+        cols = self._cols
+        cols["startA"].append(startA)
+        cols["endA"].append(endA)
+        cols["startB"].append(startB)
+        cols["endB"].append(endB)
+        cols["contigB"].append(name_id)
+        cols["mapq"].append(min(mapq, 255))
+        i = self._count
+        if i & 7 == 0:
+            self._bits.append(0)
+        if strand != "+":
+            self._bits[-1] |= 1 << (i & 7)
+        self._count += 1
+        if len(cols["startA"]) >= self.flush_rows:
+            self._flush()
+
+    def _flush(self):
+        for name, col in self._cols.items():
+            col.tofile(self._spools[name])
+            del col[:]
+
+    def _end_contig(self):
+        if self._contig is None:
+            return
+        self.table.append([self._contig, self.n_rows, self._count, self._bits_offset])
+        self.n_rows += self._count
+        self._bits_offset += len(self._bits)
+        self._spools["strand_bits"].write(self._bits)
+        self._count = 0
+        self._bits = bytearray()
+
+    def close(self, source=None):
+        """Finish the index and move it into place; return the number of blocks."""
+        self._end_contig()
+        self._contig = None
+        self._flush()
+        prefix = index_prefix(self.path, self.table, self.names_b, self.n_rows, source)
+
+        def write(f):
+            f.write(prefix)
+            for name in [name for name, _ in self.COLUMNS] + ["strand_bits"]:
+                spool = self._spools[name]
+                spool.seek(0)
+                shutil.copyfileobj(spool, f, 1 << 20)
+
+        try:
+            write_atomic(self.path, write)
+        finally:
+            for spool in self._spools.values():
+                spool.close()
+        return self.n_rows
+
+
+def read_index_header(path):
+    """Return (header fields tuple, meta dict) of a binary index without mapping the columns."""
+    with open(path, "rb") as f:
+        fields = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+        if fields[0] != INDEX_MAGIC:
+            raise ValueError(f"{path}: not a block index")
+        if fields[1] != INDEX_VERSION:
+            raise ValueError(f"{path}: unsupported block index version {fields[1]}")
+        meta = json.loads(f.read(fields[2]))
+    return fields, meta
+
+
+def is_index(path):
+    """Return True if path starts with the binary block index magic."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(INDEX_MAGIC)) == INDEX_MAGIC
+    except OSError:
+        return False
+
+
+def index_source(path, meta):
+    """Return the path of the TSV an index was compiled from, or None."""
+    if not meta.get("source"):
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(path)), meta["source"])
+
+
+def index_is_fresh(path, source):
+    """Return True if the index at path matches the current contents of source.
+
+    Size and mtime are compared first; if only the mtime differs (e.g. after a
+    checkout) the checksum decides, and a matching index has its mtime updated.
+    """
+    try:
+        fields, _ = read_index_header(path)
+    except (OSError, ValueError):
+        return False
+    _, _, _, _, _, size, mtime, digest = fields
+    st = os.stat(source)
+    if st.st_size != size:
+        return False
+    if st.st_mtime_ns == mtime:
+        return True
+    if file_sha256(source) != digest:
+        return False
+    try:
+        with open(path, "r+b") as f:
+            f.seek(INDEX_HEADER.size - 32 - 8)
+            f.write(struct.pack("<Q", st.st_mtime_ns))
+    except OSError:
+        pass
+    return True
+
+
+def open_index(path):
+    """Open a binary block index with mmap and return a read-only BlockStore over it."""
+    fields, meta = read_index_header(path)
+    if sys.byteorder != "little":
+        raise OSError("binary block index requires a little-endian host")
+    source = index_source(path, meta)
+    if source and os.path.exists(source):
+        st = os.stat(source)
+        if st.st_size != fields[5] or st.st_mtime_ns > fields[6]:
+            print(f"Warning: {source} is newer than its index {path}; run compile_blocks.py", file=sys.stderr)
+    n = fields[4]
+    data_offset = fields[3]
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    buf = memoryview(mm)
+    offsets = {}
+    pos = data_offset
+    for name, itemsize in (("startA", 8), ("endA", 8), ("startB", 8), ("endB", 8), ("contigB", 4), ("mapq", 1)):
+        offsets[name] = (pos, itemsize)
+        pos += n * itemsize
+    bits_offset = pos
+    store = BlockStore()
+    store.names_b = meta["names_b"]
+    store.buffer = mm
+    fmt = {8: "q", 4: "I", 1: "B"}
+    for contigA, row, count, bits in meta["contigs"]:
+        cols = {}
+        for name, (base, itemsize) in offsets.items():
+            start = base + row * itemsize
+            cols[name] = buf[start:start + count * itemsize].cast(fmt[itemsize])
+        strand_bits = buf[bits_offset + bits:bits_offset + bits + (count + 7) // 8]
+        store[contigA] = ContigBlocks.from_buffers(contigA, store.names_b, strand_bits=strand_bits, **cols)
+    return store
+
+
+def find_block(blocks, pos):
+    """Binary search to find the block containing pos in genome A; return its index or None.
+
+    Disjoint contigs bisect startA directly. Where blocks overlap, the search
+    stops at the first containing block it meets, which is the block every
+    tool has always picked.
+    """
+    startA, endA = blocks.startA, blocks.endA
+    if blocks.disjoint():
+        i = bisect_right(startA, pos) - 1
+        return i if i >= 0 and pos < endA[i] else None
+    lo, hi = 0, len(startA)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if pos < startA[mid]:
+            hi = mid
+        elif pos >= endA[mid]:
+            lo = mid + 1
+        else:
+            return mid
+    return None
+
+
+def is_disjoint(blocks):
+    """Return True if a contig's blocks do not overlap in A (so endA is sorted too)."""
+    startA, endA = blocks.startA, blocks.endA
+    return all(endA[i] <= startA[i + 1] for i in range(len(startA) - 1))
+
+
+def build_interval_tree(endA):
+    """Augment blocks sorted by startA into an implicit interval tree; return the max-end array.
+
+    Block i is a node at level k, where k is the number of trailing 1 bits of
+    i; its children are i -/+ 2**(k-1) and the root is 2**max_level - 1. The
+    array holds the largest endA in each node's subtree. Nodes past the end of
+    the array inherit the maximum of the last real subtree (as in cgranges).
+    """
+    n = len(endA)
+    max_end = array("q", endA)
+    if n == 0:
+        return max_end
+    last_i = (n - 1) & ~1
+    last = max_end[last_i]
+    k = 1
+    while 1 << k <= n:
+        x = 1 << (k - 1)
+        for i in range((x << 1) - 1, n, x << 2):
+            right = max_end[i + x] if i + x < n else last
+            max_end[i] = max(endA[i], max_end[i - x], right)
+        last_i = last_i - x if (last_i >> k) & 1 else last_i + x
+        if last_i < n and max_end[last_i] > last:
+            last = max_end[last_i]
+        k += 1
+    return max_end
+
+
+def find_overlaps(blocks, start, end):
+    """Return the indices of all blocks overlapping [start, end) in genome A, in startA order.
+
+    Contigs whose blocks are disjoint use a binary search on endA; otherwise
+    the interval tree is descended (see overlap_indices).
+    """
+    return overlap_indices(blocks.startA, blocks.endA, blocks.interval_tree(), start, end)
+
+
+def overlap_indices(starts, ends, tree, start, end):
+    """Return the indices of the ranges overlapping [start, end), in start order.
+
+    starts/ends are sorted by start; tree is their max-end array from
+    build_interval_tree, or None if the ranges are disjoint (ends sorted too).
+    Without a tree, a binary search on ends finds the first hit; with one, the
+    tree is descended, skipping subtrees whose max end is <= start. Both take
+    O(log n + k) for k hits.
+    """
+    n = len(starts)
+    hits = []
+    if tree is None:
+        i = bisect_right(ends, start)
+        while i < n and starts[i] < end:
+            hits.append(i)
+            i += 1
+        return hits
+    if n == 0:
+        return hits
+    level = n.bit_length() - 1
+    stack = [(level, (1 << level) - 1, False)]
+    while stack:
+        k, x, left_done = stack.pop()
+        if k <= 3:
+            # Small subtree: scan its index range linearly.
+            i = x >> k << k
+            stop = min(i + (1 << (k + 1)) - 1, n)
+            while i < stop and starts[i] < end:
+                if start < ends[i]:
+                    hits.append(i)
+                i += 1
+        elif not left_done:
+            stack.append((k, x, True))
+            y = x - (1 << (k - 1))
+            if y >= n or tree[y] > start:
+                stack.append((k - 1, y, False))
+        elif x < n and starts[x] < end:
+            if start < ends[x]:
+                hits.append(x)
+            stack.append((k - 1, x + (1 << (k - 1)), False))
+    return hits
+
+
+class ReverseBlocks:
+    """Blocks of an A→B store whose image lies on one genome-B contig, sorted by startB.
+
+    Each entry refers back to block idx[i] of contig names_a[contigA[i]], so
+    the index adds four small columns instead of a second copy of the map.
+    tree is the max-endB array of the implicit interval tree, or None when
+    the images are disjoint on B.
+    """
+
+    __slots__ = ("contigB", "startB", "endB", "contigA", "idx", "names_a", "tree")
+
+    def __len__(self):
+        return len(self.startB)
+
+
+def build_reverse_index(store):
+    """Index the blocks of an A→B store by genome-B position; return {contigB: ReverseBlocks}.
+
+    Images are sorted by (startB, endB); blocks with the same image keep the
+    store's order. Takes O(n log n) for n blocks.
+    """
+    names_a = list(store)
+    images = {}
+    for a_id, (contigA, cb) in enumerate(store.items()):
+        names_b, contigB, startB, endB = cb.names_b, cb.contigB, cb.startB, cb.endB
+        for i in range(len(cb)):
+            images.setdefault(names_b[contigB[i]], []).append((startB[i], endB[i], a_id, i))
+    index = {}
+    for contigB, rows in images.items():
+        rows.sort(key=lambda r: r[:2])
+        rb = ReverseBlocks()
+        rb.contigB = contigB
+        rb.names_a = names_a
+        rb.startB = array("q", [r[0] for r in rows])
+        rb.endB = array("q", [r[1] for r in rows])
+        rb.contigA = array("I", [r[2] for r in rows])
+        rb.idx = array("I", [r[3] for r in rows])
+        disjoint = all(rb.endB[i] <= rb.startB[i + 1] for i in range(len(rows) - 1))
+        rb.tree = None if disjoint else build_interval_tree(rb.endB)
+        index[contigB] = rb
+    return index
+
+
+def image_range(blocks, idx, startB, endB):
+    """Return the genome-A range (startA, endA) that block idx maps onto [startB, endB) of its image."""
+    sA, sB, eB = blocks.startA[idx], blocks.startB[idx], blocks.endB[idx]
+    if blocks.is_minus(idx):
+        return sA + (eB - endB), sA + (eB - startB)
+    return sA + (startB - sB), sA + (endB - sB)
+
+
+def map_point(blocks, idx, posA):
+    """Map a single position on genome A to genome B using block idx."""
+    startA = blocks.startA[idx]
+    offset = posA - startA
+    if blocks.is_minus(idx):
+        length = blocks.endA[idx] - startA
+        return blocks.contig_b(idx), blocks.startB[idx] + (length - 1 - offset), "-"
+    return blocks.contig_b(idx), blocks.startB[idx] + offset, "+"
+
+
+def split_interval(blocks, startA, endA):
+    """Split [startA, endA) at block boundaries.
+
+    Returns a list of (a, a_end, contigB, startB, endB, strand) pieces in A order;
+    stretches outside every block are coalesced into one piece with contigB None,
+    stepping straight to the next block start instead of base by base.
+    """
+    pieces = []
+    a = startA
+    while a < endA:
+        idx = find_block(blocks, a)
+        if idx is None:
+            nxt = bisect_right(blocks.startA, a)
+            a_end = min(endA, blocks.startA[nxt]) if nxt < len(blocks) else endA
+            pieces.append((a, a_end, None, None, None, None))
+            a = a_end
+            continue
+        a_end = min(endA, blocks.endA[idx])
+        contigB, b_start, strand = map_point(blocks, idx, a)
+        _, b_end_minus1, _ = map_point(blocks, idx, a_end - 1)
+        pieces.append((a, a_end, contigB, b_start, b_end_minus1 + 1, strand))
+        a = a_end
+    return pieces
+
+
+def stitch_interval(blocks, startA, endA):
+    """Map an inclusive 0-based interval across blocks like the web app's stitchInterval.
+
+    Returns (status, contigB, startB, endB, strand, idx_start, idx_end) with status
+    "OK", "UNMAPPED", "CONTIG" or "STRAND"; B coordinates are 0-based inclusive.
+    """
+    if startA > endA:
+        startA, endA = endA, startA
+    idx_start = find_block(blocks, startA)
+    idx_end = find_block(blocks, endA)
+    if idx_start is None or idx_end is None:
+        return ("UNMAPPED", None, None, None, None, idx_start, idx_end)
+    contigB, sB, strand = map_point(blocks, idx_start, startA)
+    _, eB, _ = map_point(blocks, idx_end, endA)
+    for i in range(idx_start, idx_end):
+        if blocks.contigB[i] != blocks.contigB[idx_start]:
+            return ("CONTIG", None, None, None, None, idx_start, idx_end)
+        if blocks.is_minus(i) != blocks.is_minus(idx_start):
+            return ("STRAND", None, None, None, None, idx_start, idx_end)
+    return ("OK", contigB, min(sB, eB), max(sB, eB), strand, idx_start, idx_end)
+
+
+def collect_gaps(blocks, idx_start, idx_end):
+    """List gaps, overlaps and contig/strand changes between consecutive blocks, as in the web app.
+
+    Each gap is a dict with a "type" key; reported positions are 1-based.
+    """
+    gaps = []
+    target_minus = blocks.is_minus(idx_start)
+    for i in range(idx_start, idx_end):
+        j = i + 1
+        if blocks.contigB[i] != blocks.contigB[j]:
+            gaps.append({"type": "CONTIG_CHANGE", "contigPrev": blocks.contig_b(i), "contigNext": blocks.contig_b(j)})
+        if blocks.is_minus(i) != blocks.is_minus(j):
+            gaps.append({"type": "STRAND_CHANGE", "strandPrev": blocks.strand(i), "strandNext": blocks.strand(j)})
+        gap_a = max(0, blocks.startA[j] - blocks.endA[i])
+        if gap_a > 0:
+            gaps.append({"type": "GAP_A", "sizeA": gap_a, "aStart": blocks.endA[i] + 1, "aEnd": blocks.startA[j]})
+        b_end = map_point(blocks, i, blocks.endA[i] - 1)[1]
+        b_start_next = map_point(blocks, j, blocks.startA[j])[1]
+        if not target_minus:
+            gap_b = max(0, b_start_next - b_end - 1)
+            ovl_b = max(0, b_end - b_start_next + 1)
+            if gap_b > 0:
+                gaps.append({"type": "GAP_B", "sizeB": gap_b, "bStart": b_end + 2, "bEnd": b_start_next})
+            if ovl_b > 0:
+                gaps.append({"type": "OVERLAP_B", "sizeB": ovl_b, "bStart": b_start_next + 1, "bEnd": b_end + 1})
+        else:
+            gap_b = max(0, b_end - b_start_next - 1)
+            ovl_b = max(0, b_start_next - b_end + 1)
+            if gap_b > 0:
+                lo, hi = b_start_next + 1, b_end - 1
+                gaps.append({"type": "GAP_B", "sizeB": gap_b, "bStart": min(lo, hi) + 1, "bEnd": max(lo, hi) + 1})
+            if ovl_b > 0:
+                gaps.append({
+                    "type": "OVERLAP_B",
+                    "sizeB": ovl_b,
+                    "bStart": min(b_start_next, b_end) + 1,
+                    "bEnd": max(b_start_next, b_end) + 1,
+                })
+    return gaps
+
+
+def format_gaps(gaps):
+    """Format a gap list as the web app's semicolon-separated summary."""
+    out = []
+    for g in gaps:
+        t = g["type"]
+        if t == "GAP_A":
+            out.append(f"GAP_A:{g['sizeA']}@A:{g['aStart']}→{g['aEnd']}")
+        elif t == "GAP_B":
+            out.append(f"GAP_B:{g['sizeB']}@B:{g['bStart']}→{g['bEnd']}")
+        elif t == "OVERLAP_B":
+            out.append(f"OVERLAP_B:{g['sizeB']}@B:{g['bStart']}→{g['bEnd']}")
+        elif t == "CONTIG_CHANGE":
+            out.append(f"CONTIG_CHANGE@B:{g['contigPrev']}→{g['contigNext']}")
+        elif t == "STRAND_CHANGE":
+            out.append(f"STRAND_CHANGE@B:{g['strandPrev']}→{g['strandNext']}")
+        else:
+            out.append(t)
+    return "; ".join(out)
+
+
+def load_block_dicts(path):
+    """Load a blocks TSV as one dict per block (the pre-columnar representation)."""
+    by_contig = {}
+    with open(path) as f:
+        f.readline()
+        for line in f:
+            contigA, startA, endA, contigB, startB, endB, strand, mapq = line.rstrip().split("\t")
+            b = {
+                "contigA": contigA,
+                "startA": int(startA),
+                "endA": int(endA),
+                "contigB": contigB,
+                "startB": int(startB),
+                "endB": int(endB),
+                "strand": strand,
+                "mapq": int(mapq),
+            }
+            by_contig.setdefault(contigA, []).append(b)
+    for c in by_contig:
+        by_contig[c].sort(key=lambda b: b["startA"])
+    return by_contig
+
+
+def measure_footprint(loader, path):
+    """Return (object, bytes allocated, seconds) for loading path with loader.
+
+    Time is taken from an untraced load, since tracemalloc slows allocation.
+    """
+    t0 = time.perf_counter()
+    loader(path)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    obj = loader(path)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current, elapsed
+
+
+def parse_args():
+    """Parse command-line arguments for the block store memory report."""
+    p = argparse.ArgumentParser(
+        description="Compare memory footprint and load time of the columnar block store against dict-per-block.",
+    )
+    p.add_argument("map", help="Blocks TSV file")
+    return p.parse_args()
+
+
+def main():
+    """Entry point: print a memory footprint comparison for one blocks TSV."""
+    args = parse_args()
+    dicts, dict_bytes, dict_s = measure_footprint(load_block_dicts, args.map)
+    n = sum(len(v) for v in dicts.values())
+    del dicts
+    store, store_bytes, store_s = measure_footprint(load_blocks, args.map)
+    print(f"blocks={n} contigsA={len(store)} contigsB={len(store.names_b)}", file=sys.stderr)
+    for label, nbytes, secs in (("dict", dict_bytes, dict_s), ("columnar", store_bytes, store_s)):
+        per_block = nbytes / n if n else 0.0
+        print(f"{label}\tbytes={nbytes}\tbytes_per_block={per_block:.1f}\tload_s={secs:.3f}", file=sys.stderr)
+    if store_bytes:
+        print(f"ratio={dict_bytes / store_bytes:.1f}x", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Build the compact binary maps and content-hashed manifest loaded by web/app.js.
+
+Each web/data/<pair>/<name>.blocks.tsv becomes <name>.<hash>.bin next to it,
+where <hash> is the start of the file's SHA-256. Because the name changes
+whenever the contents do, the web app can cache the files forever. It
+fetches only web/data/manifest.json fresh, which maps each TSV path (as
+written in GENOME_PAIRS) to its binary file, and falls back to the TSV when
+a map is missing from it.
+
+    python3 cli/build_web_maps.py            # after changing any web/data map
+    python3 cli/build_web_maps.py --check    # exit 1 if the manifest is stale
+
+File layout (little-endian, every column aligned to its item size):
+
+    8s magic, u32 version, u32 meta length
+    meta JSON {"contigs": [[contigA, n_blocks], ...], "names_b": [...]}, padded to 4 bytes
+    u32 startA, as deltas from the previous block of the same contig
+    u32 endA - startA
+    u32 startB
+    i32 (endB - startB) - (endA - startA), zero for ungapped blocks
+    u16 genome-B contig id (into names_b)
+    u8  mapq
+    u8  strand (1 = "-")
+
+Contigs are stored in sorted name order and blocks in startA order, so the
+app can take every column of a contig as a subarray without sorting.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+
+from blockstore import BlockStoreBuilder, read_blocks_tsv, write_atomic
+
+WEB_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "web"))
+WEB_MAP_MAGIC = b"LOWEBMAP"
+WEB_MAP_VERSION = 1
+WEB_MAP_HEADER = struct.Struct("<8sII")
+MANIFEST_NAME = "manifest.json"
+HASH_CHARS = 12
+MAX_COORD = (1 << 32) - 1
+
+
+def parse_args():
+    """Parse command-line arguments for building the web maps."""
+    p = argparse.ArgumentParser(
+        description="Encode web/data/*/*.blocks.tsv as compact binary maps and write a content-hashed manifest.",
+    )
+    p.add_argument("--web-dir", default=WEB_DIR, help="Web app directory holding data/ (default: web/)")
+    p.add_argument("--check", action="store_true", help="Only verify that the manifest and binary maps are up to date")
+    return p.parse_args()
+
+
+def encode_web_map(store):
+    """Encode a BlockStore in the binary web map layout; return the file contents as bytes."""
+    contigs = sorted(store)
+    names_b = store.names_b
+    if len(names_b) > 0xFFFF:
+        raise ValueError(f"{len(names_b)} genome-B contigs do not fit the 16-bit contig ids")
+    meta = json.dumps({"contigs": [[c, len(store[c])] for c in contigs], "names_b": names_b}).encode()
+    meta += b" " * (-len(meta) % 4)
+    delta_a, len_a, start_b, dlen_b = array("I"), array("I"), array("I"), array("i")
+    contig_b, mapq, minus = array("H"), array("B"), array("B")
+    for c in contigs:
+        cb = store[c]
+        prev = 0
+        for i in range(len(cb)):
+            sA, eA, sB, eB = cb.startA[i], cb.endA[i], cb.startB[i], cb.endB[i]
+            if max(eA, eB) > MAX_COORD:
+                raise ValueError(f"{c}:{sA}-{eA} is beyond the 32-bit coordinates of the web map format")
+            delta_a.append(sA - prev)
+            len_a.append(eA - sA)
+            start_b.append(sB)
+            dlen_b.append((eB - sB) - (eA - sA))
+            prev = sA
+        contig_b.fromlist(list(cb.contigB))
+        mapq.fromlist(list(cb.mapq))
+        minus.extend(cb.is_minus(i) for i in range(len(cb)))
+    cols = (delta_a, len_a, start_b, dlen_b, contig_b, mapq, minus)
+    if sys.byteorder != "little":
+        for col in cols:
+            col.byteswap()
+    header = WEB_MAP_HEADER.pack(WEB_MAP_MAGIC, WEB_MAP_VERSION, len(meta))
+    return b"".join([header, meta] + [col.tobytes() for col in cols])
+
+
+def decode_web_map(data):
+    """Decode binary web map bytes back into a BlockStore (the inverse of encode_web_map)."""
+    magic, version, meta_len = WEB_MAP_HEADER.unpack_from(data)
+    if magic != WEB_MAP_MAGIC or version != WEB_MAP_VERSION:
+        raise ValueError(f"not a version {WEB_MAP_VERSION} web map")
+    offset = WEB_MAP_HEADER.size
+    meta = json.loads(data[offset:offset + meta_len])
+    offset += meta_len
+    n = sum(count for _, count in meta["contigs"])
+    cols = []
+    for code in "IIIiHBB":
+        col = array(code)
+        col.frombytes(data[offset:offset + n * col.itemsize])
+        if sys.byteorder != "little":
+            col.byteswap()
+        cols.append(col)
+        offset += n * col.itemsize
+    delta_a, len_a, start_b, dlen_b, contig_b, mapq, minus = cols
+    names_b = meta["names_b"]
+    builder = BlockStoreBuilder()
+    row = 0
+    for contigA, count in meta["contigs"]:
+        start = 0
+        for i in range(row, row + count):
+            start += delta_a[i]
+            end = start + len_a[i]
+            end_b = start_b[i] + len_a[i] + dlen_b[i]
+            builder.add(contigA, start, end, names_b[contig_b[i]], start_b[i], end_b, "-" if minus[i] else "+", mapq[i])
+        row += count
+    return builder.finish()
+
+
+def web_map_path(tsv_path, digest):
+    """Return the binary map path for a blocks TSV and content digest."""
+    base = tsv_path[: -len(".blocks.tsv")]
+    return f"{base}.{digest[:HASH_CHARS]}.bin"
+
+
+def stale_binaries(tsv_path, keep):
+    """Return binary maps left next to tsv_path by earlier builds (any hash other than keep)."""
+    base = tsv_path[: -len(".blocks.tsv")]
+    return [p for p in glob.glob(glob.escape(base) + ".*.bin") if p != keep]
+
+
+def build_manifest(web_dir, write=True):
+    """Encode every web/data map; return (manifest dict, files written or out of date).
+
+    With write=False nothing is written; the second value lists what a build would change.
+    """
+    maps = {}
+    changed = []
+    for tsv in sorted(glob.glob(os.path.join(web_dir, "data", "*", "*.blocks.tsv"))):
+        store = read_blocks_tsv(tsv).finish()
+        data = encode_web_map(store)
+        digest = hashlib.sha256(data).hexdigest()
+        path = web_map_path(tsv, digest)
+        with open(tsv, "rb") as f:
+            source_digest = hashlib.sha256(f.read()).hexdigest()
+        maps[os.path.relpath(tsv, web_dir).replace(os.sep, "/")] = {
+            "file": os.path.relpath(path, web_dir).replace(os.sep, "/"),
+            "sha256": digest,
+            "source_sha256": source_digest,
+            "blocks": store.n_blocks(),
+            "bytes": len(data),
+            "source_bytes": os.path.getsize(tsv),
+        }
+        if not os.path.exists(path):
+            changed.append(path)
+            if write:
+                write_atomic(path, lambda f: f.write(data))
+        for old in stale_binaries(tsv, path):
+            changed.append(old)
+            if write:
+                os.remove(old)
+    return {"version": WEB_MAP_VERSION, "maps": maps}, changed
+
+
+def main():
+    """Entry point: build or check the web maps and manifest."""
+    args = parse_args()
+    manifest, changed = build_manifest(args.web_dir, write=not args.check)
+    text = json.dumps(manifest, indent=1, sort_keys=True) + "\n"
+    manifest_path = os.path.join(args.web_dir, "data", MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            current = f.read()
+    except FileNotFoundError:
+        current = None
+    if current != text:
+        changed.append(manifest_path)
+    if args.check:
+        for path in changed:
+            print(f"STALE {path}", file=sys.stderr)
+        print(f"{manifest_path}: {'STALE' if changed else 'OK'}", file=sys.stderr)
+        sys.exit(1 if changed else 0)
+    if current != text:
+        write_atomic(manifest_path, lambda f: f.write(text.encode()))
+    for key, entry in manifest["maps"].items():
+        print(f"{key} -> {entry['file']} blocks={entry['blocks']} bytes={entry['bytes']} (tsv {entry['source_bytes']})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
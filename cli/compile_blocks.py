@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+
+from blockstore import (
+    INDEX_SUFFIX,
+    file_sha256,
+    index_source,
+    read_blocks_tsv,
+    read_index_header,
+    write_index,
+)
+from xopen import is_stdio
+
+
+def parse_args():
+    """Parse command-line arguments for compiling a blocks TSV into a binary index."""
+    p = argparse.ArgumentParser(
+        description=(
+            "Compile a blocks TSV into a versioned binary index that liftover.py and roundtrip_test.py open with mmap.\n"
+            "An index named <blocks.tsv>.idx is picked up automatically when the TSV is given."
+        ),
+    )
+    p.add_argument("blocks", help="Input blocks TSV or chain file (plain or gzip; '-' for stdin requires -o)")
+    p.add_argument("-o", "--output", help=f"Output index path (default: <blocks>{INDEX_SUFFIX})")
+    p.add_argument("--check", action="store_true", help="Verify an existing index against the TSV checksum instead of compiling")
+    return p.parse_args()
+
+
+def compile_blocks(tsv_path, index_path):
+    """Parse a blocks TSV and write its binary index; return the number of blocks."""
+    store = read_blocks_tsv(tsv_path).finish()
+    write_index(store, index_path, None if is_stdio(tsv_path) else tsv_path)
+    return store.n_blocks()
+
+
+def check_index(tsv_path, index_path):
+    """Return True if the index header checksum matches the TSV contents."""
+    fields, meta = read_index_header(index_path)
+    source = index_source(index_path, meta)
+    if source is None:
+        print(f"{index_path}: no source recorded", file=sys.stderr)
+        return False
+    return fields[7] == file_sha256(tsv_path)
+
+
+def main():
+    """Entry point: compile or verify a binary block index."""
+    args = parse_args()
+    if is_stdio(args.blocks) and (args.check or not args.output):
+        sys.exit("error: reading blocks from stdin requires -o and cannot be combined with --check")
+    index_path = args.output or args.blocks + INDEX_SUFFIX
+    if args.check:
+        ok = check_index(args.blocks, index_path)
+        print(f"{index_path}: {'OK' if ok else 'STALE'}", file=sys.stderr)
+        sys.exit(0 if ok else 1)
+    n = compile_blocks(args.blocks, index_path)
+    print(f"blocks={n} index={index_path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Sweep-line composition of two block maps (A→B then B→C).
+
+The genome-B images of the A→B blocks are sorted per B contig and swept
+against the B→C blocks, which are already sorted by start. Every overlap of
+an image with a B→C block becomes one composed A→C piece; stretches of an
+image that no B→C block covers are reported with contigC None. Blocks are
+ungapped, so a piece is fully described by its A and C ranges and a strand,
+which is "+" when both steps have the same strand and "-" when exactly one
+of them flips. The sweep takes O((n + m) log n + k) for n A→B blocks, m B→C
+blocks and k pieces.
+"""
+from blockstore import image_range
+
+
+def images_by_contig(store):
+    """Group the blocks of a store by genome-B contig as (startB, endB, contigA, idx), sorted by startB."""
+    images = {}
+    for contigA, cb in store.items():
+        names_b, contigB, startB, endB = cb.names_b, cb.contigB, cb.startB, cb.endB
+        for i in range(len(cb)):
+            images.setdefault(names_b[contigB[i]], []).append((startB[i], endB[i], contigA, i))
+    for rows in images.values():
+        rows.sort(key=lambda r: r[:2])
+    return images
+
+
+def compose_piece(ab, i, bc, j, x, y):
+    """Compose B range [x, y) of A→B block i with B→C block j; return (startA, endA, contigC, startC, endC, strand, mapq)."""
+    a, a_end = image_range(ab, i, x, y)
+    sC, s2, e2 = bc.startB[j], bc.startA[j], bc.endA[j]
+    if bc.is_minus(j):
+        c, c_end = sC + (e2 - y), sC + (e2 - x)
+    else:
+        c, c_end = sC + (x - s2), sC + (y - s2)
+    strand = "-" if ab.is_minus(i) != bc.is_minus(j) else "+"
+    return a, a_end, bc.contig_b(j), c, c_end, strand, min(ab.mapq[i], bc.mapq[j])
+
+
+def uncovered_piece(ab, i, x, y):
+    """Return the A range of B range [x, y) of A→B block i as an unmapped piece."""
+    return image_range(ab, i, x, y) + (None, None, None, None, None)
+
+
+def compose_pieces(store_ab, store_bc):
+    """Yield (contigA, startA, endA, contigC, startC, endC, strand, mapq) pieces of A→B composed with B→C.
+
+    Pieces come grouped by B contig in B order, not in A order. Parts of the
+    A→B blocks that no B→C block covers are yielded with contigC (and the
+    other C fields) None. Where B→C blocks overlap, a B base yields one
+    piece per covering block.
+    """
+    for contigB, images in images_by_contig(store_ab).items():
+        bc = store_bc.get(contigB)
+        if not bc:
+            for sB, eB, contigA, i in images:
+                yield (contigA,) + uncovered_piece(store_ab[contigA], i, sB, eB)
+            continue
+        startA, endA, n = bc.startA, bc.endA, len(bc)
+        j = 0
+        active = []
+        for sB, eB, contigA, i in images:
+            ab = store_ab[contigA]
+            # Images arrive by start, so blocks ending at or before sB are done for good.
+            while j < n and startA[j] < eB:
+                active.append(j)
+                j += 1
+            if any(endA[k] <= sB for k in active):
+                active = [k for k in active if endA[k] > sB]
+            cursor = sB
+            for k in active:
+                if startA[k] >= eB:
+                    break
+                x, y = max(sB, startA[k]), min(eB, endA[k])
+                if x > cursor:
+                    yield (contigA,) + uncovered_piece(ab, i, cursor, x)
+                yield (contigA,) + compose_piece(ab, i, bc, k, x, y)
+                cursor = max(cursor, y)
+            if cursor < eB:
+                yield (contigA,) + uncovered_piece(ab, i, cursor, eB)
+
+
+def merge_adjacent(rows):
+    """Merge consecutive block rows that continue each other in both genomes; rows must be sorted by (contigA, startA).
+
+    Rows merge when contigs, strand and mapq agree and the second row starts
+    where the first ends, on A and on C (on C going downwards for "-").
+    """
+    prev = None
+    for row in rows:
+        if prev is not None:
+            cA, a, a_end, cC, c, c_end, strand, mapq = prev
+            if (
+                row[0] == cA
+                and row[1] == a_end
+                and row[3] == cC
+                and row[6] == strand
+                and row[7] == mapq
+                and (row[4] == c_end if strand == "+" else row[5] == c)
+            ):
+                if strand == "+":
+                    prev = (cA, a, row[2], cC, c, row[5], strand, mapq)
+                else:
+                    prev = (cA, a, row[2], cC, row[4], c_end, strand, mapq)
+                continue
+            yield prev
+        prev = row
+    if prev is not None:
+        yield prev
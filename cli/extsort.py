@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""External merge sort shared by the CLI tools.
+
+Records (any picklable tuples) are buffered up to max_records, sorted, and
+spilled to temporary files as runs; the runs are then merged with a k-way
+heapq.merge. Inputs that fit in one run never touch the disk. The sort is
+stable: runs hold consecutive input records and heapq.merge prefers earlier
+runs on ties, so equal keys keep their input order.
+"""
+import heapq
+import pickle
+import tempfile
+
+DEFAULT_MAX_RECORDS = 1_000_000
+# Records per pickled batch inside a run; the merge holds one batch per run in memory.
+RUN_BATCH = 512
+
+
+def spill_run(records, tmp_dir=None):
+    """Write sorted records to an anonymous temporary file in pickled batches; return the file."""
+    f = tempfile.TemporaryFile(dir=tmp_dir)
+    for i in range(0, len(records), RUN_BATCH):
+        pickle.dump(records[i:i + RUN_BATCH], f, pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+
+def read_run(f):
+    """Yield the records of a spilled run."""
+    while True:
+        try:
+            batch = pickle.load(f)
+        except EOFError:
+            return
+        yield from batch
+
+
+def external_sort(records, key=None, max_records=DEFAULT_MAX_RECORDS, tmp_dir=None, stats=None):
+    """Yield records sorted by key, holding at most max_records in memory at a time.
+
+    If stats is a dict, the number of spilled runs is stored under "runs".
+    """
+    buffer = []
+    runs = []
+    try:
+        for record in records:
+            buffer.append(record)
+            if len(buffer) >= max_records:
+                buffer.sort(key=key)
+                runs.append(spill_run(buffer, tmp_dir))
+                buffer = []
+        buffer.sort(key=key)
+        if runs and buffer:
+            runs.append(spill_run(buffer, tmp_dir))
+            buffer = []
+        if stats is not None:
+            stats["runs"] = len(runs)
+        if not runs:
+            yield from buffer
+            return
+        yield from heapq.merge(*(read_run(f) for f in runs), key=key)
+    finally:
+        for f in runs:
+            f.close()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""Build A_to_B / B_to_A block maps for one or more genome pairs.
+
+For each pair, the aligner's PAF output is piped straight into
+paf_to_blocks.py, so no PAF file is written. B_to_A is derived by inverting
+A_to_B with blocks_invert.py. With --align-ba it comes from a second B → A
+alignment instead, and the two alignments run at the same time. Pairs are
+built by up to --jobs workers.
+
+A finished pair records a cache key in <out_dir>/build.json. The key covers
+the SHA-256 of both FASTA files, the aligner command line and version, and
+the build mode. A pair whose key is unchanged and whose maps exist is
+skipped; --force rebuilds it anyway. Maps are written to temporary files
+and renamed into place only when every step has succeeded.
+
+    python3 cli/generate_blocks.py genomeA.fa genomeB.fa web/data/a_b
+    python3 cli/generate_blocks.py --pairs pairs.tsv --jobs 3 --aligner /opt/bin/minimap2
+
+A pairs file lists one "genomeA.fa genomeB.fa out_dir" per line; blank lines
+and lines starting with # are skipped. The aligner is called as
+"<aligner> <--aligner-args> <target.fa> <query.fa>" and must write PAF with
+cg:Z CIGARs to stdout, so any executable with that interface (e.g. a stub
+in tests) can stand in for minimap2.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from blockstore import file_sha256
+
+CLI_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ALIGNER_ARGS = "-cx asm5 --secondary=no"
+BUILD_FILE = "build.json"
+# Bump when a change to the conversion or inversion changes the maps built from the same inputs.
+BUILD_VERSION = 1
+OUTPUTS = ("A_to_B.blocks.tsv", "B_to_A.blocks.tsv")
+
+
+def parse_args():
+    """Parse command-line arguments for the map-generation pipeline."""
+    p = argparse.ArgumentParser(
+        description="Align genome pairs and build their A_to_B / B_to_A block maps, skipping pairs whose inputs are unchanged.",
+    )
+    p.add_argument("pair", nargs="*", help="genomeA.fa genomeB.fa out_dir (one pair)")
+    p.add_argument("--pairs", help="File listing one 'genomeA.fa genomeB.fa out_dir' per line")
+    p.add_argument("--aligner", default=os.environ.get("MINIMAP2", "minimap2"), help="Aligner executable (default: $MINIMAP2 or minimap2 on PATH)")
+    p.add_argument("--aligner-args", default=DEFAULT_ALIGNER_ARGS, help=f"Aligner options before the FASTA paths (default: '{DEFAULT_ALIGNER_ARGS}')")
+    p.add_argument("--align-ba", action="store_true", help="Align B → A as well, concurrently, instead of inverting A_to_B")
+    p.add_argument("-j", "--jobs", type=int, default=1, help="Genome pairs built at the same time")
+    p.add_argument("--force", action="store_true", help="Rebuild pairs even when their cache key is unchanged")
+    return p.parse_args()
+
+
+def read_pairs(path):
+    """Read a pairs file; return a list of (genomeA, genomeB, out_dir), paths relative to the file."""
+    base = os.path.dirname(os.path.abspath(path))
+    pairs = []
+    with open(path) as f:
+        for n, line in enumerate(f, 1):
+            fields = shlex.split(line, comments=True)
+            if not fields:
+                continue
+            if len(fields) != 3:
+                raise ValueError(f"{path}:{n}: expected 'genomeA.fa genomeB.fa out_dir', got {line.strip()!r}")
+            pairs.append(tuple(os.path.join(base, p) for p in fields))
+    return pairs
+
+
+def aligner_version(aligner):
+    """Return the aligner's --version output, or "" if it has none."""
+    try:
+        proc = subprocess.run([aligner, "--version"], capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    return proc.stdout.strip() if proc.returncode == 0 else ""
+
+
+class FastaHashes:
+    """SHA-256 of FASTA files, computed once per file even when pairs share a genome."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def get(self, path):
+        """Return the hex digest of path's contents."""
+        key = os.path.realpath(path)
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry is None:
+                entry = self.pending[key] = {"event": threading.Event(), "digest": None}
+                owner = True
+            else:
+                owner = False
+        if owner:
+            try:
+                entry["digest"] = file_sha256(path).hex()
+            finally:
+                entry["event"].set()
+        else:
+            entry["event"].wait()
+        if entry["digest"] is None:
+            raise OSError(f"could not hash {path}")
+        return entry["digest"]
+
+
+def cache_key(hash_a, hash_b, aligner_cmd, version, align_ba):
+    """Return the cache key of a pair build."""
+    spec = {
+        "build_version": BUILD_VERSION,
+        "genome_a": hash_a,
+        "genome_b": hash_b,
+        "aligner": aligner_cmd,
+        "aligner_version": version,
+        "align_ba": align_ba,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest(), spec
+
+
+def is_cached(out_dir, key):
+    """Return True if out_dir holds maps built with cache key key."""
+    try:
+        with open(os.path.join(out_dir, BUILD_FILE)) as f:
+            recorded = json.load(f).get("key")
+    except (OSError, ValueError):
+        return False
+    return recorded == key and all(os.path.exists(os.path.join(out_dir, name)) for name in OUTPUTS)
+
+
+def start(cmd, **kwargs):
+    """Start cmd with stderr spooled to a temporary file (read by wait_all), so no stderr pipe can fill up."""
+    err = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stderr=err, **kwargs)
+    proc.err_file = err
+    return proc
+
+
+def start_alignment(aligner_cmd, target, query, out_path):
+    """Start aligner | paf_to_blocks.py writing out_path; return the two processes."""
+    align = start(aligner_cmd + [target, query], stdout=subprocess.PIPE)
+    convert = start([sys.executable, os.path.join(CLI_DIR, "paf_to_blocks.py"), "-", "-o", out_path], stdin=align.stdout)
+    align.stdout.close()  # the converter holds the read end; the aligner gets SIGPIPE if it exits
+    return align, convert
+
+
+def wait_all(procs):
+    """Wait for (label, process) pairs; raise RuntimeError listing the ones that failed with their last stderr lines."""
+    errors = []
+    for label, proc in procs:
+        proc.wait()
+        with proc.err_file as err:
+            if proc.returncode != 0:
+                err.seek(0)
+                tail = err.read().decode(errors="replace").strip().splitlines()[-5:]
+                errors.append(f"{label} exited with {proc.returncode}" + "".join(f"\n  {line}" for line in tail))
+    if errors:
+        raise RuntimeError("\n".join(errors))
+
+
+def build_pair(genome_a, genome_b, out_dir, args, aligner_cmd, version, hashes):
+    """Build (or skip) one pair; return a status line."""
+    t0 = time.perf_counter()
+    key, spec = cache_key(hashes.get(genome_a), hashes.get(genome_b), aligner_cmd, version, args.align_ba)
+    if not args.force and is_cached(out_dir, key):
+        return f"{out_dir}: up to date"
+    os.makedirs(out_dir, exist_ok=True)
+    final = [os.path.join(out_dir, name) for name in OUTPUTS]
+    tmp = [f"{path}.tmp{os.getpid()}" for path in final]
+    try:
+        align_ab, convert_ab = start_alignment(aligner_cmd, genome_b, genome_a, tmp[0])
+        procs = [("A→B aligner", align_ab), ("A→B paf_to_blocks.py", convert_ab)]
+        if args.align_ba:
+            align_ba, convert_ba = start_alignment(aligner_cmd, genome_a, genome_b, tmp[1])
+            procs += [("B→A aligner", align_ba), ("B→A paf_to_blocks.py", convert_ba)]
+        wait_all(procs)
+        if not args.align_ba:
+            invert = [sys.executable, os.path.join(CLI_DIR, "blocks_invert.py"), tmp[0], "-o", tmp[1]]
+            wait_all([("blocks_invert.py", start(invert, stdout=subprocess.DEVNULL))])
+        for src, dst in zip(tmp, final):
+            os.replace(src, dst)
+    finally:
+        for path in tmp:
+            if os.path.exists(path):
+                os.remove(path)
+    spec.update(genome_a_path=genome_a, genome_b_path=genome_b)
+    with open(os.path.join(out_dir, BUILD_FILE), "w") as f:
+        json.dump({"key": key, "inputs": spec}, f, indent=1, sort_keys=True)
+        f.write("\n")
+    with open(final[0]) as f_ab, open(final[1]) as f_ba:
+        n_ab, n_ba = sum(1 for _ in f_ab) - 1, sum(1 for _ in f_ba) - 1
+    return f"{out_dir}: built in {time.perf_counter() - t0:.1f}s (A_to_B blocks={n_ab}, B_to_A blocks={n_ba})"
+
+
+def main():
+    """Entry point: build every requested pair, at most --jobs at a time."""
+    args = parse_args()
+    if args.pair and len(args.pair) != 3:
+        sys.exit("error: give one pair as 'genomeA.fa genomeB.fa out_dir', or use --pairs")
+    pairs = [tuple(args.pair)] if args.pair else []
+    if args.pairs:
+        pairs += read_pairs(args.pairs)
+    if not pairs:
+        sys.exit("error: no genome pairs given")
+    aligner = shutil.which(args.aligner)
+    if aligner is None:
+        sys.exit(f"error: aligner {args.aligner!r} not found (set --aligner or $MINIMAP2)")
+    aligner_cmd = [aligner] + shlex.split(args.aligner_args)
+    version = aligner_version(aligner)
+    hashes = FastaHashes()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [(out_dir, pool.submit(build_pair, a, b, out_dir, args, aligner_cmd, version, hashes)) for a, b, out_dir in pairs]
+        for out_dir, future in futures:
+            try:
+                print(future.result(), file=sys.stderr)
+            except (OSError, RuntimeError) as e:
+                failed += 1
+                print(f"{out_dir}: FAILED\n{e}", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,28 @@
 #!/usr/bin/env python3
 import argparse
+import multiprocessing
+import os
+import shutil
 import sys
+import tempfile
+from contextlib import nullcontext
+from itertools import islice, repeat
+
+from bedgraph import OVERLAP_OPS, lift_bedgraph_lines
+from blockstore import collect_gaps, format_gaps, load_blocks, split_interval, stitch_interval
+from mapper import HAVE_NUMPY, MAX_BATCH_POS, Mapper, build_batch_index, find_blocks_batch, map_points_batch
+from extsort import DEFAULT_MAX_RECORDS
+from metrics import Metrics, profiled, timed_lines
+from vcf import default_rejects_path, lift_vcf_lines
+from writers import FORMATS, check_output, open_writer, output_format, row_writer
+from xopen import is_gzip_file, is_stdio, open_input, open_output, output_dir
+
+HEADER_CHRPOS = "contigA\tposA\tcontigB\tposB\tstrand\tstatus\n"
+HEADER_BED = "contigA\tstartA\tendA\tcontigB\tstartB\tendB\tstrand\tstatus\n"
+HEADER_STITCH = "contigA\tstartA\tendA\tcontigB\tstartB\tendB\tstrand\tstatus\tgaps\n"
+HEADER_CHRPOS_MULTI = "contigA\tposA\tcontigB\tposB\tstrand\tmapq\trank\tstatus\n"
+HEADER_BED_MULTI = "contigA\tstartA\tendA\tcontigB\tstartB\tendB\tstrand\tmapq\trank\tstatus\n"
+HEADER_REVERSE = "contigB\tstartB\tendB\tcontigA\tstartA\tendA\tstrand\tmapq\tstatus\n"
 
 
 def parse_args():
@@ -8,173 +30,779 @@ def parse_args():
     p = argparse.ArgumentParser(
         description=(
             "Lift coordinates from genome A to B using a precomputed blocks TSV.\n"
-            "Input formats: CHR:POS lines (1-based) or BED (0-based half-open, tab-delimited)."
+            "Input formats: CHR:POS lines (1-based), BED (0-based half-open, tab-delimited), bedGraph or VCF."
+        ),
+    )
+    p.add_argument(
+        "map",
+        help="Blocks TSV file (contigA startA endA contigB startB endB strand mapq), chain file, compiled index, or '-' for stdin",
+    )
+    p.add_argument(
+        "input",
+        nargs="?",
+        help="Input coordinates file (CHR:POS, BED, bedGraph or VCF); '-' for stdin, gzip/BGZF accepted (omit with --reverse-query)",
+    )
+    p.add_argument(
+        "-f",
+        "--format",
+        choices=["chrpos", "bed", "bedgraph", "vcf"],
+        default="chrpos",
+        help="Input format (bedgraph: split at block boundaries, sorted and merged on genome B, ready for bedGraphToBigWig)",
+    )
+    p.add_argument(
+        "-o", "--output", default="liftover.out.tsv", help="Output file path; '-' for stdout, .gz/.bgz for BGZF, .arrow/.parquet for columnar output"
+    )
+    p.add_argument(
+        "--output-format",
+        choices=FORMATS,
+        help=(
+            "Output table format (default: from the output suffix; .arrow/.feather/.ipc for Arrow IPC, "
+            ".parquet for Parquet, else TSV). Arrow and Parquet need pyarrow; not for VCF or bedGraph"
         ),
     )
-    p.add_argument("map", help="Blocks TSV file (contigA startA endA contigB startB endB strand mapq)")
-    p.add_argument("input", help="Input coordinates file (CHR:POS or BED)")
-    p.add_argument("-f", "--format", choices=["chrpos", "bed"], default="chrpos", help="Input format")
-    p.add_argument("-o", "--output", default="liftover.out.tsv", help="Output file path")
     p.add_argument("--allow-split", action="store_true", help="Split intervals crossing blocks (BED only)")
     p.add_argument("--strict", action="store_true", help="Reject intervals that cross blocks (BED only)")
+    p.add_argument(
+        "--stitch",
+        action="store_true",
+        help="Stitch intervals across blocks into one interval with a gap summary, as the web app does (BED only)",
+    )
+    p.add_argument(
+        "--rejects",
+        help="VCF only: file for records that cannot be lifted (default: <output>.rejects.vcf, none for stdout)",
+    )
+    p.add_argument(
+        "--overlap",
+        choices=sorted(OVERLAP_OPS),
+        default="mean",
+        help="bedGraph only: how to combine the values of pieces that land on the same genome-B bases",
+    )
+    p.add_argument(
+        "--max-records",
+        type=int,
+        default=DEFAULT_MAX_RECORDS,
+        help="bedGraph only: lifted pieces held in memory before spilling a sorted run to disk",
+    )
+    p.add_argument("--tmp-dir", help="bedGraph only: directory for spilled sort runs (default: system temp dir)")
+    p.add_argument(
+        "--multi",
+        action="store_true",
+        help=(
+            "Report every block covering a position or overlapping an interval, one row per target ranked "
+            "by mapq (for maps with overlapping blocks in A; chrpos and BED only)"
+        ),
+    )
+    p.add_argument(
+        "--reverse",
+        action="store_true",
+        help=(
+            "Query the map from the genome-B side: input BED intervals are on genome B and every genome-A "
+            "segment that maps into them is reported, clipped, with its strand (BED only)"
+        ),
+    )
+    p.add_argument(
+        "--reverse-query",
+        action="append",
+        default=[],
+        metavar="CONTIG:START-END",
+        help="Genome-B region (1-based inclusive, as in samtools) to query as with --reverse, instead of an input file (repeatable)",
+    )
     p.add_argument("--stats", action="store_true", help="Print mapping statistics to stderr")
+    p.add_argument(
+        "--metrics-json",
+        metavar="PATH",
+        help=(
+            "Write per-phase wall/CPU time, per-status and per-contig row counts, lookups per record, "
+            "pieces per split interval and peak memory as JSON"
+        ),
+    )
+    p.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="PATH",
+        help="Run under cProfile and print the top functions to stderr; save the stats to PATH if given (main process only)",
+    )
+    p.add_argument(
+        "--assume-sorted",
+        action="store_true",
+        help=(
+            "Input is sorted by position within each contig: walk a cursor through the blocks instead of "
+            "binary searching every record (out-of-order records fall back to binary search)"
+        ),
+    )
+    p.add_argument(
+        "--batch",
+        action="store_true",
+        help="Parse, look up and format the input in chunks with NumPy (CHR:POS and BED; requires NumPy)",
+    )
+    p.add_argument("--chunk-size", type=int, default=100000, help="Input lines per chunk in --batch mode")
+    p.add_argument(
+        "-j",
+        "--threads",
+        type=int,
+        default=1,
+        help="Worker processes; the input is split into line-aligned shards and results are written in input order",
+    )
     return p.parse_args()
 
 
-def load_blocks(path):
-    """Load blocks TSV into per-contig arrays sorted by startA."""
-    by_contig = {}
-    with open(path) as f:
-        header = f.readline()
-        for line in f:
-            parts = line.rstrip().split("\t")
-            contigA, startA, endA, contigB, startB, endB, strand, mapq = parts
-            b = {
-                "contigA": contigA,
-                "startA": int(startA),
-                "endA": int(endA),
-                "contigB": contigB,
-                "startB": int(startB),
-                "endB": int(endB),
-                "strand": strand,
-                "mapq": int(mapq),
-            }
-            by_contig.setdefault(contigA, []).append(b)
-    for c in by_contig:
-        by_contig[c].sort(key=lambda b: b["startA"])  # ensure sorted
-    return by_contig
-
-
-def find_block(blocks, pos):
-    """Binary search to find the block containing pos in genome A."""
-    lo, hi = 0, len(blocks)
-    while lo < hi:
-        mid = (lo + hi) // 2
-        b = blocks[mid]
-        if pos < b["startA"]:
-            hi = mid
-        elif pos >= b["endA"]:
-            lo = mid + 1
-        else:
-            return mid
-    return None
+def liftover_chrpos_batch(blocks_by_contig, infile, outfile, chunk_size=100000):
+    """Lift CHR:POS lines in chunks, resolving each contig's queries with one vectorized search."""
+    with open_input(infile) as fin, open_output(outfile) as fout:
+        fout.write(HEADER_CHRPOS)
+        return lift_chrpos_batch_lines(blocks_by_contig, fin, fout, chunk_size)
 
 
-def map_point(block, posA):
-    """Map a single position on genome A to genome B using a block."""
-    offset = posA - block["startA"]
-    if block["strand"] == "+":
-        posB = block["startB"] + offset
-    else:
-        length = block["endA"] - block["startA"]
-        posB = block["startB"] + (length - 1 - offset)
-    return block["contigB"], posB, block["strand"]
+def lift_chrpos_batch_lines(blocks_by_contig, fin, fout, chunk_size=100000, metrics=None, mapper=None):
+    """Batch-lift CHR:POS lines from fin, writing rows (no header) to fout; return (total, mapped).
 
+    Each chunk is parsed, looked up (Mapper.map_columns) and formatted column
+    by column. A chunk holding a malformed record is lifted record by record
+    instead, so its BAD_INPUT rows match the scalar path. A long-lived mapper
+    can be passed in so its batch index is built only once.
+    """
+    import numpy as np
 
-def liftover_chrpos(blocks_by_contig, infile, outfile):
+    if mapper is None:
+        mapper = Mapper(blocks_by_contig)
+    total, mapped = 0, 0
+    while True:
+        chunk = list(islice(fin, chunk_size))
+        if not chunk:
+            break
+        records = [s for s in map(str.strip, chunk) if s]
+        if not records:
+            continue
+        try:
+            # With exactly one ":" per record, the joined chunk splits into alternating contig / position fields.
+            if set(map(str.count, records, repeat(":"))) != {1}:
+                raise ValueError("malformed record")
+            fields = ":".join(records).split(":")
+            contigs = fields[0::2]
+            posA = np.fromiter(map(int, fields[1::2]), dtype=np.int64, count=len(records))
+            if posA.min() < 1:
+                raise ValueError("posA must be >= 1 for CHR:POS format")
+        except (ValueError, OverflowError):
+            counts = lift_chrpos_lines(blocks_by_contig, iter(records), fout, metrics=metrics)
+            total += counts[0]
+            mapped += counts[1]
+            continue
+        total += len(records)
+        if metrics is not None:
+            with metrics.span("lookup"):
+                status, contigB, posB, strand = mapper.map_columns(contigs, posA - 1)
+            metrics.lookups += len(records)
+        else:
+            status, contigB, posB, strand = mapper.map_columns(contigs, posA - 1)
+        ok = status == "OK"
+        mapped += int(ok.sum())
+        write_rows = getattr(fout, "write_rows", None)
+        posB_out = np.full(len(records), "", dtype=object)
+        posB_out[ok] = (posB[ok] + 1).tolist() if write_rows is not None else list(map(str, (posB[ok] + 1).tolist()))
+        contigB[~ok] = ""
+        strand[~ok] = ""
+        if write_rows is not None:
+            # A columnar writer takes the rows as typed tuples.
+            write_rows(zip(contigs, posA.tolist(), contigB.tolist(), posB_out.tolist(), strand.tolist(), status.tolist()))
+            continue
+        columns = (contigs, map(str, posA.tolist()), contigB.tolist(), posB_out.tolist(), strand.tolist(), status.tolist())
+        fout.write("\n".join(map("\t".join, zip(*columns))) + "\n")
+    return total, mapped
+
+
+def liftover_chrpos(blocks_by_contig, infile, outfile, assume_sorted=False):
     """Lift CHR:POS lines and write TSV with mapped coordinates and status."""
+    with open_input(infile) as fin, open_output(outfile) as fout:
+        fout.write(HEADER_CHRPOS)
+        return lift_chrpos_lines(blocks_by_contig, fin, fout, assume_sorted)
+
+
+def lift_chrpos_lines(blocks_by_contig, fin, fout, assume_sorted=False, metrics=None):
+    """Lift CHR:POS lines from fin, writing rows (no header) to fout; return (total, mapped).
+
+    With assume_sorted, lookups use a sorted-input cursor and the number of
+    out-of-order records is appended to the returned counts.
+    """
+    mapper = Mapper(blocks_by_contig, sorted_input=assume_sorted)
+    if metrics is not None:
+        metrics.watch(mapper)
+    write_row = row_writer(fout, HEADER_CHRPOS)
     total, mapped = 0, 0
-    with open(infile) as fin, open(outfile, "w") as fout:
-        fout.write("contigA\tposA\tcontigB\tposB\tstrand\tstatus\n")
-        for line in fin:
-            s = line.strip()
-            if not s:
-                continue
-            total += 1
-            try:
-                contigA, posA = s.split(":")
-                posA_one_based = int(posA)
-                if posA_one_based < 1:
-                    raise ValueError("posA must be >= 1 for CHR:POS format")
-                posA_zero_based = posA_one_based - 1
-            except Exception:
-                fout.write(f"\t\t\t\t\tBAD_INPUT\n")
-                continue
-            blocks = blocks_by_contig.get(contigA)
-            if not blocks:
-                fout.write(f"{contigA}\t{posA_one_based}\t\t\t\tNO_CONTIG\n")
-                continue
-            idx = find_block(blocks, posA_zero_based)
-            if idx is None:
-                fout.write(f"{contigA}\t{posA_one_based}\t\t\t\tUNMAPPED\n")
-                continue
-            b = blocks[idx]
-            contigB, posB_zero_based, strand = map_point(b, posA_zero_based)
-            posB_one_based = posB_zero_based + 1
-            mapped += 1
-            fout.write(f"{contigA}\t{posA_one_based}\t{contigB}\t{posB_one_based}\t{strand}\tOK\n")
+    for line in fin:
+        s = line.strip()
+        if not s:
+            continue
+        total += 1
+        try:
+            contigA, posA = s.split(":")
+            posA_one_based = int(posA)
+            if posA_one_based < 1:
+                raise ValueError("posA must be >= 1 for CHR:POS format")
+            posA_zero_based = posA_one_based - 1
+        except Exception:
+            write_row("", "", "", "", "", "BAD_INPUT")
+            continue
+        status, contigB, posB_zero_based, strand = mapper.map_point(contigA, posA_zero_based)
+        if status != "OK":
+            write_row(contigA, posA_one_based, "", "", "", status)
+            continue
+        posB_one_based = posB_zero_based + 1
+        mapped += 1
+        write_row(contigA, posA_one_based, contigB, posB_one_based, strand, "OK")
+    if assume_sorted:
+        return total, mapped, mapper.unsorted
     return total, mapped
 
 
-def liftover_bed(blocks_by_contig, infile, outfile, allow_split=False, strict=False):
+def write_split_rows(write_row, pieces, contigA):
+    """Write split_interval pieces as HEADER_BED rows with write_row; return the number of SPLIT rows."""
+    split = 0
+    for a, a_end, contigB, startB, endB, strand in pieces:
+        if contigB is None:
+            write_row(contigA, a, a_end, "", "", "", "", "UNMAPPED_SEG")
+        else:
+            write_row(contigA, a, a_end, contigB, startB, endB, strand, "SPLIT")
+            split += 1
+    return split
+
+
+def liftover_bed(blocks_by_contig, infile, outfile, allow_split=False, strict=False, assume_sorted=False):
     """Lift BED intervals and write TSV with mapped intervals and status."""
+    with open_input(infile) as fin, open_output(outfile) as fout:
+        fout.write(HEADER_BED)
+        return lift_bed_lines(blocks_by_contig, fin, fout, allow_split, strict, assume_sorted)
+
+
+def lift_bed_lines(blocks_by_contig, fin, fout, allow_split=False, strict=False, assume_sorted=False, metrics=None):
+    """Lift BED lines from fin, writing rows (no header) to fout; return (total, mapped, split).
+
+    With assume_sorted, intervals are looked up by start with a sorted-input
+    cursor and the number of out-of-order records is appended to the counts.
+    """
+    mapper = Mapper(blocks_by_contig, sorted_input=assume_sorted)
+    if metrics is not None:
+        metrics.watch(mapper)
+    write_row = row_writer(fout, HEADER_BED)
     total, mapped, split = 0, 0, 0
-    with open(infile) as fin, open(outfile, "w") as fout:
-        fout.write("contigA\tstartA\tendA\tcontigB\tstartB\tendB\tstrand\tstatus\n")
-        for line in fin:
+    for line in fin:
+        if not line.strip():
+            continue
+        total += 1
+        parts = line.rstrip().split("\t")
+        contigA, startA, endA = parts[:3]
+        startA, endA = int(startA), int(endA)
+        status, pieces = mapper.map_interval(contigA, startA, endA, allow_split)
+        if status == "OK":
+            _, _, contigB, startB, endB, strand = pieces[0]
+            write_row(contigA, startA, endA, contigB, startB, endB, strand, "OK")
+            mapped += 1
+        elif status == "SPLIT":
+            if metrics is not None:
+                metrics.split_pieces[len(pieces)] += 1
+            split += write_split_rows(write_row, pieces, contigA)
+            mapped += 1
+        else:
+            write_row(contigA, startA, endA, "", "", "", "", status)
+    if assume_sorted:
+        return total, mapped, split, mapper.unsorted
+    return total, mapped, split
+
+
+def lift_chrpos_multi_lines(blocks_by_contig, fin, fout, metrics=None):
+    """Lift CHR:POS lines to every covering block, one row per target; return (total, mapped, multi).
+
+    Rows of one record are ranked by mapq (rank 1 is the best); status is
+    "MULTI" when the position has several targets.
+    """
+    mapper = Mapper(blocks_by_contig)
+    if metrics is not None:
+        metrics.watch(mapper)
+    write_row = row_writer(fout, HEADER_CHRPOS_MULTI)
+    total, mapped, multi = 0, 0, 0
+    for line in fin:
+        s = line.strip()
+        if not s:
+            continue
+        total += 1
+        try:
+            contigA, posA = s.split(":")
+            posA_one_based = int(posA)
+            if posA_one_based < 1:
+                raise ValueError("posA must be >= 1 for CHR:POS format")
+        except Exception:
+            write_row("", "", "", "", "", "", "", "BAD_INPUT")
+            continue
+        status, hits = mapper.map_point_all(contigA, posA_one_based - 1)
+        if status != "OK":
+            write_row(contigA, posA_one_based, "", "", "", "", "", status)
+            continue
+        mapped += 1
+        if len(hits) > 1:
+            status = "MULTI"
+            multi += 1
+        for rank, (contigB, posB, strand, mapq) in enumerate(hits, 1):
+            write_row(contigA, posA_one_based, contigB, posB + 1, strand, mapq, rank, status)
+    return total, mapped, multi
+
+
+def lift_bed_multi_lines(blocks_by_contig, fin, fout, metrics=None):
+    """Lift BED lines through every overlapping block, one row per target; return (total, mapped, multi).
+
+    Each row holds the part of the interval inside one block (startA/endA are
+    clipped to it), ranked by mapq. status is "OK" or "MULTI" when that block
+    covers the whole interval and "PARTIAL" when it covers only part of it.
+    """
+    mapper = Mapper(blocks_by_contig)
+    if metrics is not None:
+        metrics.watch(mapper)
+    write_row = row_writer(fout, HEADER_BED_MULTI)
+    total, mapped, multi = 0, 0, 0
+    for line in fin:
+        if not line.strip():
+            continue
+        total += 1
+        contigA, startA, endA = line.rstrip().split("\t")[:3]
+        startA, endA = int(startA), int(endA)
+        status, pieces = mapper.map_interval_all(contigA, startA, endA)
+        if status != "OK":
+            write_row(contigA, startA, endA, "", "", "", "", "", "", status)
+            continue
+        mapped += 1
+        full = "OK"
+        if len(pieces) > 1:
+            full = "MULTI"
+            multi += 1
+        for rank, (a, a_end, contigB, startB, endB, strand, mapq) in enumerate(pieces, 1):
+            status = full if (a, a_end) == (startA, endA) else "PARTIAL"
+            write_row(contigA, a, a_end, contigB, startB, endB, strand, mapq, rank, status)
+    return total, mapped, multi
+
+
+def lift_bed_reverse_lines(blocks_by_contig, fin, fout, metrics=None):
+    """Find the genome-A sources of genome-B BED intervals, one row per contributing block; return (total, mapped, pieces).
+
+    Each row holds the part of the interval inside one block's image
+    (startB/endB are clipped to it) and the A segment mapping onto it, in
+    startB order. status is "OK" when that block covers the whole interval
+    and "PARTIAL" when it covers only part of it.
+    """
+    mapper = Mapper(blocks_by_contig)
+    if metrics is not None:
+        metrics.watch(mapper)
+    write_row = row_writer(fout, HEADER_REVERSE)
+    total, mapped, n_pieces = 0, 0, 0
+    for line in fin:
+        if not line.strip():
+            continue
+        total += 1
+        contigB, startB, endB = line.rstrip().split("\t")[:3]
+        startB, endB = int(startB), int(endB)
+        status, pieces = mapper.map_reverse(contigB, startB, endB)
+        if status != "OK":
+            write_row(contigB, startB, endB, "", "", "", "", "", status)
+            continue
+        mapped += 1
+        n_pieces += len(pieces)
+        for b, b_end, contigA, a, a_end, strand, mapq in pieces:
+            status = "OK" if (b, b_end) == (startB, endB) else "PARTIAL"
+            write_row(contigB, b, b_end, contigA, a, a_end, strand, mapq, status)
+    return total, mapped, n_pieces
+
+
+def parse_region(region):
+    """Parse a 1-based inclusive "contig:start-end" region (commas allowed) into a 0-based half-open BED line."""
+    contig, sep, span = region.rpartition(":")
+    start, dash, end = span.replace(",", "").partition("-")
+    try:
+        start, end = int(start), int(end)
+    except ValueError:
+        start = end = 0
+    if not sep or not contig or not dash or start < 1 or end < start:
+        raise ValueError(f"expected a region CONTIG:START-END (1-based, inclusive), got {region!r}")
+    return f"{contig}\t{start - 1}\t{end}\n"
+
+
+def liftover_bed_stitch(blocks_by_contig, infile, outfile):
+    """Lift BED intervals as one stitched interval plus a gap summary, like the web app.
+
+    B intervals are written 0-based half-open; gap positions are 1-based as in the browser.
+    """
+    with open_input(infile) as fin, open_output(outfile) as fout:
+        fout.write(HEADER_STITCH)
+        return lift_bed_stitch_lines(blocks_by_contig, fin, fout)
+
+
+def lift_bed_stitch_lines(blocks_by_contig, fin, fout, metrics=None):
+    """Stitch BED lines from fin, writing rows (no header) to fout; return (total, mapped, stitched)."""
+    write_row = row_writer(fout, HEADER_STITCH)
+    total, mapped, stitched = 0, 0, 0
+    for line in fin:
+        if not line.strip():
+            continue
+        total += 1
+        contigA, startA, endA = line.rstrip().split("\t")[:3]
+        startA, endA = int(startA), int(endA)
+        blocks = blocks_by_contig.get(contigA)
+        if not blocks:
+            write_row(contigA, startA, endA, "", "", "", "", "NO_CONTIG", "")
+            continue
+        if metrics is not None:
+            with metrics.span("lookup"):
+                status, contigB, startB, endB, strand, i, j = stitch_interval(blocks, startA, max(startA, endA - 1))
+            metrics.lookups += 2
+        else:
+            status, contigB, startB, endB, strand, i, j = stitch_interval(blocks, startA, max(startA, endA - 1))
+        if status != "OK":
+            write_row(contigA, startA, endA, "", "", "", "", f"STITCH_FAILED_{status}", "")
+            continue
+        gaps = collect_gaps(blocks, i, j) if i != j else []
+        if i == j:
+            status = "OK"
+        else:
+            status = "STITCHED_WITH_GAPS" if gaps else "STITCHED_OK"
+            stitched += 1
+        mapped += 1
+        write_row(contigA, startA, endA, contigB, startB, endB + 1, strand, status, format_gaps(gaps))
+    return total, mapped, stitched
+
+
+def liftover_bed_batch(blocks_by_contig, infile, outfile, allow_split=False, strict=False, chunk_size=100000):
+    """Lift BED intervals in chunks; intervals inside one block are mapped vectorized per contig."""
+    with open_input(infile) as fin, open_output(outfile) as fout:
+        fout.write(HEADER_BED)
+        return lift_bed_batch_lines(blocks_by_contig, fin, fout, allow_split, strict, chunk_size)
+
+
+def lift_bed_batch_lines(blocks_by_contig, fin, fout, allow_split=False, strict=False, chunk_size=100000, metrics=None):
+    """Batch-lift BED lines from fin, writing rows (no header) to fout; return (total, mapped, split)."""
+    import numpy as np
+
+    index = build_batch_index(blocks_by_contig)
+    write_row = row_writer(fout, HEADER_BED)
+    total, mapped, split = 0, 0, 0
+    while True:
+        chunk = list(islice(fin, chunk_size))
+        if not chunk:
+            break
+        rows = []
+        queries = {}
+        for line in chunk:
             if not line.strip():
                 continue
             total += 1
             parts = line.rstrip().split("\t")
             contigA, startA, endA = parts[:3]
             startA, endA = int(startA), int(endA)
-            blocks = blocks_by_contig.get(contigA)
-            if not blocks:
-                fout.write(f"{contigA}\t{startA}\t{endA}\t\t\t\t\tNO_CONTIG\n")
-                continue
-            idx = find_block(blocks, startA)
-            if idx is None:
-                fout.write(f"{contigA}\t{startA}\t{endA}\t\t\t\t\tUNMAPPED_START\n")
+            if contigA not in index:
+                rows.append((contigA, startA, endA, "", "", "", "", "NO_CONTIG"))
                 continue
-            b = blocks[idx]
-            if endA <= b["endA"]:
-                contigB, startB, strand = map_point(b, startA)
-                _, endB, _ = map_point(b, endA - 1)
-                fout.write(f"{contigA}\t{startA}\t{endA}\t{contigB}\t{startB}\t{endB+1}\t{strand}\tOK\n")
-                mapped += 1
+            slots, starts, ends = queries.setdefault(contigA, ([], [], []))
+            slots.append(len(rows))
+            starts.append(startA)
+            ends.append(endA)
+            rows.append(None)
+        for contigA, (slots, starts, ends) in queries.items():
+            arrays = index[contigA]
+            startA = np.asarray([max(-MAX_BATCH_POS, min(v, MAX_BATCH_POS)) for v in starts], dtype=np.int64)
+            endA = np.asarray([min(v, MAX_BATCH_POS) for v in ends], dtype=np.int64)
+            if metrics is not None:
+                with metrics.span("lookup"):
+                    idx = find_blocks_batch(arrays, startA)
+                metrics.lookups += len(starts)
             else:
-                if strict and not allow_split:
-                    fout.write(f"{contigA}\t{startA}\t{endA}\t\t\t\t\tCROSSES_BLOCK\n")
-                    continue
-                if not allow_split:
-                    fout.write(f"{contigA}\t{startA}\t{endA}\t\t\t\t\tCROSSES_BLOCK\n")
-                    continue
-                pieces = []
-                a = startA
-                while a < endA:
-                    idx = find_block(blocks, a)
-                    if idx is None:
-                        pieces.append((None, None, None, a, min(endA, a + 1)))
-                        a += 1
-                        continue
-                    b = blocks[idx]
-                    a_end = min(endA, b["endA"])
-                    contigB, b_startB, strand = map_point(b, a)
-                    _, b_endB_minus1, _ = map_point(b, a_end - 1)
-                    pieces.append((contigB, b_startB, b_endB_minus1 + 1, a, a_end))
-                    a = a_end
-                for seg in pieces:
-                    if seg[0] is None:
-                        fout.write(f"{contigA}\t{seg[3]}\t{seg[4]}\t\t\t\t\tUNMAPPED_SEG\n")
+                idx = find_blocks_batch(arrays, startA)
+            inside = (idx >= 0) & (endA <= arrays["endA"][np.maximum(idx, 0)])
+            startB = np.zeros_like(startA)
+            endB = np.zeros_like(endA)
+            startB[inside] = map_points_batch(arrays, idx[inside], startA[inside])
+            endB[inside] = map_points_batch(arrays, idx[inside], endA[inside] - 1) + 1
+            blocks = arrays["blocks"]
+            for slot, s, e, i, ok, sB, eB in zip(
+                slots, starts, ends, idx.tolist(), inside.tolist(), startB.tolist(), endB.tolist()
+            ):
+                if i < 0:
+                    rows[slot] = (contigA, s, e, "", "", "", "", "UNMAPPED_START")
+                elif ok:
+                    rows[slot] = (contigA, s, e, blocks.contig_b(i), sB, eB, blocks.strand(i), "OK")
+                    mapped += 1
+                elif not allow_split:
+                    rows[slot] = (contigA, s, e, "", "", "", "", "CROSSES_BLOCK")
+                else:
+                    if metrics is not None:
+                        with metrics.span("lookup"):
+                            pieces = split_interval(blocks, s, e)
                     else:
-                        fout.write(f"{contigA}\t{seg[3]}\t{seg[4]}\t{seg[0]}\t{seg[1]}\t{seg[2]}\t{strand}\tSPLIT\n")
-                        split += 1
-                mapped += 1
+                        pieces = split_interval(blocks, s, e)
+                    if metrics is not None:
+                        metrics.lookups += len(pieces)
+                        metrics.split_pieces[len(pieces)] += 1
+                    # A split record becomes several rows, written in its place below.
+                    rows[slot] = [contigA, pieces]
+                    mapped += 1
+        for row in rows:
+            if type(row) is tuple:
+                write_row(*row)
+            else:
+                split += write_split_rows(write_row, row[1], row[0])
     return total, mapped, split
 
 
+def liftover_vcf(blocks_by_contig, infile, outfile, rejects=None, assume_sorted=False):
+    """Lift a VCF record by record, writing unliftable records to rejects; see vcf.py."""
+    with open_input(infile) as fin, open_output(outfile) as fout:
+        return lift_vcf_lines(blocks_by_contig, fin, fout, rejects, assume_sorted)
+
+
+def select_lifter(args):
+    """Return (header, lift_lines function, count names) for the mode chosen on the command line."""
+    if args.format == "vcf":
+        names = ("total", "mapped", "rejected") + (("unsorted",) if args.assume_sorted else ())
+        return "", lambda b, fin, fout, metrics=None: lift_vcf_lines(b, fin, fout, args.rejects, args.assume_sorted, metrics), names
+    if args.format == "bedgraph":
+        return (
+            "",
+            lambda b, fin, fout, metrics=None: lift_bedgraph_lines(
+                b, fin, fout, args.overlap, args.max_records, args.tmp_dir, metrics
+            ),
+            ("total", "mapped", "split", "written", "runs"),
+        )
+    if args.reverse:
+        return HEADER_REVERSE, lift_bed_reverse_lines, ("total", "mapped", "pieces")
+    if args.multi:
+        if args.format == "chrpos":
+            return HEADER_CHRPOS_MULTI, lift_chrpos_multi_lines, ("total", "mapped", "multi")
+        return HEADER_BED_MULTI, lift_bed_multi_lines, ("total", "mapped", "multi")
+    if args.format == "chrpos":
+        if args.batch:
+            return (
+                HEADER_CHRPOS,
+                lambda b, fin, fout, metrics=None: lift_chrpos_batch_lines(b, fin, fout, args.chunk_size, metrics),
+                ("total", "mapped"),
+            )
+        if args.assume_sorted:
+            return (
+                HEADER_CHRPOS,
+                lambda b, fin, fout, metrics=None: lift_chrpos_lines(b, fin, fout, True, metrics),
+                ("total", "mapped", "unsorted"),
+            )
+        return HEADER_CHRPOS, lift_chrpos_lines, ("total", "mapped")
+    if args.stitch:
+        return HEADER_STITCH, lift_bed_stitch_lines, ("total", "mapped", "stitched")
+    if args.batch:
+        return (
+            HEADER_BED,
+            lambda b, fin, fout, metrics=None: lift_bed_batch_lines(
+                b, fin, fout, args.allow_split, args.strict, args.chunk_size, metrics
+            ),
+            ("total", "mapped", "split"),
+        )
+    if args.assume_sorted:
+        return (
+            HEADER_BED,
+            lambda b, fin, fout, metrics=None: lift_bed_lines(b, fin, fout, args.allow_split, args.strict, True, metrics),
+            ("total", "mapped", "split", "unsorted"),
+        )
+    return (
+        HEADER_BED,
+        lambda b, fin, fout, metrics=None: lift_bed_lines(b, fin, fout, args.allow_split, args.strict, metrics=metrics),
+        ("total", "mapped", "split"),
+    )
+
+
+def shard_offsets(path, n_shards):
+    """Split a file into up to n_shards byte ranges that start and end on line boundaries."""
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, "rb") as f:
+        for k in range(1, n_shards):
+            f.seek(max(size * k // n_shards, offsets[-1]))
+            if f.tell() > 0:
+                f.seek(f.tell() - 1)
+                f.readline()
+            pos = f.tell()
+            if offsets[-1] < pos < size:
+                offsets.append(pos)
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def read_shard(path, start, end):
+    """Yield decoded lines of path from byte offset start up to end."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        for raw in f:
+            if remaining <= 0:
+                break
+            remaining -= len(raw)
+            yield raw.decode()
+
+
+_worker_blocks = None
+_worker_args = None
+
+
+def _init_worker(map_path, args):
+    """Pool initializer: reuse the parent's blocks when forked, otherwise load (mmap) the map."""
+    global _worker_blocks, _worker_args
+    if _worker_blocks is None:
+        _worker_blocks = load_blocks(map_path)
+    _worker_args = args
+
+
+def _lift_shard(task):
+    """Lift one byte range of the input into a part file; return the counts tuple (and Metrics with --metrics-json)."""
+    path, start, end, part_path = task
+    header, lift, _ = select_lifter(_worker_args)
+    with open(part_path, "w") as fout:
+        if not _worker_args.metrics_json:
+            return lift(_worker_blocks, read_shard(path, start, end), fout)
+        metrics = new_metrics(header)
+        with metrics.phase("lift"):
+            counts = lift(_worker_blocks, timed_lines(read_shard(path, start, end), metrics), metrics.output(fout), metrics=metrics)
+        return counts, metrics
+
+
+def liftover_parallel(blocks, args, header, metrics=None):
+    """Lift args.input with args.threads worker processes; return counts summed over shards.
+
+    The input is cut into several shards per worker at line boundaries; each
+    shard is written to its own part file and the parts are concatenated in
+    input order. On platforms with fork, workers share the parent's loaded map
+    (and an mmapped index shares pages); otherwise each worker opens the map.
+    With metrics, the workers' metrics are merged into it.
+    """
+    global _worker_blocks
+    shards = shard_offsets(args.input, args.threads * 4)
+    out_dir = output_dir(args.output)
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with tempfile.TemporaryDirectory(prefix=".liftover-", dir=out_dir) as tmp:
+        tasks = [(args.input, s, e, os.path.join(tmp, f"part{k:06d}")) for k, (s, e) in enumerate(shards)]
+        _worker_blocks = blocks
+        try:
+            with ctx.Pool(args.threads, initializer=_init_worker, initargs=(args.map, args)) as pool:
+                results = pool.map(_lift_shard, tasks, chunksize=1)
+        finally:
+            _worker_blocks = None
+        if metrics is not None:
+            for _, shard_metrics in results:
+                metrics.merge(shard_metrics)
+            results = [counts for counts, _ in results]
+        with open_writer(args.output, args.output_format) as fout:
+            fout.write(header)
+            for task in tasks:
+                with open(task[3]) as part:
+                    shutil.copyfileobj(part, fout, 1 << 20)
+    return tuple(sum(col) for col in zip(*results))
+
+
+def new_metrics(header):
+    """Return a Metrics that reads row statuses from the status column of header (none for VCF)."""
+    columns = header.rstrip("\n").split("\t")
+    return Metrics(columns.index("status") if "status" in columns else None)
+
+
+def run(args, metrics=None):
+    """Load the map and lift args.input to args.output; return (counts, count names)."""
+    phase = metrics.phase if metrics is not None else lambda name: nullcontext()
+    with phase("load_map"):
+        blocks = load_blocks(args.map)
+    header, lift, names = select_lifter(args)
+    if args.threads > 1:
+        with phase("lift_parallel"):
+            return liftover_parallel(blocks, args, header, metrics), names
+    regions = [parse_region(r) for r in args.reverse_query]
+    with open_input(args.input) if not regions else nullcontext(iter(regions)) as fin, open_writer(
+        args.output, args.output_format
+    ) as fout:
+        fout.write(header)
+        if metrics is None:
+            return lift(blocks, fin, fout), names
+        with phase("lift"):
+            return lift(blocks, timed_lines(fin, metrics), metrics.output(fout), metrics=metrics), names
+
+
 def main():
     """Entry point: perform liftover for CHR:POS or BED using blocks TSV."""
     args = parse_args()
-    blocks = load_blocks(args.map)
-    if args.format == "chrpos":
-        total, mapped = liftover_chrpos(blocks, args.input, args.output)
-        if args.stats:
-            print(f"total={total} mapped={mapped}", file=sys.stderr)
-    else:
-        total, mapped, split = liftover_bed(blocks, args.input, args.output, args.allow_split, args.strict)
-        if args.stats:
-            print(f"total={total} mapped={mapped} split={split}", file=sys.stderr)
+    if args.batch and not HAVE_NUMPY:
+        sys.exit("error: --batch requires NumPy (pip install numpy)")
+    args.output_format = output_format(args.output, args.output_format)
+    if args.output_format != "tsv" and args.format in ("vcf", "bedgraph"):
+        sys.exit(f"error: {args.format} output is written as {args.format}; --output-format {args.output_format} needs chrpos or BED input")
+    try:
+        check_output(args.output, args.output_format)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    if args.reverse_query:
+        if args.input is not None:
+            sys.exit("error: give either an input file or --reverse-query regions, not both")
+        try:
+            for region in args.reverse_query:
+                parse_region(region)
+        except ValueError as e:
+            sys.exit(f"error: {e}")
+        args.format, args.reverse, args.threads = "bed", True, 1
+    elif args.input is None:
+        sys.exit("error: an input file is required (or --reverse-query regions)")
+    if args.reverse:
+        if args.format != "bed":
+            sys.exit("error: --reverse needs BED input (-f bed) with intervals on genome B")
+        if args.batch or args.stitch or args.multi or args.allow_split or args.strict or args.assume_sorted:
+            print(
+                "Warning: --batch, --stitch, --multi, --allow-split, --strict and --assume-sorted have no effect with --reverse",
+                file=sys.stderr,
+            )
+            args.batch = args.stitch = args.multi = args.allow_split = args.strict = args.assume_sorted = False
+    if is_stdio(args.map) and is_stdio(args.input):
+        sys.exit("error: only one of map and input can be read from stdin")
+    if args.threads > 1 and (is_stdio(args.input) or is_gzip_file(args.input)):
+        print("Warning: -j needs a seekable uncompressed input; running in one process", file=sys.stderr)
+        args.threads = 1
+    if args.format == "vcf":
+        if args.threads > 1 or args.batch or args.stitch:
+            print("Warning: -j, --batch and --stitch do not apply to VCF input; streaming in one process", file=sys.stderr)
+            args.threads, args.batch, args.stitch = 1, False, False
+        if args.rejects is None:
+            args.rejects = default_rejects_path(args.output)
+    if args.format == "bedgraph":
+        if args.threads > 1 or args.batch or args.stitch or args.multi or args.assume_sorted:
+            print(
+                "Warning: -j, --batch, --stitch, --multi and --assume-sorted do not apply to bedGraph input; "
+                "lifting in one process",
+                file=sys.stderr,
+            )
+            args.threads, args.batch, args.stitch, args.multi, args.assume_sorted = 1, False, False, False, False
+    if args.multi:
+        if args.format == "vcf":
+            print("Warning: --multi does not apply to VCF input", file=sys.stderr)
+            args.multi = False
+        elif args.batch or args.stitch or args.allow_split or args.strict or args.assume_sorted:
+            print(
+                "Warning: --batch, --stitch, --allow-split, --strict and --assume-sorted have no effect with --multi",
+                file=sys.stderr,
+            )
+            args.batch = args.stitch = args.allow_split = args.strict = args.assume_sorted = False
+    if args.assume_sorted and (args.batch or args.stitch):
+        print("Warning: --assume-sorted has no effect with --batch or --stitch", file=sys.stderr)
+        args.assume_sorted = False
+    metrics = new_metrics(select_lifter(args)[0]) if args.metrics_json else None
+    with profiled(args.profile or None) if args.profile is not None else nullcontext():
+        if metrics is not None:
+            with metrics.phase("total"):
+                counts, names = run(args, metrics)
+            metrics.write(args.metrics_json, dict(zip(names, counts)))
+        else:
+            counts, names = run(args)
+    if args.stats:
+        print(" ".join(f"{k}={v}" for k, v in zip(names, counts)), file=sys.stderr)
+    if args.assume_sorted and counts[-1]:
+        print(
+            f"Warning: {counts[-1]} records were out of order for --assume-sorted and fell back to binary search",
+            file=sys.stderr,
+        )
 
 
 if __name__ == "__main__":
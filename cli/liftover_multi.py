@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Lift one input to several targets in a single pass.
+
+All maps must share genome A (as every pair under web/data shares PomBase).
+Each input record is read and parsed once and looked up in every map. The
+result is written either as one wide table with a column group per target,
+or, when the output path contains {name}, as one file per target in exactly
+the format liftover.py writes for that map. Like liftover.py, every output
+can be TSV, Arrow IPC or Parquet (--output-format or the output suffix).
+
+    python3 cli/liftover_multi.py positions.txt --registry -o lifted.tsv
+    python3 cli/liftover_multi.py regions.bed -f bed --map leupold=A_to_B.blocks.tsv --map dy47073=ab.idx -o out/{name}.tsv.gz
+"""
+import argparse
+import os
+import sys
+from contextlib import ExitStack
+
+from blockstore import load_blocks
+from liftover import HEADER_BED, HEADER_CHRPOS, write_split_rows
+from mapper import Mapper
+from registry import DEFAULT_REGISTRY, load_registry
+from writers import FORMATS, check_output, open_writer, row_writer
+from xopen import open_input
+
+
+def parse_args():
+    """Parse command-line arguments for multi-target liftover."""
+    p = argparse.ArgumentParser(
+        description="Lift CHR:POS or BED input through several maps that share genome A, reading the input once.",
+    )
+    p.add_argument("input", help="Input coordinates file (CHR:POS or BED); '-' for stdin, gzip/BGZF accepted")
+    p.add_argument(
+        "--map",
+        action="append",
+        default=[],
+        metavar="NAME=PATH",
+        help="Target name and its blocks TSV, chain file or compiled index (repeatable)",
+    )
+    p.add_argument(
+        "--registry",
+        nargs="?",
+        const=DEFAULT_REGISTRY,
+        metavar="PATH",
+        help="Add the A→B map of every pair in a registry, named by pair (default: web/genome_pairs.json)",
+    )
+    p.add_argument("-f", "--format", choices=["chrpos", "bed"], default="chrpos", help="Input format")
+    p.add_argument(
+        "-o",
+        "--output",
+        default="liftover.multi.tsv",
+        help="Wide output path ('-' for stdout, .gz for BGZF); with {name} in it, one liftover.py-style file per target",
+    )
+    p.add_argument(
+        "--output-format",
+        choices=FORMATS,
+        help="Output table format for every output (default: from the output suffix, as in liftover.py); Arrow and Parquet need pyarrow",
+    )
+    p.add_argument("--allow-split", action="store_true", help="Split intervals crossing blocks (BED, one file per target only)")
+    p.add_argument("--assume-sorted", action="store_true", help="Input is sorted by position within each contig (see liftover.py)")
+    p.add_argument("--stats", action="store_true", help="Print per-target mapping statistics to stderr")
+    return p.parse_args()
+
+
+def parse_targets(specs, registry=None):
+    """Return [(name, path)] from NAME=PATH specs and the A→B maps of a registry."""
+    targets = []
+    if registry:
+        targets += [(pair, conf["AB"]) for pair, conf in load_registry(registry).items()]
+    for spec in specs:
+        name, sep, path = spec.partition("=")
+        if not sep or not name or not path:
+            raise ValueError(f"--map expects NAME=PATH, got {spec!r}")
+        targets.append((name, path))
+    names = [name for name, _ in targets]
+    dup = sorted({n for n in names if names.count(n) > 1})
+    if dup:
+        raise ValueError(f"duplicate target names: {', '.join(dup)}")
+    return targets
+
+
+def wide_header(fmt, names):
+    """Return the header of the wide table: genome-A columns, then one column group per target."""
+    cols = ["contigA", "posA"] if fmt == "chrpos" else ["contigA", "startA", "endA"]
+    fields = ("contigB", "posB", "strand", "status") if fmt == "chrpos" else ("contigB", "startB", "endB", "strand", "status")
+    cols += [f"{name}.{field}" for name in names for field in fields]
+    return "\t".join(cols) + "\n"
+
+
+def lift_chrpos_targets(mappers, fin, writers):
+    """Lift CHR:POS lines through every mapper; return (total, mapped per target).
+
+    writers is one wide row writer, or one row writer per mapper for liftover.py rows.
+    """
+    n = len(mappers)
+    wide = len(writers) == 1 and n > 1
+    total, mapped = 0, [0] * n
+    for line in fin:
+        s = line.strip()
+        if not s:
+            continue
+        total += 1
+        try:
+            contigA, posA = s.split(":")
+            pos = int(posA)
+            if pos < 1:
+                raise ValueError("posA must be >= 1 for CHR:POS format")
+        except Exception:
+            if wide:
+                writers[0]("", "", *("", "", "", "BAD_INPUT") * n)
+            else:
+                for write_row in writers:
+                    write_row("", "", "", "", "", "BAD_INPUT")
+            continue
+        cells = []
+        for k, mapper in enumerate(mappers):
+            status, contigB, posB, strand = mapper.map_point(contigA, pos - 1)
+            if status == "OK":
+                mapped[k] += 1
+                cells.append((contigB, posB + 1, strand, "OK"))
+            else:
+                cells.append(("", "", "", status))
+        if wide:
+            writers[0](contigA, pos, *(field for cell in cells for field in cell))
+        else:
+            for write_row, cell in zip(writers, cells):
+                write_row(contigA, pos, *cell)
+    return total, mapped
+
+
+def lift_bed_targets(mappers, fin, writers, allow_split=False):
+    """Lift BED lines through every mapper; return (total, mapped per target, split rows per target).
+
+    writers is one wide row writer (no splitting), or one row writer per mapper for liftover.py rows.
+    """
+    n = len(mappers)
+    wide = len(writers) == 1 and n > 1
+    total, mapped, split = 0, [0] * n, [0] * n
+    for line in fin:
+        if not line.strip():
+            continue
+        total += 1
+        parts = line.rstrip().split("\t")
+        contigA, startA, endA = parts[:3]
+        startA, endA = int(startA), int(endA)
+        cells = []
+        for k, mapper in enumerate(mappers):
+            status, pieces = mapper.map_interval(contigA, startA, endA, allow_split)
+            if status == "OK":
+                _, _, contigB, startB, endB, strand = pieces[0]
+                mapped[k] += 1
+                cells.append((contigB, startB, endB, strand, "OK"))
+            elif status == "SPLIT":
+                # Only per-target output allows splitting, so the pieces go straight to this target's file.
+                mapped[k] += 1
+                split[k] += write_split_rows(writers[k], pieces, contigA)
+                cells.append(None)
+            else:
+                cells.append(("", "", "", "", status))
+        if wide:
+            writers[0](contigA, startA, endA, *(field for cell in cells for field in cell))
+        else:
+            for write_row, cell in zip(writers, cells):
+                if cell is not None:
+                    write_row(contigA, startA, endA, *cell)
+    return total, mapped, split
+
+
+def main():
+    """Entry point: lift the input through every target map."""
+    args = parse_args()
+    try:
+        targets = parse_targets(args.map, args.registry)
+    except (OSError, ValueError) as e:
+        sys.exit(f"error: {e}")
+    if not targets:
+        sys.exit("error: give at least one --map NAME=PATH or --registry")
+    per_target = "{name}" in args.output
+    if args.allow_split and (args.format != "bed" or not per_target):
+        sys.exit("error: --allow-split needs BED input and one output per target ({name} in -o)")
+    names = [name for name, _ in targets]
+    paths = [args.output.replace("{name}", name) for name in names] if per_target else [args.output]
+    try:
+        for path in paths:
+            check_output(path, args.output_format)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    mappers = [Mapper(load_blocks(path), sorted_input=args.assume_sorted) for _, path in targets]
+    header = HEADER_CHRPOS if args.format == "chrpos" else HEADER_BED
+    if not per_target and len(mappers) > 1:
+        header = wide_header(args.format, names)
+    for path in paths:
+        parent = os.path.dirname(path)
+        if parent and path != "-":
+            os.makedirs(parent, exist_ok=True)
+    with ExitStack() as stack:
+        writers = []
+        for path in paths:
+            fout = stack.enter_context(open_writer(path, args.output_format))
+            fout.write(header)
+            writers.append(row_writer(fout, header))
+        with open_input(args.input) as fin:
+            if args.format == "chrpos":
+                total, mapped = lift_chrpos_targets(mappers, fin, writers)
+                split = None
+            else:
+                total, mapped, split = lift_bed_targets(mappers, fin, writers, args.allow_split)
+    if args.stats:
+        for k, name in enumerate(names):
+            extra = f" split={split[k]}" if split is not None else ""
+            extra += f" unsorted={mappers[k].unsorted}" if args.assume_sorted else ""
+            print(f"target={name} total={total} mapped={mapped[k]}{extra}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
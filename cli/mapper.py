@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""Importable liftover API over a loaded block map.
+
+    from mapper import Mapper
+    m = Mapper.load("web/data/pombase_leupold/A_to_B.blocks.tsv", cache_size=64)
+    m.map_point("I", 999)                   # ("OK", "I", 12356, "+")
+    m.map_interval("I", 1000, 5000, True)   # ("SPLIT", [(1000, 4053, "I", ...), ...])
+    m.map_many([("I", 10), ("II", 20)])     # [("OK", "I", 11367, "+"), ("OK", "II", 29787, "+")]
+    m.map_point_all("I", 999)               # ("OK", [("I", 12356, "+", 60)]), every block, best mapq first
+    m.map_reverse("I", 12000, 12500)        # ("OK", [(12000, 12500, "I", 643, 1143, "+", 60)]), B → A sources
+
+Coordinates are 0-based; intervals are half-open. A Mapper is meant to be
+loaded once per long-lived process and reused across requests.
+"""
+from bisect import bisect_right
+from collections import OrderedDict
+from importlib.util import find_spec
+
+from blockstore import (
+    build_reverse_index,
+    find_block,
+    find_overlaps,
+    image_range,
+    load_blocks,
+    map_point,
+    overlap_indices,
+    split_interval,
+)
+
+# NumPy is imported by the batch functions on first use, so tools that never
+# batch do not pay for the import; without it map_many maps query by query.
+HAVE_NUMPY = find_spec("numpy") is not None
+
+# The block cache is keyed by (contig, pos >> CACHE_BUCKET_BITS): one entry per 4 kb stretch of a hot locus.
+CACHE_BUCKET_BITS = 12
+
+# Positions are clamped to this magnitude before entering int64 arrays; any
+# clamped value still falls outside every block, exactly as in find_block.
+MAX_BATCH_POS = 2**62
+
+
+def build_batch_index(blocks_by_contig):
+    """Wrap each contig's block columns as NumPy arrays for vectorized lookup (zero-copy)."""
+    import numpy as np
+
+    index = {}
+    for c, blocks in blocks_by_contig.items():
+        n = len(blocks)
+        startA = np.frombuffer(blocks.startA, dtype=np.int64)
+        endA = np.frombuffer(blocks.endA, dtype=np.int64)
+        minus = np.unpackbits(np.frombuffer(blocks.strand_bits, dtype=np.uint8), count=n, bitorder="little")
+        index[c] = {
+            "blocks": blocks,
+            "startA": startA,
+            "endA": endA,
+            "overlapping": bool(np.any(startA[1:] < np.maximum.accumulate(endA)[:-1])),
+            "startB": np.frombuffer(blocks.startB, dtype=np.int64),
+            "contigB": np.frombuffer(blocks.contigB, dtype=np.uint32),
+            "minus": minus.astype(bool),
+        }
+    return index
+
+
+def find_blocks_batch(arrays, positions):
+    """Vectorized find_block: block index per position on genome A, or -1 if unmapped.
+
+    Contigs whose blocks overlap in A fall back to find_block per position so the
+    chosen block is the same one the scalar binary search returns.
+    """
+    import numpy as np
+
+    if arrays["overlapping"]:
+        blocks = arrays["blocks"]
+        found = (find_block(blocks, p) for p in positions.tolist())
+        return np.fromiter((-1 if i is None else i for i in found), dtype=np.int64, count=len(positions))
+    idx = np.searchsorted(arrays["startA"], positions, side="right") - 1
+    safe = np.maximum(idx, 0)
+    hit = (idx >= 0) & (positions < arrays["endA"][safe])
+    return np.where(hit, idx, -1)
+
+
+def map_points_batch(arrays, idx, positions):
+    """Vectorized map_point: positions on genome B for positions inside blocks idx."""
+    import numpy as np
+
+    startA = arrays["startA"][idx]
+    offset = positions - startA
+    length = arrays["endA"][idx] - startA
+    startB = arrays["startB"][idx]
+    return np.where(arrays["minus"][idx], startB + (length - 1 - offset), startB + offset)
+
+
+def direct_finder(blocks_by_contig):
+    """Return find(contig, pos) -> (blocks, idx) over a map, as used by Mapper without a cache or cursor.
+
+    Disjoint contigs are bisected inline on their startA column; contigs with
+    overlapping blocks go through find_block. blocks is None for an unknown
+    (or empty) contig and idx is None for an unmapped position.
+    """
+    entries = {}
+
+    def find(contig, pos):
+        entry = entries.get(contig)
+        if entry is None:
+            blocks = blocks_by_contig.get(contig)
+            if not blocks:
+                return None, None
+            entry = entries[contig] = (blocks, blocks.startA, blocks.endA) if blocks.disjoint() else (blocks, None, None)
+        blocks, startA, endA = entry
+        if startA is None:
+            return blocks, find_block(blocks, pos)
+        i = bisect_right(startA, pos) - 1
+        return blocks, (i if i >= 0 and pos < endA[i] else None)
+
+    return find
+
+
+class SortedCursor:
+    """Block lookup for queries that arrive sorted by position within each contig.
+
+    Each contig keeps a cursor on the first block not yet passed. A query
+    gallops forward from the cursor (amortized O(1) for dense input, and
+    O(log gap) after a jump) instead of searching the whole contig, so memory
+    is read sequentially. A position smaller than the previous one on the same
+    contig re-seeks with a full binary search and is counted in `unsorted`;
+    results stay correct either way. Contigs whose blocks overlap in A always
+    use find_block so the chosen block matches the binary search.
+    """
+
+    def __init__(self, blocks_by_contig):
+        self.blocks_by_contig = blocks_by_contig
+        self._state = {}
+        self.unsorted = 0
+
+    def find(self, contig, pos):
+        """Return (blocks, idx) like Mapper.find."""
+        blocks = self.blocks_by_contig.get(contig)
+        if not blocks:
+            return None, None
+        state = self._state.get(contig)
+        if state is None:
+            state = self._state[contig] = [0, pos] if blocks.disjoint() else False
+        if state is False:
+            return blocks, find_block(blocks, pos)
+        endA = blocks.endA
+        n = len(endA)
+        i, last = state
+        if pos < last:
+            self.unsorted += 1
+            i = bisect_right(endA, pos)
+        elif i < n and endA[i] <= pos:
+            # Gallop: double the step until a block ending after pos is bracketed.
+            step = 1
+            lo = i
+            while i + step < n and endA[i + step] <= pos:
+                lo = i + step
+                step *= 2
+            i = bisect_right(endA, pos, lo + 1, min(i + step, n))
+        state[0], state[1] = i, pos
+        if i < n and blocks.startA[i] <= pos:
+            return blocks, i
+        return blocks, None
+
+
+class Mapper:
+    """Point, interval and batch liftover against one block map.
+
+    With cache_size > 0, up to cache_size recently resolved blocks are kept in
+    an LRU keyed by contig and 4 kb bucket of the query; a query checks the
+    block remembered for its bucket in O(1) before the binary search, which
+    pays off when queries cluster around hot loci. (Where blocks overlap in A,
+    a cached block may be returned instead of the one the binary search would
+    pick.) With sorted_input, lookups walk a SortedCursor instead; `unsorted`
+    counts the queries that arrived out of order and were re-sought by binary
+    search.
+    """
+
+    def __init__(self, blocks_by_contig, cache_size=0, sorted_input=False):
+        self.blocks_by_contig = blocks_by_contig
+        self.cache_size = cache_size
+        self._cursor = SortedCursor(blocks_by_contig) if sorted_input else None
+        self._cache = OrderedDict()
+        self._find_direct = direct_finder(blocks_by_contig)
+        # find(contig, pos) returns (blocks, idx) for the block containing pos;
+        # blocks is None for an unknown contig. It is bound once to the lookup
+        # the options ask for, so the default path is a plain binary search.
+        if sorted_input:
+            self.find = self._cursor.find
+        elif cache_size:
+            self.find = self._find_cached
+        else:
+            self.find = self._find_direct
+        self._batch_index = None
+        self._reverse_index = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path, cache_size=0, sorted_input=False):
+        """Load a blocks TSV, chain file or compiled index (see blockstore.load_blocks)."""
+        return cls(load_blocks(path), cache_size, sorted_input)
+
+    @property
+    def unsorted(self):
+        """Number of out-of-order queries seen in sorted_input mode."""
+        return self._cursor.unsorted if self._cursor is not None else 0
+
+    def _find_cached(self, contig, pos):
+        """find with the LRU of hot loci: check the block last found in pos's bucket, else search and remember it."""
+        key = (contig, pos >> CACHE_BUCKET_BITS)
+        cache = self._cache
+        idx = cache.get(key)
+        if idx is not None:
+            blocks = self.blocks_by_contig[contig]
+            if blocks.startA[idx] <= pos < blocks.endA[idx]:
+                cache.move_to_end(key)
+                self.hits += 1
+                return blocks, idx
+        self.misses += 1
+        blocks, idx = self._find_direct(contig, pos)
+        if idx is not None:
+            cache[key] = idx
+            cache.move_to_end(key)
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return blocks, idx
+
+    def map_point(self, contig, pos):
+        """Map one 0-based position; return (status, contigB, posB, strand).
+
+        status is "OK", "NO_CONTIG" or "UNMAPPED".
+        """
+        blocks, idx = self.find(contig, pos)
+        if blocks is None:
+            return ("NO_CONTIG", None, None, None)
+        if idx is None:
+            return ("UNMAPPED", None, None, None)
+        contigB, posB, strand = map_point(blocks, idx, pos)
+        return ("OK", contigB, posB, strand)
+
+    def map_interval(self, contig, start, end, allow_split=False):
+        """Map a 0-based half-open interval; return (status, pieces).
+
+        status is "OK" (one block), "SPLIT" (allow_split and several pieces),
+        "NO_CONTIG", "UNMAPPED_START" or "CROSSES_BLOCK". pieces are
+        (startA, endA, contigB, startB, endB, strand) tuples as produced by
+        blockstore.split_interval; unmapped pieces have contigB None.
+        """
+        blocks, idx = self.find(contig, start)
+        if blocks is None:
+            return ("NO_CONTIG", [])
+        if idx is None:
+            return ("UNMAPPED_START", [])
+        if end <= blocks.endA[idx]:
+            contigB, startB, strand = map_point(blocks, idx, start)
+            _, endB, _ = map_point(blocks, idx, end - 1)
+            return ("OK", [(start, end, contigB, startB, endB + 1, strand)])
+        if not allow_split:
+            return ("CROSSES_BLOCK", [])
+        return ("SPLIT", self.split(blocks, start, end))
+
+    def split(self, blocks, start, end):
+        """Split [start, end) of one contig at block boundaries (see blockstore.split_interval)."""
+        return split_interval(blocks, start, end)
+
+    def find_all(self, contig, start, end):
+        """Return (blocks, indices) of every block overlapping [start, end), ranked by mapq (highest first).
+
+        Blocks with equal mapq keep their startA order. blocks is None for an unknown contig.
+        """
+        blocks = self.blocks_by_contig.get(contig)
+        if not blocks:
+            return None, []
+        hits = find_overlaps(blocks, start, end)
+        if len(hits) > 1:
+            hits.sort(key=lambda i: -blocks.mapq[i])
+        return blocks, hits
+
+    def map_point_all(self, contig, pos):
+        """Map one 0-based position to every block covering it; return (status, hits).
+
+        status is "OK", "NO_CONTIG" or "UNMAPPED"; hits are (contigB, posB,
+        strand, mapq) tuples ranked as in find_all.
+        """
+        blocks, idxs = self.find_all(contig, pos, pos + 1)
+        if blocks is None:
+            return ("NO_CONTIG", [])
+        if not idxs:
+            return ("UNMAPPED", [])
+        return ("OK", [map_point(blocks, i, pos) + (blocks.mapq[i],) for i in idxs])
+
+    def map_interval_all(self, contig, start, end):
+        """Map a 0-based half-open interval through every block overlapping it; return (status, pieces).
+
+        status is "OK", "NO_CONTIG" or "UNMAPPED". pieces are (startA, endA,
+        contigB, startB, endB, strand, mapq) tuples, one per block, clipped to
+        the block and ranked as in find_all.
+        """
+        blocks, idxs = self.find_all(contig, start, max(end, start + 1))
+        if blocks is None:
+            return ("NO_CONTIG", [])
+        if not idxs:
+            return ("UNMAPPED", [])
+        pieces = []
+        for i in idxs:
+            a, a_end = max(start, blocks.startA[i]), min(end, blocks.endA[i])
+            contigB, startB, strand = map_point(blocks, i, a)
+            _, endB, _ = map_point(blocks, i, a_end - 1)
+            pieces.append((a, a_end, contigB, startB, endB + 1, strand, blocks.mapq[i]))
+        return ("OK", pieces)
+
+    def find_reverse(self, contigB, start, end):
+        """Return (reverse blocks, entries) of every block whose genome-B image overlaps [start, end), in startB order.
+
+        The reverse index (blockstore.build_reverse_index) is built over the
+        whole map on first use. reverse blocks is None for a contig that no
+        block maps to.
+        """
+        if self._reverse_index is None:
+            self._reverse_index = build_reverse_index(self.blocks_by_contig)
+        rb = self._reverse_index.get(contigB)
+        if rb is None:
+            return None, []
+        return rb, overlap_indices(rb.startB, rb.endB, rb.tree, start, end)
+
+    def map_reverse(self, contigB, start, end):
+        """Find the genome-A sources of a 0-based half-open genome-B interval; return (status, pieces).
+
+        status is "OK", "NO_CONTIG" or "UNMAPPED". pieces are (startB, endB,
+        contigA, startA, endA, strand, mapq) tuples, one per contributing
+        block in startB order: the part of the interval inside the block's
+        image and the A segment that maps onto it.
+        """
+        rb, entries = self.find_reverse(contigB, start, max(end, start + 1))
+        if rb is None:
+            return ("NO_CONTIG", [])
+        if not entries:
+            return ("UNMAPPED", [])
+        pieces = []
+        for e in entries:
+            x, y = max(start, rb.startB[e]), min(end, rb.endB[e])
+            contigA = rb.names_a[rb.contigA[e]]
+            blocks, i = self.blocks_by_contig[contigA], rb.idx[e]
+            a, a_end = image_range(blocks, i, x, y)
+            pieces.append((x, y, contigA, a, a_end, blocks.strand(i), blocks.mapq[i]))
+        return ("OK", pieces)
+
+    def map_many(self, queries):
+        """Map a batch of (contig, pos) queries; return a list of map_point results in order.
+
+        With NumPy installed, each contig's positions are resolved with one
+        vectorized search; otherwise queries are mapped one by one.
+        """
+        queries = list(queries)
+        if not HAVE_NUMPY:
+            return [self.map_point(c, p) for c, p in queries]
+        import numpy as np
+
+        if self._batch_index is None:
+            self._batch_index = build_batch_index(self.blocks_by_contig)
+        results = [None] * len(queries)
+        groups = {}
+        for k, (contig, pos) in enumerate(queries):
+            if contig not in self._batch_index:
+                results[k] = ("NO_CONTIG", None, None, None)
+                continue
+            slots, positions = groups.setdefault(contig, ([], []))
+            slots.append(k)
+            positions.append(pos)
+        for contig, (slots, positions) in groups.items():
+            arrays = self._batch_index[contig]
+            blocks = arrays["blocks"]
+            pos = np.asarray([max(-MAX_BATCH_POS, min(p, MAX_BATCH_POS)) for p in positions], dtype=np.int64)
+            idx = find_blocks_batch(arrays, pos)
+            hit = idx >= 0
+            posB = np.zeros_like(pos)
+            posB[hit] = map_points_batch(arrays, idx[hit], pos[hit])
+            for k, i, pB in zip(slots, idx.tolist(), posB.tolist()):
+                if i < 0:
+                    results[k] = ("UNMAPPED", None, None, None)
+                else:
+                    results[k] = ("OK", blocks.contig_b(i), pB, blocks.strand(i))
+        return results
+
+    def map_columns(self, contigs, positions):
+        """Map parallel columns of contigs and 0-based positions (a NumPy int64 array) in one pass (requires NumPy).
+
+        Return (status, contigB, posB, strand) as NumPy arrays: status, contigB
+        and strand hold strings (object dtype), with contigB and strand None
+        where status is not "OK"; posB is int64 and 0 there. Queries are
+        grouped by contig with one sort, and each group is resolved with one
+        vectorized search.
+        """
+        import numpy as np
+
+        if self._batch_index is None:
+            self._batch_index = build_batch_index(self.blocks_by_contig)
+        n = len(positions)
+        status = np.full(n, "NO_CONTIG", dtype=object)
+        contigB = np.full(n, None, dtype=object)
+        strand = np.full(n, None, dtype=object)
+        posB = np.zeros(n, dtype=np.int64)
+        codes = {c: k for k, c in enumerate(dict.fromkeys(contigs))}
+        ids = np.fromiter(map(codes.__getitem__, contigs), dtype=np.int64, count=n)
+        order = np.argsort(ids, kind="stable")
+        bounds = np.searchsorted(ids[order], np.arange(len(codes) + 1))
+        for contig, k in codes.items():
+            arrays = self._batch_index.get(contig)
+            if arrays is None:
+                continue
+            rows = order[bounds[k]:bounds[k + 1]]
+            pos = np.clip(positions[rows], -MAX_BATCH_POS, MAX_BATCH_POS)
+            idx = find_blocks_batch(arrays, pos)
+            hit = idx >= 0
+            rows_hit, idx_hit = rows[hit], idx[hit]
+            status[rows] = "UNMAPPED"
+            status[rows_hit] = "OK"
+            posB[rows_hit] = map_points_batch(arrays, idx_hit, pos[hit])
+            names_b = np.asarray(arrays["blocks"].names_b, dtype=object)
+            contigB[rows_hit] = names_b[arrays["contigB"][idx_hit]]
+            strand[rows_hit] = np.where(arrays["minus"][idx_hit], "-", "+").astype(object)
+        return status, contigB, posB, strand
+
+    def cache_info(self):
+        """Return (hits, misses, current size, max size) of the block cache."""
+        return self.hits, self.misses, len(self._cache), self.cache_size
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Phase timings and hot-path counters for liftover.py --metrics-json.
+
+A Metrics object is handed to the lift functions, and the input and output
+streams are wrapped (timed_lines, Metrics.output). It records:
+- wall and CPU time per phase;
+- output rows per status and per genome-A contig;
+- block lookups;
+- the pieces of each split interval;
+- peak memory.
+Lookups and reads are timed per call and "parse_and_format" is the rest of
+the lift phase. The counters cost a few attribute updates per record and are
+only active when a Metrics object is passed in. profiled() wraps a run in
+cProfile for function-level detail.
+"""
+import cProfile
+import io
+import json
+import pstats
+import resource
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Return the peak resident set size of this process (or its children) in MB."""
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+class Metrics:
+    """Counters and phase timers for one liftover run (or one -j shard)."""
+
+    def __init__(self, status_col=None):
+        self.status_col = status_col
+        self.phases = {}
+        self.lookups = 0
+        self.status = Counter()
+        self.contigs = {}
+        self.split_pieces = Counter()
+
+    def add_phase(self, name, wall, cpu=None):
+        """Add wall (and CPU) seconds to a phase."""
+        phase = self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0 if cpu is not None else None})
+        phase["wall"] += wall
+        if cpu is not None:
+            phase["cpu"] = (phase["cpu"] or 0.0) + cpu
+
+    @contextmanager
+    def phase(self, name):
+        """Time the body of a with block as phase name (wall and process CPU time)."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    @contextmanager
+    def span(self, name):
+        """Add the wall time of a with block to phase name (for short, frequent sections)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - t0)
+
+    def timed(self, name, fn, lookups=None):
+        """Wrap fn so that each call adds its wall time to phase name and counts as lookups.
+
+        lookups(result) gives the number of block searches a call made (default 1).
+        """
+        perf_counter = time.perf_counter
+
+        def wrapper(*args):
+            t0 = perf_counter()
+            result = fn(*args)
+            self.add_phase(name, perf_counter() - t0)
+            self.lookups += 1 if lookups is None else lookups(result)
+            return result
+
+        return wrapper
+
+    def watch(self, mapper):
+        """Count and time the block lookups of a Mapper (find, find_all, find_reverse and split, one search per piece)."""
+        mapper.find = self.timed("lookup", mapper.find)
+        mapper.find_all = self.timed("lookup", mapper.find_all)
+        mapper.find_reverse = self.timed("lookup", mapper.find_reverse)
+        mapper.split = self.timed("lookup", mapper.split, len)
+        return mapper
+
+    def output(self, fout):
+        """Return a writer that times writes to fout and counts the rows passing through."""
+        if hasattr(fout, "write_row"):
+            return MetricsRowWriter(fout, self)
+        return MetricsWriter(fout, self)
+
+    def count_rows(self, text):
+        """Count output rows by status and by contig (first column)."""
+        col = self.status_col
+        for row in text.splitlines():
+            if not row or row[0] == "#":
+                continue
+            fields = row.split("\t")
+            status = fields[col] if col is not None and len(fields) > col else "OK"
+            self.status[status] += 1
+            per_contig = self.contigs.get(fields[0])
+            if per_contig is None:
+                per_contig = self.contigs[fields[0]] = Counter()
+            per_contig[status] += 1
+
+    def count_row(self, row):
+        """Count one output row given as a tuple (see count_rows)."""
+        col = self.status_col
+        status = row[col] if col is not None and len(row) > col else "OK"
+        self.status[status] += 1
+        per_contig = self.contigs.get(row[0])
+        if per_contig is None:
+            per_contig = self.contigs[row[0]] = Counter()
+        per_contig[status] += 1
+
+    def merge(self, other):
+        """Add the counters and phase times of another Metrics (e.g. from a -j worker).
+
+        Shards run side by side, so their wall times are not added to this
+        run's: a merged phase reports the mean wall time per shard, with the
+        sum under "worker_wall_sum". CPU times are summed.
+        """
+        for name, phase in other.phases.items():
+            self.add_phase(name, phase["wall"], phase["cpu"])
+            merged = self.phases[name]
+            merged["shards"] = merged.get("shards", 0) + 1
+        self.lookups += other.lookups
+        self.status.update(other.status)
+        for contig, counts in other.contigs.items():
+            self.contigs.setdefault(contig, Counter()).update(counts)
+        self.split_pieces.update(other.split_pieces)
+
+    def as_dict(self, counts=None):
+        """Return the metrics as a JSON-serializable dict; counts are the lift function's named totals."""
+        records = (counts or {}).get("total", 0)
+        n_split = sum(self.split_pieces.values())
+        phases = {}
+        for name, p in self.phases.items():
+            p = dict(p)
+            shards = p.pop("shards", None)
+            if shards:
+                p["worker_wall_sum"] = p["wall"]
+                p["wall"] /= shards
+            phases[name] = p
+        if "lift" in phases:
+            # Whatever the lift loop spent outside reading, lookups and writing: parsing and formatting.
+            inner = sum(phases[name]["wall"] for name in ("read_input", "lookup", "write_output") if name in phases)
+            phases["parse_and_format"] = {"wall": max(0.0, phases["lift"]["wall"] - inner), "cpu": None}
+            if "worker_wall_sum" in phases["lift"]:
+                inner = sum(phases[name].get("worker_wall_sum", 0.0) for name in ("read_input", "lookup", "write_output") if name in phases)
+                phases["parse_and_format"]["worker_wall_sum"] = max(0.0, phases["lift"]["worker_wall_sum"] - inner)
+        return {
+            "phases": {name: {k: (round(v, 6) if v is not None else None) for k, v in p.items()} for name, p in phases.items()},
+            "counts": counts or {},
+            "records": records,
+            "lookups": self.lookups,
+            "lookups_per_record": round(self.lookups / records, 4) if records else 0,
+            "status": dict(self.status),
+            "contigs": {c: dict(v) for c, v in sorted(self.contigs.items())},
+            "split_intervals": n_split,
+            "pieces_per_split": round(sum(k * v for k, v in self.split_pieces.items()) / n_split, 4) if n_split else 0,
+            "split_pieces_histogram": {str(k): v for k, v in sorted(self.split_pieces.items())},
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "peak_rss_children_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        }
+
+    def write(self, path, counts=None):
+        """Write the metrics as JSON to path."""
+        with open(path, "w") as f:
+            json.dump(self.as_dict(counts), f, indent=1)
+            f.write("\n")
+
+
+class MetricsWriter:
+    """File-like wrapper that times writes and counts the rows written (see Metrics.count_rows)."""
+
+    def __init__(self, fout, metrics):
+        self.fout = fout
+        self.metrics = metrics
+
+    def write(self, text):
+        self.metrics.count_rows(text)
+        t0 = time.perf_counter()
+        n = self.fout.write(text)
+        self.metrics.add_phase("write_output", time.perf_counter() - t0)
+        return n
+
+
+class MetricsRowWriter(MetricsWriter):
+    """MetricsWriter for a writer that takes rows as tuples (write_row, write_rows)."""
+
+    def write_row(self, *row):
+        self.metrics.count_row(row)
+        t0 = time.perf_counter()
+        self.fout.write_row(*row)
+        self.metrics.add_phase("write_output", time.perf_counter() - t0)
+
+    def write_rows(self, rows):
+        rows = list(rows)
+        for row in rows:
+            self.metrics.count_row(row)
+        t0 = time.perf_counter()
+        self.fout.write_rows(rows)
+        self.metrics.add_phase("write_output", time.perf_counter() - t0)
+
+
+def timed_lines(lines, metrics, name="read_input"):
+    """Yield lines from an iterator, adding the time spent reading them to phase name."""
+    perf_counter = time.perf_counter
+    it = iter(lines)
+    while True:
+        t0 = perf_counter()
+        line = next(it, None)
+        metrics.add_phase(name, perf_counter() - t0)
+        if line is None:
+            return
+        yield line
+
+
+@contextmanager
+def profiled(path=None, top=25):
+    """Run the body under cProfile; dump stats to path (if given) and print the top functions to stderr."""
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        if path:
+            profile.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(top)
+        print(out.getvalue(), file=sys.stderr)
@@ -1,5 +1,17 @@
 #!/usr/bin/env python3
 import argparse
+import multiprocessing
+import re
+from collections import deque
+
+from xopen import open_input, open_output
+
+CIGAR_TOKEN = re.compile(r"(\d+)([MIDNSHP=X])")
+CIGAR_FULL = re.compile(r"(?:\d+[MIDNSHP=X])*")
+MATCH_OPS = frozenset("M=X")
+# Lines per unit of work handed to a worker; long whole-genome CIGARs are also capped by size.
+CHUNK_LINES = 1000
+CHUNK_BYTES = 1 << 20
 
 
 def parse_args():
@@ -9,30 +21,87 @@ def parse_args():
     )
     p.add_argument(
         "paf",
-        help="Input PAF file produced by minimap2 with -c to include cg:Z CIGAR",
+        help="Input PAF file produced by minimap2 with -c to include cg:Z CIGAR ('-' for stdin, gzip accepted)",
     )
     p.add_argument(
         "-o",
         "--output",
         default="A_to_B.blocks.tsv",
-        help="Output blocks TSV file (default: A_to_B.blocks.tsv)",
+        help="Output blocks TSV file, '-' for stdout, .gz for BGZF (default: A_to_B.blocks.tsv)",
+    )
+    p.add_argument(
+        "--chain",
+        action="store_true",
+        help="Write UCSC chain records (genome A as target, B as query, mapq as score) instead of one row per block",
+    )
+    p.add_argument(
+        "-j",
+        "--threads",
+        type=int,
+        default=1,
+        help="Worker processes converting PAF lines; output order is unchanged",
     )
     return p.parse_args()
 
 
 def parse_cigar(cg):
     """Parse a compact CIGAR (cg:Z) string into a list of (op, length) tuples."""
-    ops = []
-    num = []
-    for ch in cg:
-        if ch.isdigit():
-            num.append(ch)
-        else:
-            if not num:
-                raise ValueError(f"Malformed CIGAR: {cg}")
-            ops.append((ch, int("".join(num))))
-            num = []
-    return ops
+    if not CIGAR_FULL.fullmatch(cg):
+        raise ValueError(f"Malformed CIGAR: {cg}")
+    return [(op, int(n)) for n, op in CIGAR_TOKEN.findall(cg)]
+
+
+def match_runs(cg):
+    """Return (q_offset, t_offset, length) for each run of match-like CIGAR operations.
+
+    Adjacent 'M', '=' and 'X' operations form one run; 'I' advances the query
+    offset, 'D' and 'N' the target offset, and clips and padding are ignored.
+    Offsets are relative to the alignment start on the query and on the target
+    strand the query aligns to.
+    """
+    if not CIGAR_FULL.fullmatch(cg):
+        raise ValueError(f"Malformed CIGAR: {cg}")
+    runs = []
+    q = t = run = 0
+    for n, op in CIGAR_TOKEN.findall(cg):
+        if op in MATCH_OPS:
+            run += int(n)
+            continue
+        if run:
+            runs.append((q, t, run))
+            q += run
+            t += run
+            run = 0
+        if op == "I":
+            q += int(n)
+        elif op in "DN":
+            t += int(n)
+        # S, H and P do not occur in minimap2 cg:Z and are skipped.
+    if run:
+        runs.append((q, t, run))
+    return runs
+
+
+def parse_paf(paf_line):
+    """Split one PAF line into (fields, match runs); see match_runs."""
+    parts = paf_line.rstrip().split("\t")
+    for field in parts[12:]:
+        if field.startswith("cg:Z:"):
+            return parts, match_runs(field[5:])
+    raise ValueError("PAF line lacks cg:Z (use minimap2 -c)")
+
+
+def run_coords(parts, runs):
+    """Yield (startA, endA, startB, endB) of each match run of one alignment (A = PAF query, B = target)."""
+    q_start = int(parts[2])
+    if parts[4] == "+":
+        t_start = int(parts[7])
+        for q, t, ln in runs:
+            yield q_start + q, q_start + q + ln, t_start + t, t_start + t + ln
+    else:
+        t_end = int(parts[8])
+        for q, t, ln in runs:
+            yield q_start + q, q_start + q + ln, t_end - t - ln, t_end - t
 
 
 def paf_to_blocks(paf_line):
@@ -41,97 +110,116 @@ def paf_to_blocks(paf_line):
     Returns a list of dicts: {
         contigA, startA, endA, contigB, startB, endB, strand, mapq
     }
-    Only 'M' match segments emit blocks; gaps are absorbed as coordinate advances.
+    Runs of match-like operations ('M', '=', 'X') emit one block each; 'I' and
+    'D' gaps are absorbed as coordinate advances. Other operations are rejected.
     """
-    parts = paf_line.rstrip().split("\t")
-    q_name = parts[0]
-    q_len = int(parts[1])
-    q_start = int(parts[2])
-    q_end = int(parts[3])
-    strand = parts[4]
-    t_name = parts[5]
-    t_len = int(parts[6])
-    t_start = int(parts[7])
-    t_end = int(parts[8])
+    parts, runs = parse_paf(paf_line)
     mapq = int(parts[11]) if len(parts) > 11 else 0
-    cg = None
-    for field in parts[12:]:
-        if field.startswith("cg:Z:"):
-            cg = field[5:]
-            break
-    if cg is None:
-        raise ValueError("PAF line lacks cg:Z (use minimap2 -c)")
-    ops = parse_cigar(cg)
-
-    blocks = []
-    qa = q_start
-    if strand == "+":
-        ta = t_start
-        for op, ln in ops:
-            if op == "M":
-                blocks.append({
-                    "contigA": q_name,
-                    "startA": qa,
-                    "endA": qa + ln,
-                    "contigB": t_name,
-                    "startB": ta,
-                    "endB": ta + ln,
-                    "strand": "+",
-                    "mapq": mapq,
-                })
-                qa += ln
-                ta += ln
-            elif op == "I":
-                qa += ln
-            elif op == "D":
-                ta += ln
-            else:
-                # Treat other ops (e.g., =/X if present) as match-like by splitting
-                # Here we conservatively skip unknown ops
-                pass
-    else:
-        ta = t_end
-        for op, ln in ops:
-            if op == "M":
-                blocks.append({
-                    "contigA": q_name,
-                    "startA": qa,
-                    "endA": qa + ln,
-                    "contigB": t_name,
-                    "startB": ta - ln,
-                    "endB": ta,
-                    "strand": "-",
-                    "mapq": mapq,
-                })
-                qa += ln
-                ta -= ln
-            elif op == "I":
-                qa += ln
-            elif op == "D":
-                ta -= ln
-            else:
-                pass
-    return blocks
-
-
-def write_blocks(paf_path, out_path):
-    """Read a PAF file and write a block mapping TSV to out_path."""
-    with open(paf_path) as fin, open(out_path, "w") as fout:
-        fout.write("contigA\tstartA\tendA\tcontigB\tstartB\tendB\tstrand\tmapq\n")
-        for line in fin:
-            if not line.strip():
-                continue
-            bs = paf_to_blocks(line)
-            for b in bs:
-                fout.write(
-                    f"{b['contigA']}\t{b['startA']}\t{b['endA']}\t{b['contigB']}\t{b['startB']}\t{b['endB']}\t{b['strand']}\t{b['mapq']}\n"
-                )
+    return [
+        {
+            "contigA": parts[0],
+            "startA": startA,
+            "endA": endA,
+            "contigB": parts[5],
+            "startB": startB,
+            "endB": endB,
+            "strand": parts[4],
+            "mapq": mapq,
+        }
+        for startA, endA, startB, endB in run_coords(parts, runs)
+    ]
+
+
+def runs_to_chain(parts, runs, chain_id):
+    """Format one alignment as a UCSC chain record (header, size/dt/dq lines, blank line).
+
+    Genome A (the PAF query) is the chain's target side and genome B its query
+    side; on "-" alignments the query coordinates count from the end of the B
+    contig, which is the orientation the CIGAR offsets already walk in.
+    """
+    q_name, q_len, q_start, strand = parts[0], int(parts[1]), int(parts[2]), parts[4]
+    t_name, t_len = parts[5], int(parts[6])
+    mapq = int(parts[11]) if len(parts) > 11 else 0
+    first, last = runs[0], runs[-1]
+    origin = int(parts[7]) if strand == "+" else t_len - int(parts[8])
+    lines = [
+        f"chain {mapq} {q_name} {q_len} + {q_start + first[0]} {q_start + last[0] + last[2]} "
+        f"{t_name} {t_len} {strand} {origin + first[1]} {origin + last[1] + last[2]} {chain_id}\n"
+    ]
+    for (q, t, ln), (nq, nt, _) in zip(runs, runs[1:]):
+        lines.append(f"{ln}\t{nq - q - ln}\t{nt - t - ln}\n")
+    lines.append(f"{last[2]}\n\n")
+    return "".join(lines)
+
+
+def convert_chunk(task):
+    """Convert a chunk of PAF lines to blocks TSV rows or chain records; return the text.
+
+    task is (chain, first_record, lines); chain ids are PAF record numbers, so
+    they do not depend on how the input was chunked.
+    """
+    chain, record, lines = task
+    out = []
+    for line in lines:
+        if not line.strip():
+            continue
+        record += 1
+        parts, runs = parse_paf(line)
+        if not chain:
+            prefix_a, suffix = f"{parts[0]}\t", f"\t{parts[4]}\t{int(parts[11]) if len(parts) > 11 else 0}\n"
+            infix = f"\t{parts[5]}\t"
+            for startA, endA, startB, endB in run_coords(parts, runs):
+                out.append(f"{prefix_a}{startA}\t{endA}{infix}{startB}\t{endB}{suffix}")
+        elif runs:
+            out.append(runs_to_chain(parts, runs, record))
+    return "".join(out)
+
+
+def read_chunks(fin, chain):
+    """Yield convert_chunk tasks of up to CHUNK_LINES lines or about CHUNK_BYTES characters."""
+    record = 0
+    lines, size = [], 0
+    for line in fin:
+        lines.append(line)
+        size += len(line)
+        if len(lines) >= CHUNK_LINES or size >= CHUNK_BYTES:
+            yield chain, record, lines
+            record += sum(1 for l in lines if l.strip())
+            lines, size = [], 0
+    if lines:
+        yield chain, record, lines
+
+
+def write_blocks(paf_path, out_path, chain=False, threads=1):
+    """Read a PAF file and write a block mapping TSV (or chain file) to out_path.
+
+    With threads > 1, chunks of PAF lines are converted by a process pool and
+    written back in input order, so the output is identical to a serial run.
+    At most 2 * threads chunks are in flight, so a streamed PAF is converted
+    in constant memory.
+    """
+    with open_input(paf_path) as fin, open_output(out_path) as fout:
+        if not chain:
+            fout.write("contigA\tstartA\tendA\tcontigB\tstartB\tendB\tstrand\tmapq\n")
+        tasks = read_chunks(fin, chain)
+        if threads <= 1:
+            for text in map(convert_chunk, tasks):
+                fout.write(text)
+            return
+        with multiprocessing.Pool(threads) as pool:
+            pending = deque()
+            for task in tasks:
+                if len(pending) >= 2 * threads:
+                    fout.write(pending.popleft().get())
+                pending.append(pool.apply_async(convert_chunk, (task,)))
+            while pending:
+                fout.write(pending.popleft().get())
 
 
 def main():
-    """Entry point: convert PAF to blocks TSV using cg:Z CIGAR segments."""
+    """Entry point: convert PAF to blocks TSV (or chain) using cg:Z CIGAR segments."""
     args = parse_args()
-    write_blocks(args.paf, args.output)
+    write_blocks(args.paf, args.output, args.chain, args.threads)
 
 
 if __name__ == "__main__":
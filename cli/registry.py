@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""The genome pair registry (web/genome_pairs.json) shared by serve.py and liftover_multi.py.
+
+It lists the same pairs as GENOME_PAIRS in web/app.js, each with the paths of
+its A→B and B→A maps.
+"""
+import json
+import os
+
+DEFAULT_REGISTRY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "web", "genome_pairs.json")
+
+
+def load_registry(path):
+    """Read the pair registry; return {pair: {"AB": map path, "BA": map path, **metadata}}.
+
+    Map paths in the registry are relative to the registry file, as the ones
+    in web/app.js are relative to web/.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path) as f:
+        pairs = json.load(f)
+    return {
+        pair: dict(conf, AB=os.path.join(base, conf["fileAB"]), BA=os.path.join(base, conf["fileBA"]))
+        for pair, conf in pairs.items()
+    }
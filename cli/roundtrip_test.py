@@ -2,91 +2,49 @@
 import argparse
 import sys
 
+from blockstore import load_blocks, split_interval
+from compose import compose_pieces
+from mapper import Mapper
+from writers import FORMATS, check_output, open_writer, row_writer
+from xopen import open_input
+
 
 def parse_args():
     """Parse command-line arguments for A→B→A round-trip validation."""
     p = argparse.ArgumentParser(
         description=(
-            "Validate round-trip liftover (A→B→A) for CHR:POS (1-based) or BED (0-based half-open) inputs using two blocks TSV files."
+            "Validate round-trip liftover (A→B→A) for CHR:POS (1-based) or BED (0-based half-open) inputs using two blocks TSV files.\n"
+            "With --format blocks, the two maps are composed block by block and every A segment that does not return to itself is reported."
         ),
     )
-    p.add_argument("--blocks-ab", required=True, help="Blocks TSV for A→B")
-    p.add_argument("--blocks-ba", required=True, help="Blocks TSV for B→A")
-    p.add_argument("--input", required=True, help="Input coordinates file (CHR:POS or BED)")
-    p.add_argument("--format", choices=["chrpos", "bed"], default="chrpos", help="Input format")
+    p.add_argument("--blocks-ab", required=True, help="Blocks TSV or chain file (plain or gzip) or compiled index for A→B")
+    p.add_argument("--blocks-ba", required=True, help="Blocks TSV or chain file (plain or gzip) or compiled index for B→A")
+    p.add_argument("--input", help="Input coordinates file (CHR:POS or BED; '-' for stdin, gzip accepted); not used with --format blocks")
+    p.add_argument(
+        "--format",
+        choices=["chrpos", "bed", "blocks"],
+        default="chrpos",
+        help="Input format, or 'blocks' to check every mapped base of genome A analytically",
+    )
     p.add_argument("--allow-split", action="store_true", help="Split intervals crossing blocks (BED only)")
     p.add_argument("--strict", action="store_true", help="Reject intervals that cross blocks (BED only)")
-    p.add_argument("--out", default="roundtrip.out.tsv", help="Output TSV path")
+    p.add_argument("--out", default="roundtrip.out.tsv", help="Output path ('-' for stdout, .gz for BGZF, .arrow/.parquet for columnar output)")
+    p.add_argument(
+        "--output-format",
+        choices=FORMATS,
+        help="Output table format (default: from the --out suffix, as in liftover.py); Arrow and Parquet need pyarrow",
+    )
     return p.parse_args()
 
 
-def load_blocks(path):
-    """Load blocks TSV into per-contig arrays sorted by startA."""
-    by_contig = {}
-    with open(path) as f:
-        header = f.readline()
-        for line in f:
-            parts = line.rstrip().split("\t")
-            contigA, startA, endA, contigB, startB, endB, strand, mapq = parts
-            b = {
-                "contigA": contigA,
-                "startA": int(startA),
-                "endA": int(endA),
-                "contigB": contigB,
-                "startB": int(startB),
-                "endB": int(endB),
-                "strand": strand,
-                "mapq": int(mapq),
-            }
-            by_contig.setdefault(contigA, []).append(b)
-    for c in by_contig:
-        by_contig[c].sort(key=lambda b: b["startA"])  # ensure sorted
-    return by_contig
-
-
-def find_block(blocks, pos):
-    """Binary search to find the block containing pos in genome A."""
-    lo, hi = 0, len(blocks)
-    while lo < hi:
-        mid = (lo + hi) // 2
-        b = blocks[mid]
-        if pos < b["startA"]:
-            hi = mid
-        elif pos >= b["endA"]:
-            lo = mid + 1
-        else:
-            return mid
-    return None
-
-
-def map_point(block, posA):
-    """Map a single position on genome A to genome B using a block."""
-    offset = posA - block["startA"]
-    if block["strand"] == "+":
-        posB = block["startB"] + offset
-    else:
-        length = block["endA"] - block["startA"]
-        posB = block["startB"] + (length - 1 - offset)
-    return block["contigB"], posB, block["strand"]
-
-
-def liftover_point_once(blocks_by_contig, contig, pos):
-    """Perform one liftover mapping for a CHR:POS; return (status, contig, pos, strand)."""
-    bs = blocks_by_contig.get(contig)
-    if not bs:
-        return ("NO_CONTIG", None, None, None)
-    idx = find_block(bs, pos)
-    if idx is None:
-        return ("UNMAPPED", None, None, None)
-    cB, pB, s = map_point(bs[idx], pos)
-    return ("OK", cB, pB, s)
-
-
-def roundtrip_chrpos(blocks_ab, blocks_ba, infile, outfile):
+def roundtrip_chrpos(blocks_ab, blocks_ba, infile, outfile, fmt=None):
     """Run A→B→A round-trip on CHR:POS inputs and write results."""
+    mapper_ab, mapper_ba = Mapper(blocks_ab), Mapper(blocks_ba)
     total, pass_n, fail_n = 0, 0, 0
-    with open(infile) as fin, open(outfile, "w") as fout:
-        fout.write("contigA\tposA\tcontigB\tposB\tcontigA2\tposA2\tstatus\n")
+    with open_input(infile) as fin, open_writer(outfile, fmt) as fout:
+        header = "contigA\tposA\tcontigB\tposB\tcontigA2\tposA2\tstatus\n"
+        fout.write(header)
+        write_row = row_writer(fout, header)
         for line in fin:
             s = line.strip()
             if not s:
@@ -99,17 +57,17 @@ def roundtrip_chrpos(blocks_ab, blocks_ba, infile, outfile):
                     raise ValueError("posA must be >= 1 for CHR:POS format")
                 posA_zero_based = posA_one_based - 1
             except Exception:
-                fout.write("\t\t\t\t\t\tBAD_INPUT\n")
+                write_row("", "", "", "", "", "", "BAD_INPUT")
                 fail_n += 1
                 continue
-            st1, cB, pB, _ = liftover_point_once(blocks_ab, contigA, posA_zero_based)
+            st1, cB, pB, _ = mapper_ab.map_point(contigA, posA_zero_based)
             if st1 != "OK":
-                fout.write(f"{contigA}\t{posA_one_based}\t\t\t\t\t{st1}\n")
+                write_row(contigA, posA_one_based, "", "", "", "", st1)
                 fail_n += 1
                 continue
-            st2, cA2, pA2, _ = liftover_point_once(blocks_ba, cB, pB)
+            st2, cA2, pA2, _ = mapper_ba.map_point(cB, pB)
             if st2 != "OK":
-                fout.write(f"{contigA}\t{posA_one_based}\t{cB}\t{pB + 1}\t\t\t{st2}\n")
+                write_row(contigA, posA_one_based, cB, pB + 1, "", "", st2)
                 fail_n += 1
                 continue
             status = "PASS" if (cA2 == contigA and pA2 == posA_zero_based) else "FAIL"
@@ -117,15 +75,18 @@ def roundtrip_chrpos(blocks_ab, blocks_ba, infile, outfile):
                 pass_n += 1
             else:
                 fail_n += 1
-            fout.write(f"{contigA}\t{posA_one_based}\t{cB}\t{pB + 1}\t{cA2}\t{pA2 + 1}\t{status}\n")
+            write_row(contigA, posA_one_based, cB, pB + 1, cA2, pA2 + 1, status)
     print(f"total={total} pass={pass_n} fail={fail_n}", file=sys.stderr)
 
 
-def roundtrip_bed(blocks_ab, blocks_ba, infile, outfile, allow_split=False, strict=False):
+def roundtrip_bed(blocks_ab, blocks_ba, infile, outfile, allow_split=False, strict=False, fmt=None):
     """Run A→B→A round-trip on BED intervals. Strict requires single-block mapping; split allows piecewise."""
+    mapper_ab, mapper_ba = Mapper(blocks_ab), Mapper(blocks_ba)
     total, pass_n, fail_n = 0, 0, 0
-    with open(infile) as fin, open(outfile, "w") as fout:
-        fout.write("contigA\tstartA\tendA\tcontigB\tstartB\tendB\tcontigA2\tstartA2\tendA2\tstatus\n")
+    with open_input(infile) as fin, open_writer(outfile, fmt) as fout:
+        header = "contigA\tstartA\tendA\tcontigB\tstartB\tendB\tcontigA2\tstartA2\tendA2\tstatus\n"
+        fout.write(header)
+        write_row = row_writer(fout, header)
         for line in fin:
             if not line.strip():
                 continue
@@ -134,57 +95,37 @@ def roundtrip_bed(blocks_ab, blocks_ba, infile, outfile, allow_split=False, stri
             startA, endA = int(startA), int(endA)
             blocks = blocks_ab.get(contigA)
             if not blocks:
-                fout.write(f"{contigA}\t{startA}\t{endA}\t\t\t\t\t\t\tNO_CONTIG\n")
+                write_row(contigA, startA, endA, "", "", "", "", "", "", "NO_CONTIG")
                 fail_n += 1
                 continue
             # For strict: require entire interval in one block
             if strict and not allow_split:
-                idx = find_block(blocks, startA)
-                if idx is None or endA > blocks[idx]["endA"]:
-                    fout.write(f"{contigA}\t{startA}\t{endA}\t\t\t\t\t\t\tCROSSES_BLOCK\n")
+                st1, pieces = mapper_ab.map_interval(contigA, startA, endA)
+                if st1 != "OK":
+                    write_row(contigA, startA, endA, "", "", "", "", "", "", "CROSSES_BLOCK")
                     fail_n += 1
                     continue
-                b = blocks[idx]
-                cB, sB, _ = map_point(b, startA)
-                _, eBminus1, _ = map_point(b, endA - 1)
-                eB = eBminus1 + 1
+                _, _, cB, sB, eB, _ = pieces[0]
                 # Back to A (strict in BA block set)
-                blocks2 = blocks_ba.get(cB)
-                if not blocks2:
-                    fout.write(f"{contigA}\t{startA}\t{endA}\t{cB}\t{sB}\t{eB}\t\t\t\tNO_CONTIG_BA\n")
+                st2, pieces2 = mapper_ba.map_interval(cB, sB, eB)
+                if st2 == "NO_CONTIG":
+                    write_row(contigA, startA, endA, cB, sB, eB, "", "", "", "NO_CONTIG_BA")
                     fail_n += 1
                     continue
-                idx2 = find_block(blocks2, sB)
-                if idx2 is None or eB > blocks2[idx2]["endA"]:
-                    fout.write(f"{contigA}\t{startA}\t{endA}\t{cB}\t{sB}\t{eB}\t\t\t\tCROSSES_BLOCK_BA\n")
+                if st2 != "OK":
+                    write_row(contigA, startA, endA, cB, sB, eB, "", "", "", "CROSSES_BLOCK_BA")
                     fail_n += 1
                     continue
-                b2 = blocks2[idx2]
-                cA2, sA2, _ = map_point(b2, sB)
-                _, eA2minus1, _ = map_point(b2, eB - 1)
-                eA2 = eA2minus1 + 1
+                _, _, cA2, sA2, eA2, _ = pieces2[0]
                 status = "PASS" if (cA2 == contigA and sA2 == startA and eA2 == endA) else "FAIL"
                 if status == "PASS":
                     pass_n += 1
                 else:
                     fail_n += 1
-                fout.write(f"{contigA}\t{startA}\t{endA}\t{cB}\t{sB}\t{eB}\t{cA2}\t{sA2}\t{eA2}\t{status}\n")
+                write_row(contigA, startA, endA, cB, sB, eB, cA2, sA2, eA2, status)
             else:
                 # Split mode: piecewise A→B, then each piece back B→A; union must match original
-                piecesB = []
-                a = startA
-                while a < endA:
-                    idx = find_block(blocks, a)
-                    if idx is None:
-                        piecesB.append((None, None, None, a, min(endA, a + 1)))
-                        a += 1
-                        continue
-                    b = blocks[idx]
-                    a_end = min(endA, b["endA"])
-                    cB, sB, _ = map_point(b, a)
-                    _, eBminus1, _ = map_point(b, a_end - 1)
-                    piecesB.append((cB, sB, eBminus1 + 1, a, a_end))
-                    a = a_end
+                piecesB = [(cB, sB, eB, aS, aE) for aS, aE, cB, sB, eB, _ in split_interval(blocks, startA, endA)]
                 # Map each B piece back
                 reconstructed = []
                 failed = False
@@ -193,18 +134,12 @@ def roundtrip_bed(blocks_ab, blocks_ba, infile, outfile, allow_split=False, stri
                     if cB is None:
                         failed = True
                         continue
-                    blocks2 = blocks_ba.get(cB)
-                    if not blocks2:
-                        failed = True
-                        continue
-                    idx2 = find_block(blocks2, sB)
-                    if idx2 is None or eB > blocks2[idx2]["endA"]:
+                    st2, pieces2 = mapper_ba.map_interval(cB, sB, eB)
+                    if st2 != "OK":
                         failed = True
                         continue
-                    b2 = blocks2[idx2]
-                    cA2, sA2, _ = map_point(b2, sB)
-                    _, eA2minus1, _ = map_point(b2, eB - 1)
-                    reconstructed.append((cA2, sA2, eA2minus1 + 1))
+                    _, _, cA2, sA2, eA2, _ = pieces2[0]
+                    reconstructed.append((cA2, sA2, eA2))
                 # Simple check: if any piece failed, mark fail; else ensure concatenation equals original interval on same contig
                 if failed:
                     status = "FAIL"
@@ -231,21 +166,88 @@ def roundtrip_bed(blocks_ab, blocks_ba, infile, outfile, allow_split=False, stri
                         cA2, sA2, eA2 = merged[0]
                     else:
                         cA2 = sA2 = eA2 = ""
-                    fout.write(f"{contigA}\t{startA}\t{endA}\t{cB0}\t{sB0}\t{eB0}\t{cA2}\t{sA2}\t{eA2}\t{status}\n")
+                    write_row(contigA, startA, endA, cB0, sB0, eB0, cA2, sA2, eA2, status)
                 else:
-                    fout.write(f"{contigA}\t{startA}\t{endA}\t\t\t\t\t\t\t{status}\n")
+                    write_row(contigA, startA, endA, "", "", "", "", "", "", status)
     print(f"total={total} pass={pass_n} fail={fail_n}", file=sys.stderr)
 
 
+def merged_length(intervals):
+    """Return the number of bases covered by a list of (start, end) intervals."""
+    total, reach = 0, None
+    for start, end in sorted(intervals):
+        if reach is None or start > reach:
+            total += end - start
+            reach = end
+        elif end > reach:
+            total += end - reach
+            reach = end
+    return total
+
+
+def roundtrip_blocks(blocks_ab, blocks_ba, outfile, fmt=None):
+    """Compose A→B with B→A and write every A segment that does not map back to itself.
+
+    Segments are 0-based half-open. status is SHIFTED (same contig and strand,
+    returning offset bases away), STRAND_FLIP, OTHER_CONTIG or UNMAPPED_BA
+    (no B→A block covers the B image). A base fails if any of its return
+    paths does not land on itself, so the failed count covers exactly the
+    written segments. Checked, failed and ambiguous bases (those with both a
+    passing and a failing path) are printed per contig.
+    """
+    checked = {c: [(cb.startA[i], cb.endA[i]) for i in range(len(cb))] for c, cb in blocks_ab.items()}
+    passed = {c: [] for c in blocks_ab}
+    failed = {c: [] for c in blocks_ab}
+    failures = []
+    for contigA, a, a_end, contigA2, a2, a2_end, strand, _ in compose_pieces(blocks_ab, blocks_ba):
+        if contigA2 is None:
+            failures.append((contigA, a, a_end, "", "", "", "", "", "UNMAPPED_BA"))
+        elif contigA2 != contigA:
+            failures.append((contigA, a, a_end, contigA2, a2, a2_end, strand, "", "OTHER_CONTIG"))
+        elif strand == "-":
+            failures.append((contigA, a, a_end, contigA2, a2, a2_end, strand, "", "STRAND_FLIP"))
+        elif a2 != a:
+            failures.append((contigA, a, a_end, contigA2, a2, a2_end, strand, a2 - a, "SHIFTED"))
+        else:
+            passed[contigA].append((a, a_end))
+            continue
+        failed[contigA].append((a, a_end))
+    failures.sort(key=lambda r: r[:3])
+    with open_writer(outfile, fmt) as fout:
+        header = "contigA\tstartA\tendA\tcontigA2\tstartA2\tendA2\tstrand\toffset\tstatus\n"
+        fout.write(header)
+        write_row = row_writer(fout, header)
+        for row in failures:
+            write_row(*row)
+    total_checked = total_failed = total_ambiguous = 0
+    for c in sorted(checked):
+        n_checked = merged_length(checked[c])
+        n_failed = merged_length(failed[c])
+        n_ambiguous = merged_length(passed[c]) + n_failed - merged_length(passed[c] + failed[c])
+        total_checked += n_checked
+        total_failed += n_failed
+        total_ambiguous += n_ambiguous
+        print(f"contig={c} checked={n_checked} failed={n_failed} ambiguous={n_ambiguous}", file=sys.stderr)
+    print(f"checked={total_checked} failed={total_failed} ambiguous={total_ambiguous} segments={len(failures)}", file=sys.stderr)
+
+
 def main():
     """Entry point: run A→B→A round-trip validation for points or BED."""
     args = parse_args()
+    if args.format != "blocks" and args.input is None:
+        sys.exit("error: --input is required unless --format blocks")
+    try:
+        fmt = check_output(args.out, args.output_format)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
     blocks_ab = load_blocks(args.blocks_ab)
     blocks_ba = load_blocks(args.blocks_ba)
-    if args.format == "chrpos":
-        roundtrip_chrpos(blocks_ab, blocks_ba, args.input, args.out)
+    if args.format == "blocks":
+        roundtrip_blocks(blocks_ab, blocks_ba, args.out, fmt)
+    elif args.format == "chrpos":
+        roundtrip_chrpos(blocks_ab, blocks_ba, args.input, args.out, fmt)
     else:
-        roundtrip_bed(blocks_ab, blocks_ba, args.input, args.out, args.allow_split, args.strict)
+        roundtrip_bed(blocks_ab, blocks_ba, args.input, args.out, args.allow_split, args.strict, fmt)
 
 
 if __name__ == "__main__":
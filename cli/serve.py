@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Long-running local liftover server over HTTP (TCP or a Unix socket).
+
+Every genome pair in the registry (web/genome_pairs.json, the same pairs as
+GENOME_PAIRS in web/app.js) is loaded once at startup, in both directions,
+and shared by all requests. Maps are reloaded in the background when their
+files change.
+
+    python3 cli/serve.py --port 8765
+    python3 cli/serve.py --socket /tmp/liftover.sock
+
+Endpoints:
+
+    GET  /pairs    registered pairs, block counts and load times
+    GET  /stats    requests, records and latency since startup
+    POST /lift     lift a batch of queries
+
+/lift takes pair, direction (AB or BA), format (chrpos or bed), split and
+strict either as query parameters or, for JSON bodies, as keys next to
+"queries". A text/tab-separated-values body is read as liftover.py input
+(CHR:POS or BED lines) and answered with the same TSV liftover.py would
+write. A JSON body lists queries as "I:1000" strings or [contig, pos]
+pairs for chrpos and [contig, start, end] for bed, and is answered with
+{"columns", "rows", "counts", "records", "elapsed_ms", "per_second"}.
+Every response carries X-Elapsed-Ms and X-Records-Per-Second headers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from blockstore import load_blocks
+from liftover import HEADER_BED, HEADER_CHRPOS, lift_bed_lines, lift_chrpos_batch_lines, lift_chrpos_lines
+from mapper import HAVE_NUMPY, Mapper
+from registry import DEFAULT_REGISTRY, load_registry
+
+MAX_BODY_BYTES = 1 << 30
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+def parse_args():
+    """Parse command-line arguments for the liftover server."""
+    p = argparse.ArgumentParser(
+        description="Serve liftover queries for every registered genome pair from maps preloaded in memory.",
+    )
+    p.add_argument("--registry", default=DEFAULT_REGISTRY, help="Genome pair registry JSON (default: web/genome_pairs.json)")
+    p.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    p.add_argument("--port", type=int, default=8765, help="TCP port")
+    p.add_argument("--socket", help="Listen on this Unix socket path instead of TCP")
+    p.add_argument("--reload-interval", type=float, default=2.0, help="Seconds between map file checks (0 disables hot reload)")
+    p.add_argument("--quiet", action="store_true", help="Do not log each request to stderr")
+    return p.parse_args()
+
+
+class RequestError(Exception):
+    """A client error answered with an HTTP status and message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def file_stamp(path):
+    """Return (mtime_ns, size) of a file, or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class MapRegistry:
+    """Loaded maps keyed by (pair, direction), swapped in place when their files change."""
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+        self.maps = {}
+
+    def load_all(self):
+        """Load every map of every pair (blocking)."""
+        for pair, conf in self.pairs.items():
+            for direction in ("AB", "BA"):
+                self.maps[pair, direction] = self._load(conf[direction])
+
+    @staticmethod
+    def _load(path):
+        t0 = time.perf_counter()
+        stamp = file_stamp(path)
+        blocks = load_blocks(path)
+        mapper = Mapper(blocks)
+        mapper.map_many([])  # build the batch index now rather than on the first request
+        return {"blocks": blocks, "mapper": mapper, "path": path, "stamp": stamp, "load_ms": (time.perf_counter() - t0) * 1000}
+
+    def get(self, pair, direction):
+        """Return the loaded map entry ({"blocks", "mapper", ...}) for a pair and direction."""
+        entry = self.maps.get((pair, direction))
+        if entry is None:
+            raise RequestError(404, f"unknown pair/direction {pair!r}/{direction!r}")
+        return entry
+
+    async def watch(self, interval, log):
+        """Reload maps whose files changed, checking every interval seconds; loads run in a worker thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            for key, entry in list(self.maps.items()):
+                stamp = file_stamp(entry["path"])
+                if stamp is None or stamp == entry["stamp"]:
+                    continue
+                try:
+                    self.maps[key] = await loop.run_in_executor(None, self._load, entry["path"])
+                    log(f"reloaded {key[0]}/{key[1]} from {entry['path']} in {self.maps[key]['load_ms']:.1f} ms")
+                except (OSError, ValueError) as e:
+                    # Keep serving the old map; a half-written file is retried on the next check.
+                    log(f"reload of {entry['path']} failed: {e}")
+
+    def describe(self):
+        """Return the registry with block counts and load times, for GET /pairs."""
+        out = {}
+        for pair, conf in self.pairs.items():
+            info = {k: v for k, v in conf.items() if k not in ("AB", "BA")}
+            for direction in ("AB", "BA"):
+                entry = self.maps[pair, direction]
+                info[direction] = {"blocks": entry["blocks"].n_blocks(), "load_ms": round(entry["load_ms"], 2)}
+            out[pair] = info
+        return out
+
+
+class Collector:
+    """Minimal file-like sink for the lift functions' output rows."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def getvalue(self):
+        return "".join(self.parts)
+
+
+def query_lines(body, content_type, fmt):
+    """Return (input lines, options from a JSON body) for a /lift request body."""
+    if "json" not in content_type:
+        try:
+            return body.decode().splitlines(keepends=True), {}
+        except UnicodeDecodeError:
+            raise RequestError(400, "request body is not UTF-8 text")
+    try:
+        req = json.loads(body)
+        queries = req["queries"]
+    except (ValueError, KeyError, TypeError):
+        raise RequestError(400, 'JSON body must be an object with a "queries" list')
+    if not isinstance(queries, list):
+        raise RequestError(400, '"queries" must be a list')
+    fmt = req.get("format", fmt)
+    lines = []
+    for q in queries:
+        if isinstance(q, str) and "\n" not in q:
+            lines.append(q + "\n")
+        elif not isinstance(q, list) or not all(isinstance(v, (str, int)) for v in q):
+            raise RequestError(400, f"bad {fmt} query: {q!r}")
+        elif fmt == "chrpos" and len(q) == 2:
+            lines.append(f"{q[0]}:{q[1]}\n")
+        elif fmt == "bed" and len(q) >= 3:
+            lines.append(f"{q[0]}\t{q[1]}\t{q[2]}\n")
+        else:
+            raise RequestError(400, f"bad {fmt} query: {q!r}")
+    return lines, req
+
+
+def lift_batch(blocks, mapper, lines, fmt, allow_split=False, strict=False):
+    """Lift a list of input lines; return (counts by name, header, output TSV rows)."""
+    out = Collector()
+    if fmt == "chrpos":
+        if HAVE_NUMPY:
+            totals = lift_chrpos_batch_lines(blocks, iter(lines), out, mapper=mapper)
+        else:
+            totals = lift_chrpos_lines(blocks, iter(lines), out)
+        return dict(zip(("total", "mapped"), totals)), HEADER_CHRPOS, out.getvalue()
+    totals = lift_bed_lines(blocks, iter(lines), out, allow_split, strict)
+    return dict(zip(("total", "mapped", "split"), totals)), HEADER_BED, out.getvalue()
+
+
+def typed_rows(text):
+    """Split output TSV rows into lists of fields converted with typed()."""
+    return [[typed(f) for f in row.split("\t")] for row in text.splitlines()]
+
+
+def typed(field):
+    """Convert one output TSV field to int or None where it looks like one."""
+    if field == "":
+        return None
+    if field.lstrip("-").isdigit():
+        return int(field)
+    return field
+
+
+class LiftoverServer:
+    """HTTP request handling on top of a MapRegistry."""
+
+    def __init__(self, registry, quiet=False):
+        self.registry = registry
+        self.quiet = quiet
+        self.started = time.time()
+        self.requests = 0
+        self.records = 0
+        self.busy_seconds = 0.0
+
+    def log(self, message):
+        if not self.quiet:
+            print(message, file=sys.stderr, flush=True)
+
+    async def lift(self, params, body, content_type):
+        """Lift a batch; return (status, content type, body bytes, number of records).
+
+        The lift itself runs in a worker thread, so a large batch does not stall
+        the event loop (and with it every other connection).
+        """
+        try:
+            lines, req = query_lines(body, content_type, params.get("format", "chrpos"))
+            opts = dict(params)
+            opts.update({k: v for k, v in req.items() if k != "queries"})
+            pair = opts.get("pair") or next(iter(self.registry.pairs), None)
+            direction = str(opts.get("direction", "AB")).upper()
+            fmt = opts.get("format", "chrpos")
+            if fmt not in ("chrpos", "bed"):
+                raise RequestError(400, f"unsupported format {fmt!r}")
+            allow_split = str(opts.get("split", "")).lower() in ("1", "true", "yes")
+            strict = str(opts.get("strict", "")).lower() in ("1", "true", "yes")
+            entry = self.registry.get(pair, direction)
+            loop = asyncio.get_running_loop()
+            counts, header, text = await loop.run_in_executor(
+                None, lift_batch, entry["blocks"], entry["mapper"], lines, fmt, allow_split, strict
+            )
+            if "json" not in content_type:
+                return 200, "text/tab-separated-values", (header + text).encode(), counts["total"]
+            rows = await loop.run_in_executor(None, typed_rows, text)
+        except (ValueError, TypeError, KeyError) as e:
+            raise RequestError(400, f"bad request: {e}")
+        columns = header.rstrip("\n").split("\t")
+        result = {"pair": pair, "direction": direction, "format": fmt, "columns": columns, "rows": rows, "counts": counts}
+        return 200, "application/json", result, counts["total"]
+
+    async def dispatch(self, method, target, headers, body):
+        """Route one request; return (status, content type, payload, records)."""
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == "/lift":
+            if method != "POST":
+                raise RequestError(405, "use POST for /lift")
+            return await self.lift(params, body, headers.get("content-type", "text/tab-separated-values"))
+        if method != "GET":
+            raise RequestError(405, f"use GET for {url.path}")
+        if url.path == "/pairs":
+            return 200, "application/json", self.registry.describe(), 0
+        if url.path == "/stats":
+            return 200, "application/json", self.stats(), 0
+        if url.path == "/health":
+            return 200, "application/json", {"ok": True}, 0
+        raise RequestError(404, f"no such endpoint {url.path}")
+
+    def stats(self):
+        """Return request and throughput totals since startup."""
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "records": self.records,
+            "mean_latency_ms": round(1000 * self.busy_seconds / self.requests, 3) if self.requests else 0,
+            "records_per_second": round(self.records / self.busy_seconds) if self.busy_seconds else 0,
+        }
+
+    async def handle(self, reader, writer):
+        """Serve requests on one connection until the client closes it (HTTP/1.1 keep-alive)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+                t0 = time.perf_counter()
+                records = 0
+                try:
+                    try:
+                        length = int(headers.get("content-length", 0) or 0)
+                    except ValueError:
+                        raise RequestError(400, "bad Content-Length")
+                    if length > MAX_BODY_BYTES:
+                        raise RequestError(413, "request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, ctype, payload, records = await self.dispatch(method, target, headers, body)
+                except RequestError as e:
+                    status, ctype, payload = e.status, "application/json", {"error": str(e)}
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:  # last resort: answer 500 rather than drop the connection
+                    self.log(f"{method} {target} failed: {e!r}")
+                    status, ctype, payload = 500, "application/json", {"error": f"internal error: {e}"}
+                    keep_alive = False
+                elapsed = time.perf_counter() - t0
+                rate = round(records / elapsed) if records and elapsed else 0
+                if isinstance(payload, dict):
+                    if records:
+                        payload.update(records=records, elapsed_ms=round(elapsed * 1000, 3), per_second=rate)
+                    payload = json.dumps(payload).encode()
+                head = (
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {ctype}\r\nContent-Length: {len(payload)}\r\n"
+                    f"X-Elapsed-Ms: {elapsed * 1000:.3f}\r\nX-Records-Per-Second: {rate}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                )
+                writer.write(head.encode() + payload)
+                await writer.drain()
+                self.requests += 1
+                self.records += records
+                self.busy_seconds += elapsed
+                self.log(f"{method} {target} {status} records={records} {elapsed * 1000:.2f} ms {rate:,} rec/s")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    """Load the registry and serve until interrupted."""
+    registry = MapRegistry(load_registry(args.registry))
+    t0 = time.perf_counter()
+    registry.load_all()
+    server = LiftoverServer(registry, args.quiet)
+    print(f"loaded {len(registry.maps)} maps in {(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+    if args.socket:
+        listener = await asyncio.start_unix_server(server.handle, path=args.socket)
+        where = args.socket
+    else:
+        listener = await asyncio.start_server(server.handle, args.host, args.port)
+        where = f"http://{args.host}:{args.port}"
+    print(f"listening on {where}", file=sys.stderr, flush=True)
+    watcher = asyncio.ensure_future(registry.watch(args.reload_interval, server.log)) if args.reload_interval > 0 else None
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+
+def main():
+    """Entry point: run the liftover server."""
+    args = parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
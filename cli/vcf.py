@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Streaming VCF liftover used by liftover.py -f vcf.
+
+Records are read and written one at a time. CHROM/POS (and INFO/END) are
+rewritten from the block map, alleles are reverse-complemented on "-" blocks,
+and ##contig lines are replaced by the genome-B contigs of the map. Records
+that cannot be lifted are written unchanged to a reject file with a
+LiftoverFail INFO tag giving the reason.
+
+Output records keep the input order, so a VCF that was sorted on genome A is
+generally not sorted on genome B; run `bcftools sort` before indexing.
+"""
+from mapper import Mapper
+from xopen import COMPRESSED_SUFFIXES, is_stdio, open_output
+
+COMPLEMENT = str.maketrans("ACGTRYKMBDHVNacgtrykmbdhvn", "TGCAYRMKVHDBNtgcayrmkvhdbn")
+REJECT_INFO_HEADER = (
+    '##INFO=<ID=LiftoverFail,Number=1,Type=String,Description="Reason the record could not be lifted to genome B">\n'
+)
+
+
+def reverse_complement(seq):
+    """Reverse-complement a nucleotide string (IUPAC codes are complemented too)."""
+    return seq.translate(COMPLEMENT)[::-1]
+
+
+def default_rejects_path(output):
+    """Derive the reject file path from the output path; None when writing to stdout."""
+    if is_stdio(output):
+        return None
+    suffix = next((s for s in COMPRESSED_SUFFIXES if output.endswith(s)), "")
+    stem = output[: len(output) - len(suffix)]
+    if stem.endswith(".vcf"):
+        stem = stem[:-4]
+    return f"{stem}.rejects.vcf{suffix}"
+
+
+def info_end(info):
+    """Return the INFO/END value as an int, or None if absent."""
+    if "END=" not in info:
+        return None
+    for field in info.split(";"):
+        if field.startswith("END="):
+            return int(field[4:])
+    return None
+
+
+def replace_info_end(info, end):
+    """Return info with the END value replaced."""
+    return ";".join(f"END={end}" if f.startswith("END=") else f for f in info.split(";"))
+
+
+def add_info(info, key, value):
+    """Append key=value to an INFO column ("." counts as empty)."""
+    return f"{key}={value}" if info in ("", ".") else f"{info};{key}={value}"
+
+
+def is_length_changing(ref, alts):
+    """Return True for indels, symbolic alleles and breakends, which cannot be flipped in place."""
+    for alt in alts:
+        if alt in ("*", "."):
+            continue
+        if len(alt) != len(ref) or alt[0] == "<" or "[" in alt or "]" in alt:
+            return True
+    return False
+
+
+def lift_record(mapper, fields):
+    """Lift one split VCF record in place; return a status ("OK" or the reject reason)."""
+    chrom, pos, ref = fields[0], int(fields[1]), fields[3]
+    if pos < 1 or not ref:
+        return "BAD_INPUT"
+    start = pos - 1
+    end = start + len(ref)
+    info = fields[7] if len(fields) > 7 else "."
+    sv_end = info_end(info)
+    if sv_end is not None:
+        end = max(end, sv_end)
+    status, pieces = mapper.map_interval(chrom, start, end)
+    if status != "OK":
+        return status
+    _, _, contigB, startB, endB, strand = pieces[0]
+    alts = fields[4].split(",")
+    if strand == "-":
+        # map_interval keeps startB at the image of the first A base; on "-" that is the right end.
+        startB = endB - 1
+        if sv_end is not None or is_length_changing(ref, alts):
+            return "MINUS_STRAND_INDEL"
+        fields[3] = reverse_complement(ref)
+        fields[4] = ",".join(a if a in ("*", ".") else reverse_complement(a) for a in alts)
+    elif sv_end is not None:
+        fields[7] = replace_info_end(info, startB + 1 + sv_end - pos)
+    fields[0] = contigB
+    fields[1] = str(startB + 1)
+    return "OK"
+
+
+def lifted_header(meta, names_b):
+    """Return header meta lines with ##contig lines replaced by genome-B contigs."""
+    contigs = [f"##contig=<ID={name}>\n" for name in names_b]
+    out = []
+    for line in meta:
+        if line.startswith("##contig="):
+            out.extend(contigs)
+            contigs = []
+        else:
+            out.append(line)
+    return out + contigs
+
+
+def lift_vcf_lines(blocks_by_contig, fin, fout, rejects=None, assume_sorted=False, metrics=None):
+    """Lift VCF lines from fin to fout; return (total, mapped, rejected).
+
+    Unliftable records go to the rejects path (if given) with a LiftoverFail
+    INFO tag. With assume_sorted, lookups use the sorted-input cursor and the
+    number of out-of-order records is appended to the counts. metrics, if
+    given, counts and times the lookups (see metrics.py).
+    """
+    mapper = Mapper(blocks_by_contig, sorted_input=assume_sorted)
+    if metrics is not None:
+        metrics.watch(mapper)
+    frej = open_output(rejects) if rejects else None
+    try:
+        meta = []
+        for line in fin:
+            if line.startswith("##"):
+                meta.append(line)
+                continue
+            if line.startswith("#"):
+                fout.write("".join(lifted_header(meta, blocks_by_contig.names_b)) + line)
+                if frej:
+                    frej.write("".join(meta) + REJECT_INFO_HEADER + line)
+                break
+            raise ValueError("VCF input has no #CHROM header line")
+        total, mapped, rejected = 0, 0, 0
+        for line in fin:
+            if not line.strip():
+                continue
+            total += 1
+            fields = line.rstrip("\n").split("\t")
+            try:
+                status = lift_record(mapper, fields)
+            except (IndexError, ValueError):
+                status = "BAD_INPUT"
+            if status == "OK":
+                mapped += 1
+                fout.write("\t".join(fields) + "\n")
+                continue
+            rejected += 1
+            if frej:
+                if len(fields) > 7:
+                    fields[7] = add_info(fields[7], "LiftoverFail", status)
+                frej.write("\t".join(fields) + "\n")
+    finally:
+        if frej:
+            frej.close()
+    if assume_sorted:
+        return total, mapped, rejected, mapper.unsorted
+    return total, mapped, rejected
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Output writers for liftover results: TSV, Arrow IPC or Parquet.
+
+The lift functions write a header line with fout.write, then one call per
+row to the function row_writer(fout, header) returns. open_writer returns
+the output for the chosen format:
+- tsv: the plain output stream; rows are formatted as they are written;
+- arrow / parquet: a ColumnarWriter, which receives each row as a tuple and
+  writes typed columns in batches with the optional pyarrow package.
+
+pyarrow is imported only when a columnar output is opened. Coordinates and
+other integer columns are int64, with nulls for empty fields and for values
+that do not fit. Contig, strand and status columns are dictionary-encoded,
+and any other column stays a string. The format follows the output suffix
+(.arrow, .feather, .ipc, .parquet) unless one is given.
+"""
+import sys
+
+from xopen import is_stdio, open_output
+
+pa = pc = pq = None  # pyarrow, pyarrow.compute and pyarrow.parquet, imported by load_pyarrow on first use
+
+FORMATS = ("tsv", "arrow", "parquet")
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+# Rows buffered before a batch is written.
+BATCH_ROWS = 1 << 16
+INT_FIELDS = {"pos", "posA", "posB", "posA2", "start", "end", "startA", "endA", "startB", "endB", "startA2", "endA2", "mapq", "rank", "offset"}
+DICT_FIELDS = {"strand", "status"}
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def output_format(path, fmt=None):
+    """Return the output format: fmt if given, else the one implied by path's suffix (default tsv)."""
+    if fmt:
+        return fmt
+    if path.endswith(ARROW_SUFFIXES):
+        return "arrow"
+    if path.endswith(".parquet"):
+        return "parquet"
+    return "tsv"
+
+
+def load_pyarrow():
+    """Import pyarrow on first use; raise ValueError if it is not installed."""
+    global pa, pc, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.compute
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError("Arrow/Parquet output requires pyarrow (pip install pyarrow)") from None
+        pa, pc, pq = pyarrow, pyarrow.compute, pyarrow.parquet
+
+
+def check_output(path, fmt=None):
+    """Return the output format for path (see output_format); raise ValueError if it cannot be written."""
+    fmt = output_format(path, fmt)
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown output format {fmt!r}")
+    if fmt != "tsv":
+        load_pyarrow()
+        if fmt == "parquet" and is_stdio(path):
+            raise ValueError("Parquet output cannot be written to stdout")
+    return fmt
+
+
+def open_writer(path, fmt=None, batch_rows=BATCH_ROWS):
+    """Open path for output in the given (or implied) format: a text stream for TSV, else a ColumnarWriter."""
+    fmt = check_output(path, fmt)
+    if fmt == "tsv":
+        return open_output(path)
+    return ColumnarWriter(path, fmt, batch_rows)
+
+
+def tsv_row_writer(write):
+    """Return a function that writes its arguments to write() as one TSV row."""
+    return lambda *row: write("\t".join(map(str, row)) + "\n")
+
+
+def row_writer(fout, header):
+    """Return a function that writes one row, given as header's fields in order ("" for an empty field).
+
+    Writers that take rows as tuples (ColumnarWriter) receive them unformatted;
+    any other file-like object gets TSV text.
+    """
+    write_row = getattr(fout, "write_row", None)
+    if write_row is not None:
+        return write_row
+    return tsv_row_writer(fout.write)
+
+
+def field_kind(name):
+    """Return "int", "dict" or "str" for an output column (prefixes such as "leupold." are ignored)."""
+    base = name.rsplit(".", 1)[-1]
+    if base in INT_FIELDS:
+        return "int"
+    if base in DICT_FIELDS or base.startswith("contig"):
+        return "dict"
+    return "str"
+
+
+class ColumnarWriter:
+    """Writer that collects rows and writes them as typed Arrow IPC or Parquet batches.
+
+    The first text written is the header and defines the schema. Rows then
+    arrive as tuples (write_row, write_rows) with int values in the integer
+    columns, or as TSV text through write, which is parsed (as when -j
+    concatenates the workers' part files).
+    """
+
+    def __init__(self, path, fmt, batch_rows=BATCH_ROWS):
+        load_pyarrow()
+        self.path = path
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        self.names = None
+        self.kinds = None
+        self.codes = None
+        self.rows = []
+        self.pending = ""
+        self.sink = None
+        self.writer = None
+
+    def write(self, text):
+        """Parse TSV text: the first line is the header, then one row per line."""
+        if self.pending:
+            text = self.pending + text
+        lines = text.split("\n")
+        self.pending = lines.pop()
+        if self.names is None and lines:
+            self.set_columns(lines.pop(0).split("\t"))
+        ints = [k for k, kind in enumerate(self.kinds or ()) if kind == "int"]
+        width = len(self.names or ())
+        for line in lines:
+            fields = line.split("\t")
+            if len(fields) != width:
+                raise ValueError(f"row has {len(fields)} fields, header has {width}: {line!r}")
+            for k in ints:
+                if fields[k]:
+                    fields[k] = int(fields[k])
+            self.rows.append(fields)
+        if len(self.rows) >= self.batch_rows:
+            self.flush()
+        return len(text)
+
+    def write_row(self, *row):
+        """Append one row; empty fields are "" (or None)."""
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_rows:
+            self.flush()
+
+    def write_rows(self, rows):
+        """Append tuples as rows (see write_row)."""
+        self.rows.extend(rows)
+        if len(self.rows) >= self.batch_rows:
+            self.flush()
+
+    def set_columns(self, names):
+        """Define the columns (the header line)."""
+        self.names = names
+        self.kinds = [field_kind(name) for name in names]
+        self.codes = [{} for _ in names]
+
+    def batch(self):
+        """Convert the buffered rows into a RecordBatch."""
+        columns = list(zip(*self.rows)) or [()] * len(self.names)
+        arrays = []
+        for k, (col, kind) in enumerate(zip(columns, self.kinds)):
+            if kind == "int":
+                values = [None if v == "" else v for v in col]
+                try:
+                    arrays.append(pa.array(values, pa.int64()))
+                except OverflowError:
+                    # Echoed input positions may not fit in int64 (e.g. "I:99999999999999999999"); they become null.
+                    arrays.append(pa.array([v if v is None or INT64_MIN <= v <= INT64_MAX else None for v in values], pa.int64()))
+            elif kind == "dict":
+                # One dictionary per column for the whole file, grown batch by batch: IPC files accept
+                # dictionary deltas but not a different dictionary per batch. "" is not in it, so it becomes null.
+                values = pa.array(col, pa.string())
+                codes = self.codes[k]
+                for v in pc.unique(values).to_pylist():
+                    if v and v not in codes:
+                        codes[v] = len(codes)
+                dictionary = pa.array(list(codes), pa.string())
+                ids = pc.index_in(values, value_set=dictionary).cast(pa.int32())
+                arrays.append(pa.DictionaryArray.from_arrays(ids, dictionary))
+            else:
+                arrays.append(pa.array([v if v is None or isinstance(v, str) else str(v) for v in col], pa.string()))
+        return pa.RecordBatch.from_arrays(arrays, names=self.names)
+
+    def flush(self):
+        """Write the buffered rows as one batch, opening the output on the first call."""
+        if self.names is None:
+            return
+        batch = self.batch()
+        if self.writer is None:
+            if self.fmt == "parquet":
+                self.writer = pq.ParquetWriter(self.path, batch.schema)
+            else:
+                self.sink = pa.PythonFile(sys.stdout.buffer, "wb") if is_stdio(self.path) else pa.OSFile(self.path, "wb")
+                self.writer = pa.ipc.new_file(self.sink, batch.schema, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+        if batch.num_rows:
+            if self.fmt == "parquet":
+                self.writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                self.writer.write_batch(batch)
+        self.rows = []
+
+    def close(self):
+        """Write any remaining rows and close the output."""
+        if self.pending:
+            self.write("\n")
+        if self.names is None:
+            raise ValueError(f"no header was written to {self.path}; {self.fmt} output needs a header line")
+        self.flush()
+        self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        elif self.writer is not None:
+            self.writer.close()
+            if self.sink is not None:
+                self.sink.close()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Stream helpers shared by the CLI tools: stdin/stdout and transparent gzip/BGZF.
+
+Inputs may be "-" for stdin; gzip (including BGZF) input is detected from its
+magic bytes. Outputs may be "-" for stdout; paths ending in .gz/.bgz are written
+as BGZF, which any gzip reader accepts and tabix can index.
+"""
+import gzip
+import io
+import os
+import struct
+import sys
+import zlib
+
+BUFFER_SIZE = 1 << 20
+COMPRESSED_SUFFIXES = (".gz", ".bgz", ".bgzf")
+
+# BGZF block: gzip member with a "BC" extra field holding the block size; payloads
+# are kept below 64 KiB so the compressed block always fits the 16-bit size field.
+BGZF_BLOCK_SIZE = 65280
+BGZF_HEADER = struct.Struct("<BBBBIBBHBBHH")
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+class BgzfWriter(io.RawIOBase):
+    """Write a byte stream as BGZF blocks to an underlying binary file."""
+
+    def __init__(self, raw, level=6):
+        self.raw = raw
+        self.level = level
+        self.pending = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.pending += b
+        while len(self.pending) >= BGZF_BLOCK_SIZE:
+            self._write_block(bytes(self.pending[:BGZF_BLOCK_SIZE]))
+            del self.pending[:BGZF_BLOCK_SIZE]
+        return len(b)
+
+    def _write_block(self, data):
+        c = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        cdata = c.compress(data) + c.flush()
+        bsize = BGZF_HEADER.size + len(cdata) + 8
+        self.raw.write(BGZF_HEADER.pack(31, 139, 8, 4, 0, 0, 255, 6, 66, 67, 2, bsize - 1))
+        self.raw.write(cdata)
+        self.raw.write(struct.pack("<II", zlib.crc32(data), len(data)))
+
+    def close(self):
+        if not self.closed:
+            if self.pending:
+                self._write_block(bytes(self.pending))
+                self.pending.clear()
+            self.raw.write(BGZF_EOF)
+            self.raw.close()
+        super().close()
+
+
+def is_stdio(path):
+    """Return True if path names stdin/stdout."""
+    return path == "-"
+
+
+def is_compressed_path(path):
+    """Return True if an output path should be written compressed."""
+    return path.endswith(COMPRESSED_SUFFIXES)
+
+
+def is_gzip_file(path):
+    """Return True if a regular file starts with the gzip magic bytes."""
+    if is_stdio(path):
+        return False
+    with open(path, "rb") as f:
+        return f.read(2) == b"\x1f\x8b"
+
+
+def open_input(path):
+    """Open path for text reading; "-" is stdin and gzip/BGZF input is decompressed."""
+    if is_stdio(path):
+        raw = open(sys.stdin.fileno(), "rb", buffering=BUFFER_SIZE, closefd=False)
+        if raw.peek(2)[:2] == b"\x1f\x8b":
+            raw = io.BufferedReader(gzip.GzipFile(fileobj=raw), buffer_size=BUFFER_SIZE)
+    elif is_gzip_file(path):
+        raw = io.BufferedReader(gzip.open(path, "rb"), buffer_size=BUFFER_SIZE)
+    else:
+        raw = open(path, "rb", buffering=BUFFER_SIZE)
+    return io.TextIOWrapper(raw, encoding="utf-8")
+
+
+def open_output(path):
+    """Open path for buffered text writing; "-" is stdout and .gz/.bgz paths are BGZF."""
+    if is_stdio(path):
+        raw = open(sys.stdout.fileno(), "wb", closefd=False)
+    else:
+        raw = open(path, "wb")
+    if not is_stdio(path) and is_compressed_path(path):
+        raw = BgzfWriter(raw)
+    return io.TextIOWrapper(io.BufferedWriter(raw, buffer_size=BUFFER_SIZE), encoding="utf-8")
+
+
+def output_dir(path):
+    """Return a directory suitable for temporary files that end up in path."""
+    if is_stdio(path):
+        return None
+    return os.path.dirname(os.path.abspath(path))
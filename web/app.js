@@ -3,6 +3,7 @@ let blocksAB = null;
 let blocksBA = null;
 const APP_VERSION = 'v1.03 (2025-12-25)';
 
+// Mirrored in genome_pairs.json for cli/serve.py; keep the two in sync.
 const GENOME_PAIRS = {
   'pombase_leupold': {
     name: 'PomBase ↔ Leupold Consensus',
@@ -40,7 +41,56 @@ function debugLog(message) {
   console.log('[AUTOLOAD]', message);
 }
 
-// Parse blocks TSV into per-contig sorted arrays
+// Binary maps built by cli/build_web_maps.py are listed in the manifest under their TSV path.
+// Their file names carry a content hash, so they are fetched from the HTTP cache whenever possible.
+const MANIFEST_URL = 'data/manifest.json';
+const WEB_MAP_MAGIC = 'LOWEBMAP';
+const WEB_MAP_VERSION = 1;
+const LITTLE_ENDIAN = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+let manifestPromise = null;
+// Decoded maps by TSV path, so switching back to a pair does not fetch or decode again
+const blocksCache = new Map();
+
+// Blocks of one contig are held as parallel typed arrays sorted by startA:
+// { length, startA, endA, startB, endB, contigB (ids into namesB), namesB, minus, mapq }
+function makeContigBlocks(rows, namesB) {
+  const n = rows.length;
+  const ids = new Map(namesB.map((name, i) => [name, i]));
+  const blocks = {
+    length: n,
+    startA: new Float64Array(n), endA: new Float64Array(n),
+    startB: new Float64Array(n), endB: new Float64Array(n),
+    contigB: new Uint32Array(n), namesB,
+    minus: new Uint8Array(n), mapq: new Uint8Array(n)
+  };
+  for (let i = 0; i < n; i++) {
+    const b = rows[i];
+    if (!ids.has(b.contigB)) { ids.set(b.contigB, namesB.length); namesB.push(b.contigB); }
+    blocks.startA[i] = b.startA;
+    blocks.endA[i] = b.endA;
+    blocks.startB[i] = b.startB;
+    blocks.endB[i] = b.endB;
+    blocks.contigB[i] = ids.get(b.contigB);
+    blocks.minus[i] = b.strand === '-' ? 1 : 0;
+    blocks.mapq[i] = Math.min(b.mapq, 255);
+  }
+  return blocks;
+}
+
+// Return block i of a contig as a plain object
+function blockAt(blocks, i) {
+  return {
+    startA: blocks.startA[i],
+    endA: blocks.endA[i],
+    contigB: blocks.namesB[blocks.contigB[i]],
+    startB: blocks.startB[i],
+    endB: blocks.endB[i],
+    strand: blocks.minus[i] ? '-' : '+',
+    mapq: blocks.mapq[i]
+  };
+}
+
+// Parse blocks TSV into per-contig sorted arrays (fallback when no binary map is built)
 function parseTSV(text) {
   const lines = text.trim().split(/\r?\n/);
   const by = {};
@@ -60,18 +110,92 @@ function parseTSV(text) {
     if (!by[b.contigA]) by[b.contigA] = [];
     by[b.contigA].push(b);
   }
-  for (const c in by) by[c].sort((a,b)=>a.startA-b.startA);
+  const namesB = [];
+  for (const c in by) by[c] = makeContigBlocks(by[c].sort((a,b)=>a.startA-b.startA), namesB);
+  return by;
+}
+
+// Decode a binary map (layout in cli/build_web_maps.py) into per-contig typed arrays
+function decodeWebMap(buffer) {
+  const view = new DataView(buffer);
+  const text = new TextDecoder();
+  if (text.decode(new Uint8Array(buffer, 0, 8)) !== WEB_MAP_MAGIC || view.getUint32(8, true) !== WEB_MAP_VERSION) {
+    throw new Error('not a version ' + WEB_MAP_VERSION + ' web map');
+  }
+  const metaLength = view.getUint32(12, true);
+  const meta = JSON.parse(text.decode(new Uint8Array(buffer, 16, metaLength)));
+  const n = meta.contigs.reduce((s, c) => s + c[1], 0);
+  let offset = 16 + metaLength;
+  const column = (Type) => {
+    const col = new Type(buffer, offset, n);
+    offset += n * Type.BYTES_PER_ELEMENT;
+    return col;
+  };
+  const deltaA = column(Uint32Array), lengthA = column(Uint32Array), startB = column(Uint32Array);
+  const extraB = column(Int32Array), contigB = column(Uint16Array), mapq = column(Uint8Array), minus = column(Uint8Array);
+  const by = {};
+  let row = 0;
+  for (const [contigA, count] of meta.contigs) {
+    const startA = new Float64Array(count), endA = new Float64Array(count), endB = new Float64Array(count);
+    let pos = 0;
+    for (let i = 0, k = row; i < count; i++, k++) {
+      pos += deltaA[k];
+      startA[i] = pos;
+      endA[i] = pos + lengthA[k];
+      endB[i] = startB[k] + lengthA[k] + extraB[k];
+    }
+    by[contigA] = {
+      length: count, startA, endA,
+      startB: startB.subarray(row, row + count), endB,
+      contigB: contigB.subarray(row, row + count), namesB: meta.names_b,
+      minus: minus.subarray(row, row + count), mapq: mapq.subarray(row, row + count)
+    };
+    row += count;
+  }
   return by;
 }
 
+// Fetch the manifest once per page load, revalidating it so a rebuilt map is picked up
+function loadManifest() {
+  if (!manifestPromise) {
+    manifestPromise = fetch(MANIFEST_URL, { cache: 'no-cache' })
+      .then(res => res.ok ? res.json() : { maps: {} })
+      .catch(() => ({ maps: {} }));
+  }
+  return manifestPromise;
+}
+
+// Load a map by its TSV path: the binary build from the manifest if there is one, else the TSV itself
+async function loadBlocks(file) {
+  if (blocksCache.has(file)) return blocksCache.get(file);
+  let blocks = null;
+  const entry = LITTLE_ENDIAN ? (await loadManifest()).maps[file] : null;
+  if (entry) {
+    try {
+      const res = await fetch(entry.file, { cache: 'force-cache' });
+      if (!res.ok) throw new Error('HTTP ' + res.status);
+      blocks = decodeWebMap(await res.arrayBuffer());
+    } catch (e) {
+      debugLog(`Binary map ${entry.file} failed (${e.message}), falling back to TSV`);
+    }
+  }
+  if (!blocks) {
+    const res = await fetch(file, { cache: 'no-cache' });
+    if (!res.ok) throw new Error('HTTP ' + res.status);
+    blocks = parseTSV(await res.text());
+  }
+  blocksCache.set(file, blocks);
+  return blocks;
+}
+
 // Binary search to find containing block for a position
 function findBlock(blocks, pos) {
+  const startA = blocks.startA, endA = blocks.endA;
   let lo = 0, hi = blocks.length;
   while (lo < hi) {
     const mid = (lo + hi) >> 1;
-    const b = blocks[mid];
-    if (pos < b.startA) hi = mid;
-    else if (pos >= b.endA) lo = mid + 1;
+    if (pos < startA[mid]) hi = mid;
+    else if (pos >= endA[mid]) lo = mid + 1;
     else return mid;
   }
   return null;
@@ -98,16 +222,13 @@ function toOneBased(posZeroBased) {
   return posZeroBased + 1;
 }
 
-// Fetch default A→B blocks from server with cache-busting
+// Fetch default A→B blocks from server (binary build when available)
 async function loadDefaultAB() {
   const conf = GENOME_PAIRS[currentPairId];
   const statusAB = document.getElementById('statusAB');
   try {
     debugLog(`Fetching ${conf.genomeA}→${conf.genomeB} blocks...`);
-    const res = await fetch(conf.fileAB + '?v=' + Date.now());
-    if (!res.ok) throw new Error('HTTP ' + res.status);
-    const txt = await res.text();
-    blocksAB = parseTSV(txt);
+    blocksAB = await loadBlocks(conf.fileAB);
     const count = Object.keys(blocksAB).reduce((s, c) => s + blocksAB[c].length, 0);
     if (statusAB) statusAB.textContent = `${conf.genomeA}→${conf.genomeB}: blocks file loaded (${count} blocks)`;
     debugLog(`${conf.genomeA}→${conf.genomeB} blocks file loaded: ${count} blocks`);
@@ -117,16 +238,13 @@ async function loadDefaultAB() {
   }
 }
 
-// Fetch default B→A blocks from server with cache-busting
+// Fetch default B→A blocks from server (binary build when available)
 async function loadDefaultBA() {
   const conf = GENOME_PAIRS[currentPairId];
   const statusBA = document.getElementById('statusBA');
   try {
     debugLog(`Fetching ${conf.genomeB}→${conf.genomeA} blocks...`);
-    const res = await fetch(conf.fileBA + '?v=' + Date.now());
-    if (!res.ok) throw new Error('HTTP ' + res.status);
-    const txt = await res.text();
-    blocksBA = parseTSV(txt);
+    blocksBA = await loadBlocks(conf.fileBA);
     const count = Object.keys(blocksBA).reduce((s, c) => s + blocksBA[c].length, 0);
     if (statusBA) statusBA.textContent = `${conf.genomeB}→${conf.genomeA}: blocks file loaded (${count} blocks)`;
     debugLog(`${conf.genomeB}→${conf.genomeA} blocks file loaded: ${count} blocks`);
@@ -182,8 +300,8 @@ function stitchInterval(blocks, startA, endA, tolerance = STITCH_TOLERANCE) {
   const idxEnd = findBlock(blocks, endA);
   if (idxStart === null || idxEnd === null) return { ok: false, reason: 'UNMAPPED' };
 
-  const first = blocks[idxStart];
-  const last = blocks[idxEnd];
+  const first = blockAt(blocks, idxStart);
+  const last = blockAt(blocks, idxEnd);
   if (idxStart === idxEnd) {
     const [contigB, sB, eB, strand] = mapInterval(first, startA, endA);
     return { ok: true, contigB, startB: sB, endB: eB, strand };
@@ -193,8 +311,8 @@ function stitchInterval(blocks, startA, endA, tolerance = STITCH_TOLERANCE) {
   const targetStrand = first.strand;
 
   for (let i = idxStart; i < idxEnd; i++) {
-    const cur = blocks[i];
-    const next = blocks[i + 1];
+    const cur = blockAt(blocks, i);
+    const next = blockAt(blocks, i + 1);
     if (cur.contigB !== targetContig) return { ok: false, reason: 'CONTIG' };
     if (cur.strand !== targetStrand) return { ok: false, reason: 'STRAND' };
     // Allow gaps; they will be reported separately via collectGaps
@@ -209,11 +327,11 @@ function stitchInterval(blocks, startA, endA, tolerance = STITCH_TOLERANCE) {
 
 function collectGaps(blocks, startIdx, endIdx) {
   const gaps = [];
-  const first = blocks[startIdx];
+  const first = blockAt(blocks, startIdx);
   const targetStrand = first.strand;
   for (let i = startIdx; i < endIdx; i++) {
-    const cur = blocks[i];
-    const next = blocks[i + 1];
+    const cur = blockAt(blocks, i);
+    const next = blockAt(blocks, i + 1);
     if (cur.contigB !== next.contigB) {
       gaps.push({ type: 'CONTIG_CHANGE', contigPrev: cur.contigB, contigNext: next.contigB });
     }